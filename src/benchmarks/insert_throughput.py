@@ -0,0 +1,43 @@
+"""
+Бенчмарк пропускной способности вставки в зависимости от размера таблицы.
+
+Запуск: ``python -m src.benchmarks.insert_throughput``.
+При выдаче ID из счетчика число вставок в секунду не должно
+падать с ростом таблицы.
+"""
+
+import time
+from typing import Any, Dict, List
+
+from src.primitive_db import core
+
+TABLE_SIZES = (1_000, 10_000, 100_000)
+BATCH = 2_000
+
+
+def _make_table(size: int) -> tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Создает таблицу с заданным числом строк."""
+    metadata = core.create_table({}, "bench", [("name", "str"), ("age", "int")])
+    table_data: List[Dict[str, Any]] = []
+    for i in range(size):
+        core.insert_row(metadata, "bench", [f"user{i}", i], table_data)
+    return metadata, table_data
+
+
+def measure(size: int, batch: int = BATCH) -> float:
+    """Возвращает число вставок в секунду в таблицу размера size."""
+    metadata, table_data = _make_table(size)
+    start = time.perf_counter()
+    for i in range(batch):
+        core.insert_row(metadata, "bench", [f"new{i}", i], table_data)
+    return batch / (time.perf_counter() - start)
+
+
+def main() -> None:
+    """Печатает пропускную способность вставки для разных размеров таблицы."""
+    for size in TABLE_SIZES:
+        print(f"строк: {size:>8}  вставок/с: {measure(size):>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
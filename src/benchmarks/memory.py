@@ -0,0 +1,63 @@
+"""
+Бенчмарк памяти, занимаемой загруженной таблицей.
+
+Запуск: ``python -m src.benchmarks.memory [ROWS]`` (по умолчанию 1 000 000).
+Сравнивает строки-словари (прежнее представление) с компактными
+записями модуля compact и печатает число байт на строку вместе
+со значениями столбцов.
+"""
+
+import gc
+import sys
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from src.primitive_db import compact, core
+
+ROWS = 1_000_000
+COLUMNS = [("name", "str"), ("age", "int"), ("active", "bool")]
+
+
+def _values(rows: int) -> List[List[Any]]:
+    return [[f"user{i}", i, i % 2 == 0] for i in range(rows)]
+
+
+def _as_dicts(metadata: Dict[str, Any], values: List[List[Any]]) -> List[Any]:
+    names = compact.column_names(metadata["bench"]["columns"])
+    return [dict(zip(names, (i, *row))) for i, row in enumerate(values, start=1)]
+
+
+def _as_records(metadata: Dict[str, Any], values: List[List[Any]]) -> List[Any]:
+    table_data: List[Any] = []
+    core.insert_rows(metadata, "bench", values, table_data)
+    return table_data
+
+
+def measure(build: Callable[..., List[Any]], rows: int) -> float:
+    """Возвращает число байт на строку таблицы, построенной build."""
+    metadata = core.create_table({}, "bench", COLUMNS)
+    gc.collect()
+    tracemalloc.start()
+    # Значения создаются под трассировкой: они тоже входят в размер строки
+    table_data = build(metadata, _values(rows))
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del table_data
+    return size / rows
+
+
+def main() -> None:
+    """Печатает байты на строку до и после перехода на компактные записи."""
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    before = measure(_as_dicts, rows)
+    after = measure(_as_records, rows)
+    columns = ", ".join(f"{name}:{kind}" for name, kind in COLUMNS)
+    print(f"строк: {rows}, столбцы: ID:int, {columns}")
+    print(f"словари:  {before:>8.1f} байт/строка")
+    print(f"записи:   {after:>8.1f} байт/строка")
+    print(f"экономия: {1 - after / before:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Бенчмарк времени запуска ``database -c``.
+
+Запуск: ``python -m src.benchmarks.startup [RUNS]`` (по умолчанию 20).
+Все в пустом временном каталоге. Импорты одного запуска
+``database -c "insert ..."`` замеряются через ``python -X importtime``
+(модули движка загружаются после разбора аргументов, поэтому замерять
+импорт одной точки входа недостаточно): печатаются общее время, самые
+дорогие модули и то, загрузились ли зависимости, которые нужны не каждому
+запуску (prompt, prettytable, пул процессов, профилировщик). Затем RUNS раз
+выполняется та же команда и печатаются медиана и p90 полного времени
+процесса вместе со временем пустого интерпретатора.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+RUNS = 20
+TOP = 10
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ENTRY = "src.primitive_db.main"
+# Модули, которые загружаются только по требованию
+LAZY = ("prompt", "prettytable", "multiprocessing", "concurrent.futures", "cProfile")
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def import_times(argv: List[str], cwd: str) -> Dict[str, List[int]]:
+    """Время импорта модулей при запуске argv: имя -> [собственное, общее] в мкс."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *argv],
+        env=_env(),
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: Dict[str, List[int]] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if not fields[0].strip().isdigit():
+            continue  # заголовок
+        times[fields[2].strip()] = [int(fields[0]), int(fields[1])]
+    return times
+
+
+def wall_times(runs: int, argv: List[str], cwd: str) -> List[float]:
+    """Полное время процесса в мс для runs запусков argv."""
+    result = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(argv, env=_env(), cwd=cwd, check=True, capture_output=True)
+        result.append((time.perf_counter() - start) * 1000)
+    return result
+
+
+def _summary(samples: List[float]) -> str:
+    p90 = statistics.quantiles(samples, n=10)[-1] if len(samples) > 1 else samples[0]
+    return f"медиана {statistics.median(samples):7.1f} мс, p90 {p90:7.1f} мс"
+
+
+def main() -> None:
+    """Печатает время импорта и время запуска database -c."""
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else RUNS
+    database = ["-m", ENTRY, "-y"]
+    insert = [*database, "-c", 'insert into bench values ("user", 42)']
+    with tempfile.TemporaryDirectory() as workdir:
+        subprocess.run(
+            [sys.executable, *database, "-c", "create_table bench name:str age:int"],
+            env=_env(), cwd=workdir, check=True, capture_output=True,
+        )
+        # Первый запуск компилирует .pyc и в замер не входит
+        import_times(insert, workdir)
+        times = import_times(insert, workdir)
+        empty = wall_times(runs, [sys.executable, "-c", "pass"], workdir)
+        command = wall_times(runs, [sys.executable, *insert], workdir)
+
+    total = sum(own for own, _ in times.values())
+    print(f"импорт при database -c insert: {total / 1000:.1f} мс")
+    print(f"самые дорогие модули (собственное время, из {len(times)}):")
+    top = sorted(times.items(), key=lambda item: item[1][0], reverse=True)[:TOP]
+    for name, (own, _) in top:
+        print(f"  {own / 1000:6.1f} мс  {name}")
+    for name in LAZY:
+        print(f"  {name}: {'загружается' if name in times else 'не загружается'}")
+    print(f"запусков: {runs}")
+    print(f"python -c pass:        {_summary(empty)}")
+    print(f"database -c insert:    {_summary(command)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Набор бенчмарков основных CRUD-операций.
+
+Запуск: ``database bench [--rows N] [--ops N] [--schema ...] [--output FILE]``.
+Для синтетической таблицы заданного размера и схемы измеряются
+пропускная способность и задержки p50/p99 операций insert, point select,
+full scan, update и delete — напрямую через ``core`` и через обработчики
+``engine``. Результат выводится в JSON, чтобы сравнивать запуски между
+версиями.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from importlib import metadata as importlib_metadata
+from typing import Any, Callable, Dict, List, Tuple
+
+from src.primitive_db import core, planner
+from src.primitive_db.indexes import PrimaryKeyIndex
+from src.primitive_db.parser import parse_columns
+
+DEFAULT_SCHEMA = "name:str,age:int,active:bool"
+PACKAGE_NAME = "project2_Poley_Evgeny_M25-555"
+
+
+def parse_schema(spec: str) -> List[Tuple[str, str]]:
+    """Разбирает схему вида 'name:str,age:int'."""
+    return parse_columns([part for part in spec.split(",") if part.strip()])
+
+
+def random_value(col_type: str, rnd: random.Random) -> Any:
+    """Случайное значение заданного типа."""
+    if col_type == "int":
+        return rnd.randrange(1_000_000)
+    if col_type == "bool":
+        return rnd.random() < 0.5
+    return "s" + str(rnd.randrange(1_000_000))
+
+
+def generate_values(
+    columns: List[Tuple[str, str]], count: int, rnd: random.Random
+) -> List[List[Any]]:
+    """Синтетические значения строк (без ID)."""
+    return [[random_value(t, rnd) for _, t in columns] for _ in range(count)]
+
+
+def literal(value: Any) -> str:
+    """Значение в синтаксисе команд."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str):
+        return f'"{value}"'
+    return str(value)
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Пропускная способность и перцентили задержки (в миллисекундах)."""
+    ordered = sorted(latencies)
+    total = sum(ordered)
+
+    def percentile(q: float) -> float:
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))] * 1000
+
+    return {
+        "ops": len(ordered),
+        "throughput_ops_s": round(len(ordered) / total, 1) if total else 0.0,
+        "p50_ms": round(percentile(0.50), 4),
+        "p99_ms": round(percentile(0.99), 4),
+    }
+
+
+def measure(calls: List[Callable[[], Any]]) -> Dict[str, float]:
+    """Выполняет вызовы по одному и замеряет задержку каждого."""
+    latencies = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+
+def bench_core(
+    columns: List[Tuple[str, str]], rows: int, ops: int, seed: int
+) -> Dict[str, Dict[str, float]]:
+    """Операции над таблицей в памяти через функции core."""
+    rnd = random.Random(seed)
+    metadata = core.create_table({}, "bench", columns)
+    table_data: List[Dict[str, Any]] = []
+    core.insert_rows(metadata, "bench", generate_values(columns, rows, rnd), table_data)
+    scan_col, scan_type = columns[0]
+    results = {}
+
+    new_values = generate_values(columns, ops, rnd)
+    results["insert"] = measure([
+        lambda v=v: core.insert_row(metadata, "bench", v, table_data)
+        for v in new_values
+    ])
+
+    indexes = {"ID": PrimaryKeyIndex(table_data)}
+    last_id = metadata["bench"]["last_id"]
+
+    def point_select(row_id: int) -> Any:
+        plan = planner.plan_statement(metadata, "select", "bench", {"ID": row_id})
+        return core.select_rows(table_data, plan, indexes)
+
+    results["point_select"] = measure([
+        lambda i=rnd.randint(1, last_id): point_select(i) for _ in range(ops)
+    ])
+
+    scan_ops = max(1, ops // 10)
+    results["full_scan"] = measure([
+        lambda v=random_value(scan_type, rnd): core.select_rows(
+            table_data, {scan_col: v}
+        )
+        for _ in range(scan_ops)
+    ])
+
+    results["update"] = measure([
+        lambda i=rnd.randint(1, last_id), v=random_value(scan_type, rnd):
+            core.update_rows(
+                metadata, "bench", table_data, {scan_col: v}, {"ID": i}, indexes
+            )
+        for _ in range(ops)
+    ])
+
+    delete_ids = rnd.sample(range(1, last_id + 1), min(ops, last_id))
+    state = {"data": table_data}
+
+    def delete(row_id: int) -> None:
+        state["data"], _ = core.delete_rows(
+            metadata, "bench", state["data"], {"ID": row_id}, indexes
+        )
+        indexes["ID"].apply([{"op": "delete", "id": row_id}])
+
+    results["delete"] = measure([lambda i=i: delete(i) for i in delete_ids])
+    return results
+
+
+def bench_engine(
+    columns: List[Tuple[str, str]],
+    rows: int,
+    ops: int,
+    seed: int,
+    storage: str,
+) -> Dict[str, Dict[str, float]]:
+    """Команды через обработчики engine во временном каталоге базы."""
+    from src.primitive_db import engine
+    from src.primitive_db.decorators import set_auto_confirm
+    from src.primitive_db.storage import BACKENDS
+
+    rnd = random.Random(seed)
+    scan_col, scan_type = columns[0]
+    cols_spec = [f"{n}:{t}" for n, t in columns]
+    results = {}
+    old_cwd = os.getcwd()
+
+    quiet = contextlib.redirect_stdout(io.StringIO())
+    with tempfile.TemporaryDirectory() as tmp, quiet:
+        os.chdir(tmp)
+        set_auto_confirm(True)
+        try:
+            engine.SESSION.reset()
+            engine.handle_create_table(["create_table", "bench", *cols_spec])
+            metadata = engine.SESSION.metadata
+            metadata["bench"]["storage"] = storage
+            table_data: List[Dict[str, Any]] = []
+            core.insert_rows(
+                metadata, "bench", generate_values(columns, rows, rnd), table_data
+            )
+            BACKENDS[storage](metadata["bench"]["columns"]).save("bench", table_data)
+            engine.SESSION.save_metadata("bench")
+            engine.SESSION.reset()
+
+            def command(text: str) -> Callable[[], Any]:
+                def call() -> None:
+                    # Как в интерактивном цикле: каждая команда видит диск
+                    engine.SESSION.reset()
+                    engine.execute(text)
+                return call
+
+            values = ", ".join(literal(v) for v in generate_values(columns, 1, rnd)[0])
+            results["insert"] = measure([
+                command(f"insert into bench values ({values})") for _ in range(ops)
+            ])
+            last_id = metadata["bench"]["last_id"] + ops
+            results["point_select"] = measure([
+                command(f"select from bench where ID = {rnd.randint(1, last_id)}")
+                for _ in range(ops)
+            ])
+            scan_ops = max(1, ops // 10)
+            results["full_scan"] = measure([
+                command(
+                    f"select from bench where {scan_col} = "
+                    f"{literal(random_value(scan_type, rnd))}"
+                )
+                for _ in range(scan_ops)
+            ])
+            results["update"] = measure([
+                command(
+                    f"update bench set {scan_col} = "
+                    f"{literal(random_value(scan_type, rnd))} "
+                    f"where ID = {rnd.randint(1, last_id)}"
+                )
+                for _ in range(ops)
+            ])
+            delete_ids = rnd.sample(range(1, last_id + 1), min(ops, last_id))
+            results["delete"] = measure([
+                command(f"delete from bench where ID = {i}") for i in delete_ids
+            ])
+            engine.SESSION.reset()
+        finally:
+            set_auto_confirm(False)
+            os.chdir(old_cwd)
+    return results
+
+
+def package_version() -> str:
+    """Версия установленного пакета (или 'dev' при запуске из исходников)."""
+    try:
+        return importlib_metadata.version(PACKAGE_NAME)
+    except importlib_metadata.PackageNotFoundError:
+        return "dev"
+
+
+def run(
+    rows: int = 10_000,
+    ops: int = 200,
+    schema: str = DEFAULT_SCHEMA,
+    layers: Tuple[str, ...] = ("core", "engine"),
+    storage: str = "log",
+    seed: int = 42,
+) -> Dict[str, Any]:
+    """Запускает бенчмарки и возвращает результаты в виде словаря."""
+    columns = parse_schema(schema)
+    report: Dict[str, Any] = {
+        "version": package_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "rows": rows,
+            "ops": ops,
+            "schema": schema,
+            "storage": storage,
+            "seed": seed,
+        },
+        "results": {},
+    }
+    if "core" in layers:
+        report["results"]["core"] = bench_core(columns, rows, ops, seed)
+    if "engine" in layers:
+        report["results"]["engine"] = bench_engine(columns, rows, ops, seed, storage)
+    return report
+
+
+def main(argv: List[str] | None = None) -> None:
+    """Точка входа команды ``database bench``."""
+    arg_parser = argparse.ArgumentParser(
+        prog="database bench", description="Бенчмарки CRUD-операций"
+    )
+    arg_parser.add_argument("--rows", type=int, default=10_000,
+                            help="размер синтетической таблицы")
+    arg_parser.add_argument("--ops", type=int, default=200,
+                            help="число операций каждого вида")
+    arg_parser.add_argument("--schema", default=DEFAULT_SCHEMA,
+                            help="столбцы через запятую, например name:str,age:int")
+    arg_parser.add_argument("--layers", default="core,engine",
+                            help="уровни: core, engine или оба через запятую")
+    arg_parser.add_argument("--storage", default="log",
+                            choices=("json", "log", "columnar"),
+                            help="формат хранения для уровня engine")
+    arg_parser.add_argument("--seed", type=int, default=42)
+    arg_parser.add_argument("--output", metavar="FILE",
+                            help="записать JSON в файл вместо stdout")
+    args = arg_parser.parse_args(argv)
+
+    report = run(
+        rows=args.rows,
+        ops=args.ops,
+        schema=args.schema,
+        layers=tuple(layer.strip() for layer in args.layers.split(",")),
+        storage=args.storage,
+        seed=args.seed,
+    )
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
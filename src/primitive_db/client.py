@@ -0,0 +1,192 @@
+"""
+Клиент сетевого режима (``database serve``) с пулом соединений.
+
+Пример::
+
+    from src.primitive_db.client import ConnectionPool
+
+    pool = ConnectionPool(port=5544, size=8)
+    print(pool.execute("select from users where age > 30"))
+
+Подготовленные команды (``prepare``) сервер хранит отдельно для каждого
+соединения. ``pool.execute`` запоминает выполненные через него
+``prepare`` и повторяет их на соединении, которое видит команду впервые,
+поэтому ``execute <имя>`` работает на любом соединении пула. Чтобы
+выполнить несколько команд на одном соединении, его закрепляют::
+
+    with pool.connection() as conn:
+        conn.execute("prepare by_age as select from users where age > ?")
+        print(conn.execute("execute by_age (30)"))
+
+Модуль не зависит от движка базы и может использоваться отдельно.
+"""
+
+import contextlib
+import queue
+import socket
+import threading
+from typing import Dict, Iterator, List
+
+from .constants import SERVER_HOST, SERVER_PORT
+from .protocol import STATUS_ERROR, TERMINATOR, decode_body
+
+
+class ServerError(Exception):
+    """Сервер не смог выполнить команду."""
+
+
+def _prepared_name(command: str, keyword: str) -> str | None:
+    """Имя из ``prepare <имя> as ..`` или ``execute <имя> (..)``."""
+    words = command.split(None, 2)
+    if len(words) < 2 or words[0].lower() != keyword:
+        return None
+    return words[1].split("(", 1)[0]
+
+
+class Connection:
+    """Одно соединение с сервером; команды выполняются последовательно."""
+
+    def __init__(
+        self,
+        host: str = SERVER_HOST,
+        port: int = SERVER_PORT,
+        unix_path: str | None = None,
+        timeout: float | None = None,
+    ) -> None:
+        if unix_path:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(timeout)
+            sock.connect(unix_path)
+        else:
+            sock = socket.create_connection((host, port), timeout=timeout)
+        self._sock = sock
+        self._file = sock.makefile("rwb")
+        # Команды prepare, выполненные на этом соединении: имя -> текст
+        self.prepared: Dict[str, str] = {}
+
+    def execute(self, command: str) -> str:
+        """Отправляет команду и возвращает ее вывод."""
+        if "\n" in command or "\r" in command:
+            raise ValueError("Команда должна занимать одну строку.")
+        self._file.write((command + "\n").encode("utf-8"))
+        self._file.flush()
+
+        status = self._readline()
+        lines: List[str] = []
+        while (line := self._readline()) != TERMINATOR:
+            lines.append(line)
+        if status.startswith(STATUS_ERROR):
+            raise ServerError(status[len(STATUS_ERROR):].strip())
+        name = _prepared_name(command, "prepare")
+        if name is not None:
+            self.prepared[name] = command
+        return decode_body(lines)
+
+    def _readline(self) -> str:
+        raw = self._file.readline()
+        if not raw:
+            raise ConnectionError("Сервер закрыл соединение.")
+        return raw.decode("utf-8").rstrip("\n")
+
+    def close(self) -> None:
+        """Закрывает соединение."""
+        with contextlib.suppress(OSError):
+            self._file.close()
+        self._sock.close()
+
+    def __enter__(self) -> "Connection":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class ConnectionPool:
+    """Потокобезопасный пул соединений ограниченного размера.
+
+    Соединения открываются по требованию и переиспользуются; если все
+    заняты, ``connection()`` ждет освобождения одного из них.
+    Команды prepare, выполненные через ``execute``, пул повторяет
+    на других соединениях перед ``execute`` с тем же именем.
+    """
+
+    def __init__(
+        self,
+        host: str = SERVER_HOST,
+        port: int = SERVER_PORT,
+        unix_path: str | None = None,
+        size: int = 4,
+        timeout: float | None = None,
+    ) -> None:
+        self._params = {
+            "host": host, "port": port, "unix_path": unix_path, "timeout": timeout,
+        }
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+        self._prepared: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def connection(self) -> Iterator[Connection]:
+        """Выдает соединение из пула на время блока with."""
+        if self._closed:
+            raise RuntimeError("Пул соединений закрыт.")
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = Connection(**self._params)
+            try:
+                yield conn
+            except OSError:
+                # Сетевая ошибка: соединение могло рассинхронизироваться
+                conn.close()
+                raise
+            except BaseException:
+                self._put_back(conn)
+                raise
+            self._put_back(conn)
+        finally:
+            self._slots.release()
+
+    def _put_back(self, conn: Connection) -> None:
+        if self._closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+
+    def execute(self, command: str) -> str:
+        """Выполняет команду на свободном соединении.
+
+        Подготовленная через пул команда, которой на этом соединении
+        еще нет, сначала готовится на нем заново.
+        """
+        with self.connection() as conn:
+            name = _prepared_name(command, "execute")
+            with self._lock:
+                prepare = self._prepared.get(name) if name is not None else None
+            if prepare is not None and conn.prepared.get(name) != prepare:
+                conn.execute(prepare)
+            result = conn.execute(command)
+        name = _prepared_name(command, "prepare")
+        if name is not None:
+            with self._lock:
+                self._prepared[name] = command
+        return result
+
+    def close(self) -> None:
+        """Закрывает все простаивающие соединения."""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def __enter__(self) -> "ConnectionPool":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
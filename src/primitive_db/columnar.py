@@ -0,0 +1,261 @@
+"""
+Бинарный поколоночный формат снимка таблицы.
+
+Структура файла::
+
+    MAGIC | длина заголовка (8 байт, little-endian) | заголовок (JSON) | сегменты
+
+Заголовок описывает число строк и для каждого столбца смещения его
+сегментов. ``int`` хранится массивом ``array('q')``, ``bool`` —
+массивом байтов 0/1, ``str`` — массивом смещений ``array('q')``
+(n + 1 значение) и общим блоком UTF-8. Числа записываются в порядке
+байтов платформы. Файл читается через ``mmap``, поэтому выборка
+затрагивает только нужные столбцы и строки.
+"""
+
+import bisect
+import itertools
+import json
+import mmap
+import struct
+from array import array
+from typing import Any, Dict, List
+
+from . import compact, conditions
+from .utils import atomic_write
+
+MAGIC = b"PDBCOL1\n"
+_HEADER_LEN = struct.Struct("<Q")
+_ALIGN = 8
+
+Row = Dict[str, Any]
+
+
+def _pack_int(values: List[Any], name: str) -> bytes:
+    try:
+        packed = array("q", values)
+    except (TypeError, OverflowError):
+        raise ValueError(f"Столбец {name}: значения не помещаются в int64.")
+    return packed.tobytes()
+
+
+def _pack_bool(values: List[Any], name: str) -> bytes:
+    if any(not isinstance(v, bool) for v in values):
+        raise ValueError(f"Столбец {name}: ожидались значения bool.")
+    return bytes(array("B", values))
+
+
+def write_table(path: str, columns: List[Dict[str, str]], rows: List[Row]) -> None:
+    """Записывает строки в поколоночном формате."""
+    segments: List[bytes] = []
+    header_cols = []
+    offset = 0
+
+    def add_segment(data: bytes) -> List[int]:
+        nonlocal offset
+        padding = (-len(data)) % _ALIGN
+        segments.append(data + b"\0" * padding)
+        segment = [offset, len(data)]
+        offset += len(data) + padding
+        return segment
+
+    for col in columns:
+        name, col_type = col["name"], col["type"]
+        values = compact.column(rows, name)
+        entry: Dict[str, Any] = {"name": name, "type": col_type}
+        if col_type == "int":
+            entry["data"] = add_segment(_pack_int(values, name))
+        elif col_type == "bool":
+            entry["data"] = add_segment(_pack_bool(values, name))
+        else:
+            encoded = [str(v).encode("utf-8") for v in values]
+            offsets = array("q", [0])
+            total = 0
+            for item in encoded:
+                total += len(item)
+                offsets.append(total)
+            entry["offsets"] = add_segment(offsets.tobytes())
+            entry["data"] = add_segment(b"".join(encoded))
+        header_cols.append(entry)
+
+    header = json.dumps(
+        {"rows": len(rows), "columns": header_cols}, separators=(",", ":")
+    ).encode("utf-8")
+    prefix_len = len(MAGIC) + _HEADER_LEN.size + len(header)
+    prefix_len += (-prefix_len) % _ALIGN
+    header_block = (MAGIC + _HEADER_LEN.pack(len(header)) + header).ljust(
+        prefix_len, b"\0"
+    )
+    with atomic_write(path, "wb") as f:
+        f.write(header_block)
+        for segment in segments:
+            f.write(segment)
+
+
+class ColumnarReader:
+    """Чтение поколоночного файла через mmap (используется как контекст)."""
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views: List[memoryview] = []
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"Файл {path} не является поколоночной таблицей.")
+        start = len(MAGIC)
+        (header_len,) = _HEADER_LEN.unpack_from(self._mmap, start)
+        start += _HEADER_LEN.size
+        header = json.loads(self._mmap[start : start + header_len])
+        data_start = start + header_len
+        self._base = data_start + (-data_start) % _ALIGN
+        self.rows: int = header["rows"]
+        self.columns: Dict[str, Dict[str, Any]] = {
+            c["name"]: c for c in header["columns"]
+        }
+        self._cache: Dict[str, Any] = {}
+
+    def __enter__(self) -> "ColumnarReader":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Освобождает представления и закрывает файл."""
+        self._cache.clear()
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._mmap.close()
+        self._file.close()
+
+    def _segment(self, segment: List[int], fmt: str = "B") -> memoryview:
+        offset, length = segment
+        start = self._base + offset
+        raw = memoryview(self._mmap)[start : start + length]
+        self._views.append(raw)
+        if fmt == "B":
+            return raw
+        view = raw.cast(fmt)
+        self._views.append(view)
+        return view
+
+    def _column(self, name: str) -> Any:
+        """Возвращает представление столбца без копирования данных."""
+        if name not in self._cache:
+            col = self.columns[name]
+            if col["type"] == "str":
+                offsets = self._segment(col["offsets"], "q")
+                self._cache[name] = (offsets, self._segment(col["data"]))
+            else:
+                fmt = "q" if col["type"] == "int" else "B"
+                self._cache[name] = self._segment(col["data"], fmt)
+        return self._cache[name]
+
+    def value(self, name: str, pos: int) -> Any:
+        """Значение столбца в строке с номером pos."""
+        col_type = self.columns[name]["type"]
+        data = self._column(name)
+        if col_type == "str":
+            offsets, blob = data
+            return bytes(blob[offsets[pos] : offsets[pos + 1]]).decode("utf-8")
+        if col_type == "bool":
+            return bool(data[pos])
+        return data[pos]
+
+    def column_values(
+        self, name: str, start: int = 0, stop: int | None = None
+    ) -> List[Any]:
+        """Значения столбца в строках [start, stop) (по умолчанию все)."""
+        stop = self.rows if stop is None else min(stop, self.rows)
+        col_type = self.columns[name]["type"]
+        data = self._column(name)
+        if col_type == "str":
+            offsets, blob = data
+            bounds = offsets[start : stop + 1].tolist()
+            base = bounds[0]
+            raw = bytes(blob[base : bounds[-1]])
+            return [
+                raw[bounds[i] - base : bounds[i + 1] - base].decode("utf-8")
+                for i in range(stop - start)
+            ]
+        if col_type == "bool":
+            return [bool(v) for v in data[start:stop]]
+        return data[start:stop].tolist()
+
+    def read_all(
+        self, start: int = 0, stop: int | None = None, records: bool = False
+    ) -> List[Row]:
+        """Материализует строки [start, stop) в виде словарей.
+
+        С records=True строки сразу создаются компактными записями
+        (если схема это допускает), без промежуточных словарей.
+        """
+        names = list(self.columns)
+        values = [self.column_values(name, start, stop) for name in names]
+        record = compact.record_class(tuple(names)) if records else None
+        if record is not None:
+            return list(itertools.starmap(record, zip(*values)))
+        return [dict(zip(names, row)) for row in zip(*values)]
+
+    def positions_where(
+        self,
+        name: str,
+        condition: Any,
+        start: int = 0,
+        stop: int | None = None,
+    ) -> List[int]:
+        """Номера строк из [start, stop), где значение столбца
+        удовлетворяет условию.
+
+        Сканируется только один столбец; для ``ID = значение``
+        используется двоичный поиск (ID в снимке отсортированы).
+        """
+        stop = self.rows if stop is None else min(stop, self.rows)
+        if name not in self.columns:
+            return [i for i in range(start, stop) if condition.test(None)]
+        if name == "ID" and getattr(condition, "op", None) == "=":
+            value = condition.value
+            if isinstance(value, bool) or not isinstance(value, int):
+                return []
+            data = self._column(name)
+            pos = bisect.bisect_left(data, value, start, stop)
+            return [pos] if pos < stop and data[pos] == value else []
+        values = self.column_values(name, start, stop)
+        return [start + i for i, v in enumerate(values) if condition.test(v)]
+
+    def select(
+        self,
+        condition: Any,
+        start: int = 0,
+        stop: int | None = None,
+    ) -> List[Row]:
+        """Строки из [start, stop), удовлетворяющие условию, в порядке ID.
+
+        Условия на один столбец, соединенные через AND, проверяются
+        по соответствующим столбцам; целиком материализуются лишь
+        строки-кандидаты.
+        """
+        positions = None
+        for item in conditions.conjuncts(condition):
+            column = conditions.single_column(item)
+            if column is None:
+                continue
+            found = self.positions_where(column, item, start, stop)
+            positions = (
+                found if positions is None
+                else sorted(set(positions) & set(found))
+            )
+            if not positions:
+                break
+        if positions is None:
+            rows = self.read_all(start, stop)
+        else:
+            rows = [self.row(pos) for pos in positions]
+        if condition is None:
+            return rows
+        return [r for r in rows if condition.matches(r)]
+
+    def row(self, pos: int) -> Row:
+        """Материализует одну строку."""
+        return {name: self.value(name, pos) for name in self.columns}
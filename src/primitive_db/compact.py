@@ -0,0 +1,179 @@
+"""
+Компактное представление строк таблицы в памяти.
+
+Вместо словаря на каждую строку используется объект класса с
+``__slots__``, построенного по схеме таблицы: значения лежат в
+фиксированных ячейках, без хэш-таблицы ключей (около 100 байт на
+строку из четырех столбцов вместо 220). Запись повторяет ту часть
+интерфейса словаря, которой пользуются core, индексы и вывод
+(``row[col]``, ``get``, ``keys``, ``values``, ``items``, ``update``),
+поэтому функции core работают с обоими представлениями. Словари
+строятся только при выводе и сериализации (``as_dict``, ``to_json``).
+
+Если имя столбца не является идентификатором Python, начинается
+с подчеркивания или совпадает с методом записи или словаря, строки
+таблицы остаются словарями.
+"""
+
+import functools
+import keyword
+import operator
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+Row = Dict[str, Any]
+
+
+class Record:
+    """Базовый класс компактной строки; ячейки задает подкласс по схеме."""
+
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+    __hash__ = None  # type: ignore[assignment]
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._fields
+
+    def values(self) -> List[Any]:
+        return [getattr(self, name) for name in self._fields]
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        return zip(self._fields, self.values())
+
+    def update(self, values: Dict[str, Any]) -> None:
+        for key, value in values.items():
+            self[key] = value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._fields
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (Record, dict)):
+            return self.as_dict() == as_dict(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(self.as_dict())
+
+    def as_dict(self) -> Row:
+        """Строка в виде обычного словаря."""
+        return dict(zip(self._fields, self.values()))
+
+
+def _slot_name(name: str) -> bool:
+    return (
+        name.isidentifier()
+        and not keyword.iskeyword(name)
+        and not name.startswith("_")
+        and not hasattr(Record, name)
+        and not hasattr(dict, name)
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def record_class(fields: Tuple[str, ...]) -> type | None:
+    """Класс записи для столбцов fields (None, если нужны словари).
+
+    Конструктор принимает значения в порядке столбцов; он генерируется
+    по схеме, как в ``collections.namedtuple``, чтобы создание строки
+    не требовало цикла на Python.
+    """
+    if not fields or len(set(fields)) != len(fields):
+        return None
+    if not all(_slot_name(name) for name in fields):
+        return None
+    args = ", ".join(fields)
+    body = "".join(f"    self.{name} = {name}\n" for name in fields)
+    namespace: Dict[str, Any] = {}
+    exec(f"def __init__(self, {args}):\n{body}", namespace)
+    return type(
+        "Row",
+        (Record,),
+        {"__slots__": fields, "_fields": fields, "__init__": namespace["__init__"]},
+    )
+
+
+def column_names(columns: List[Dict[str, str]]) -> Tuple[str, ...]:
+    """Имена столбцов схемы в порядке схемы."""
+    return tuple(c["name"] for c in columns)
+
+
+def compact_rows(columns: List[Dict[str, str]], rows: Iterable[Row]) -> List[Any]:
+    """Переводит строки (словари) в компактные записи по схеме."""
+    names = column_names(columns)
+    cls = record_class(names)
+    if cls is None:
+        return list(rows)
+    getter = operator.itemgetter(*names) if len(names) > 1 else None
+    result = []
+    for row in rows:
+        if isinstance(row, cls):
+            result.append(row)
+        elif getter is None:
+            result.append(cls(row.get(names[0])))
+        else:
+            try:
+                result.append(cls(*getter(row)))
+            except KeyError:
+                # Строки старых версий могут не содержать части столбцов
+                result.append(cls(*(row.get(name) for name in names)))
+    return result
+
+
+def row_factory(columns: List[Dict[str, str]], like: List[Any] | None = None) -> Any:
+    """Функция values -> строка для схемы.
+
+    Строки создаются того же вида, что и уже лежащие в like: таблица
+    не смешивает записи и словари.
+    """
+    names = column_names(columns)
+    cls = record_class(names)
+    if cls is not None and (not like or isinstance(like[0], cls)):
+        return cls
+    return lambda *values: dict(zip(names, values))
+
+
+def column(rows: List[Any], name: str) -> List[Any]:
+    """Значения столбца name всех строк (отсутствующие — None).
+
+    Для записей значения читаются через ``attrgetter`` без вызова
+    методов на Python; список может содержать и словари.
+    """
+    if rows and isinstance(rows[0], Record):
+        try:
+            return list(map(operator.attrgetter(name), rows))
+        except AttributeError:
+            pass
+    return [row.get(name) for row in rows]
+
+
+def as_dict(row: Any) -> Row:
+    """Строка в виде словаря (словари возвращаются как есть)."""
+    return row.as_dict() if isinstance(row, Record) else row
+
+
+def to_json(obj: Any) -> Row:
+    """Параметр ``default`` для json.dump: сериализует записи как объекты."""
+    if isinstance(obj, Record):
+        return obj.as_dict()
+    raise TypeError(f"Объект {type(obj).__name__} не сериализуется в JSON")
@@ -0,0 +1,141 @@
+"""
+Условия WHERE: сравнения, списки IN и их комбинации AND/OR.
+"""
+
+import operator
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Tuple
+
+Row = Dict[str, Any]
+
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+# Операторы, для которых подходит упорядоченный индекс
+RANGE_OPERATORS = ("<", "<=", ">", ">=")
+
+
+class Comparison(NamedTuple):
+    """Сравнение столбца со значением: ``age > 30``."""
+
+    column: str
+    op: str
+    value: Any
+
+    def matches(self, row: Row) -> bool:
+        return _compare(self.op, row.get(self.column), self.value)
+
+    def test(self, value: Any) -> bool:
+        """Проверка одного значения столбца."""
+        return _compare(self.op, value, self.value)
+
+
+class InList(NamedTuple):
+    """Принадлежность списку: ``name in ("a", "b")``."""
+
+    column: str
+    values: Tuple[Any, ...]
+
+    def matches(self, row: Row) -> bool:
+        return self.test(row.get(self.column))
+
+    def test(self, value: Any) -> bool:
+        """Проверка одного значения столбца."""
+        return any(_compare("=", value, v) for v in self.values)
+
+
+class And(NamedTuple):
+    """Конъюнкция условий."""
+
+    items: Tuple[Any, ...]
+
+    def matches(self, row: Row) -> bool:
+        return all(item.matches(row) for item in self.items)
+
+
+class Or(NamedTuple):
+    """Дизъюнкция условий."""
+
+    items: Tuple[Any, ...]
+
+    def matches(self, row: Row) -> bool:
+        return any(item.matches(row) for item in self.items)
+
+
+def _compare(op: str, left: Any, right: Any) -> bool:
+    # bool — подкласс int, но True не должен совпадать с 1
+    if isinstance(left, bool) != isinstance(right, bool):
+        return False
+    try:
+        return OPERATORS[op](left, right)
+    except TypeError:
+        # Несравнимые типы (например, str и int) условию не удовлетворяют
+        return False
+
+
+def from_dict(where_clause: Dict[str, Any]) -> And:
+    """Условие из словаря равенств ``{"age": 25}``."""
+    return And(tuple(Comparison(k, "=", v) for k, v in where_clause.items()))
+
+
+def as_condition(where: Any) -> Any:
+    """Приводит словарь равенств или готовое условие к условию (или None)."""
+    if not where:
+        return None
+    if isinstance(where, dict):
+        return from_dict(where)
+    return where
+
+
+def conjuncts(condition: Any) -> Iterator[Any]:
+    """Перебирает условия верхнего уровня, соединенные через AND."""
+    if isinstance(condition, And):
+        for item in condition.items:
+            yield from conjuncts(item)
+    elif condition is not None:
+        yield condition
+
+
+def single_column(condition: Any) -> str | None:
+    """Имя столбца, если условие зависит только от одного столбца."""
+    if isinstance(condition, (Comparison, InList)):
+        return condition.column
+    return None
+
+
+def columns(condition: Any) -> List[str]:
+    """Все столбцы, упомянутые в условии."""
+    if isinstance(condition, (Comparison, InList)):
+        return [condition.column]
+    if isinstance(condition, (And, Or)):
+        return [c for item in condition.items for c in columns(item)]
+    return []
+
+
+def rename(condition: Any, name: Callable[[str], str]) -> Any:
+    """Копия условия, в которой столбцы переименованы функцией name."""
+    if isinstance(condition, Comparison):
+        return Comparison(name(condition.column), condition.op, condition.value)
+    if isinstance(condition, InList):
+        return InList(name(condition.column), condition.values)
+    if isinstance(condition, (And, Or)):
+        return type(condition)(tuple(rename(item, name) for item in condition.items))
+    return condition
+
+
+def map_values(condition: Any, func: Callable[[Any], Any]) -> Any:
+    """Копия условия, в которой значения заменены результатом func."""
+    if isinstance(condition, Comparison):
+        return Comparison(condition.column, condition.op, func(condition.value))
+    if isinstance(condition, InList):
+        return InList(condition.column, tuple(func(v) for v in condition.values))
+    if isinstance(condition, (And, Or)):
+        return type(condition)(
+            tuple(map_values(item, func) for item in condition.items)
+        )
+    return condition
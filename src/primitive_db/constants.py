@@ -4,6 +4,59 @@
 
 META_FILE = "db_meta.json"
 DATA_DIR = "data"
+# Журналы упреждающей записи фиксируемых транзакций: у каждой свой файл
+# (* — pid процесса и случайный суффикс). WAL_FILE — единый файл
+# прежних версий, он тоже доприменяется при восстановлении
+WAL_PATTERN = "db_wal.*.json"
+WAL_FILE = "db_wal.json"
 
 # Поддерживаемые типы данных
 VALID_TYPES = ("int", "str", "bool")
+
+# Движок хранения таблиц по умолчанию ("json" или "log")
+DEFAULT_STORAGE = "log"
+# Минимальная длина журнала, после которой он сворачивается в снимок
+LOG_CHECKPOINT_MIN = 1000
+
+# Секционирование: разделитель в именах файлов секций (data/<table>#<n>.*)
+# и наибольшее число секций по хэшу
+PARTITION_SEP = "#"
+PARTITION_MAX_COUNT = 1024
+
+# Автоочистка (--auto-vacuum): порог доли устаревших версий строк
+# по умолчанию и минимальное их число, ради которого стоит очищать
+VACUUM_GARBAGE_RATIO = 0.5
+VACUUM_MIN_DEAD = 100
+
+# Максимальное число результатов SELECT в кэше
+SELECT_CACHE_SIZE = 128
+# Результаты длиннее этого числа строк не кэшируются
+SELECT_CACHE_MAX_ROWS = 10_000
+# Бюджет памяти буферного пула таблиц и метаданных (МБ, 0 — пул выключен)
+BUFFER_POOL_MB = 256
+
+# Вывод SELECT: строк на странице PrettyTable и в пачке потоковых форматов
+OUTPUT_PAGE_SIZE = 100
+# Форматы вывода select (см. модуль output)
+OUTPUT_FORMATS = ("table", "plain", "csv", "jsonl")
+OUTPUT_CHUNK_ROWS = 1000
+
+# Размер пачки строк при загрузке CSV
+CSV_CHUNK_SIZE = 10_000
+
+# Размер участка, которым поколоночный снимок читается при выборке
+SCAN_CHUNK_ROWS = 10_000
+
+# Параллельное сканирование поколоночных таблиц: минимальный размер
+# снимка, размер участка и число процессов (None — по числу ядер)
+PARALLEL_SCAN_MIN_ROWS = 200_000
+PARALLEL_SCAN_PARTITION_ROWS = 100_000
+PARALLEL_SCAN_WORKERS: int | None = None
+
+# Сетевой режим (database serve)
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 5544
+# Потоки, в которых выполняются команды сервера
+SERVER_WORKERS = 4
+# Максимальная длина строки команды в байтах
+SERVER_LINE_LIMIT = 16 * 1024 * 1024
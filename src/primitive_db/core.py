@@ -2,20 +2,36 @@
 Основная бизнес-логика базы данных: CRUD-операции и управление таблицами.
 """
 
-from typing import Any, Dict, List, Tuple
+import functools
+import heapq
+import itertools
+import operator
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
 
-from .constants import VALID_TYPES
+from . import compact, partitions, planner
+from .constants import DEFAULT_STORAGE, PARTITION_SEP, VALID_TYPES
+from .indexes import INDEX_KINDS, index_defs
+
+# Агрегатные функции SELECT
+AGGREGATE_FUNCTIONS = ("count", "sum", "min", "max", "avg")
 
 
 def create_table(
     metadata: Dict[str, Any],
     table_name: str,
-    columns: List[Tuple[str, str]]
+    columns: List[Tuple[str, str]],
+    partitioning: Tuple[str, str, int] | None = None
 ) -> Dict[str, Any]:
-    """Создает новую таблицу в метаданных с автоматическим ID."""
+    """Создает новую таблицу в метаданных с автоматическим ID.
+
+    partitioning — (вид, столбец, число) для секционированной таблицы,
+    см. ``partitions.make_spec``.
+    """
     if table_name in metadata:
         print(f'Ошибка: Таблица "{table_name}" уже существует.')
         return metadata
+    if PARTITION_SEP in table_name:
+        raise ValueError(f'Имя таблицы не может содержать "{PARTITION_SEP}".')
 
     # ID всегда идет первым и управляется системой
     full_columns = [{"name": "ID", "type": "int"}]
@@ -26,7 +42,60 @@ def create_table(
             raise ValueError(f"Некорректный тип: {col_type}.")
         full_columns.append({"name": name, "type": col_type})
 
-    metadata[table_name] = {"columns": full_columns}
+    table_meta = {
+        "columns": full_columns,
+        "storage": DEFAULT_STORAGE,
+        "last_id": 0,
+        "stats": compute_stats(full_columns, []),
+    }
+    if partitioning is not None:
+        table_meta["partitions"] = partitions.make_spec(full_columns, *partitioning)
+    metadata[table_name] = table_meta
+    return metadata
+
+
+def create_index(
+    metadata: Dict[str, Any],
+    table_name: str,
+    column: str,
+    kind: str = "hash"
+) -> Dict[str, Any]:
+    """Добавляет описание индекса по столбцу в метаданные."""
+    if table_name not in metadata:
+        raise KeyError(table_name)
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Некорректный вид индекса: {kind}.")
+    schema = metadata[table_name]["columns"]
+    col_info = next((c for c in schema if c["name"] == column), None)
+    if col_info is None:
+        raise KeyError(column)
+    if kind == "sorted" and col_info["type"] != "int":
+        raise ValueError("Упорядоченный индекс поддерживается только для int.")
+    indexed = [col for col, _ in index_defs(metadata[table_name])]
+    if column == "ID" or column in indexed:
+        raise ValueError(f'Столбец "{column}" уже проиндексирован.')
+    metadata[table_name].setdefault("indexes", []).append(
+        {"column": column, "type": kind}
+    )
+    return metadata
+
+
+def drop_index(
+    metadata: Dict[str, Any],
+    table_name: str,
+    column: str
+) -> Dict[str, Any]:
+    """Удаляет описание индекса по столбцу из метаданных."""
+    if table_name not in metadata:
+        raise KeyError(table_name)
+    entries = metadata[table_name].get("indexes", [])
+    remaining = [
+        e for e in entries
+        if (e if isinstance(e, str) else e["column"]) != column
+    ]
+    if len(remaining) == len(entries):
+        raise ValueError(f'Индекс по столбцу "{column}" не найден.')
+    metadata[table_name]["indexes"] = remaining
     return metadata
 
 
@@ -38,6 +107,92 @@ def drop_table(metadata: Dict[str, Any], table_name: str) -> Dict[str, Any]:
     return metadata
 
 
+def allocate_ids(
+    metadata: Dict[str, Any],
+    table_name: str,
+    table_data: List[Dict[str, Any]],
+    count: int = 1
+) -> int:
+    """Резервирует count ID из счетчика таблицы и возвращает первый из них.
+
+    Для таблиц, созданных до появления счетчика, он однократно
+    инициализируется максимальным существующим ID.
+    """
+    table_meta = metadata[table_name]
+    if "last_id" not in table_meta:
+        table_meta["last_id"] = max((r["ID"] for r in table_data), default=0)
+    first_id = table_meta["last_id"] + 1
+    table_meta["last_id"] += count
+    return first_id
+
+
+def next_id(
+    metadata: Dict[str, Any],
+    table_name: str,
+    table_data: List[Dict[str, Any]]
+) -> int:
+    """Выдает следующий ID из счетчика таблицы в метаданных."""
+    return allocate_ids(metadata, table_name, table_data, 1)
+
+
+def _validate_value(col: Dict[str, str], val: Any) -> None:
+    """Проверяет соответствие значения типу столбца."""
+    if col["type"] == "int" and not isinstance(val, int):
+        raise ValueError(f"Некорректное значение: {val}. Ожидался int.")
+    if col["type"] == "bool" and not isinstance(val, bool):
+        raise ValueError(f"Некорректное значение: {val}. Ожидался bool.")
+
+
+def insert_rows(
+    metadata: Dict[str, Any],
+    table_name: str,
+    rows_values: List[List[Any]],
+    table_data: List[Dict[str, Any]]
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Добавляет пачку записей: сначала проверяет все, затем выдает ID разом.
+
+    Возвращает таблицу и список добавленных строк. При ошибке в любой
+    записи пачка не добавляется целиком.
+    """
+    schema = metadata[table_name]["columns"]
+    non_id_cols = [c for c in schema if c["name"] != "ID"]
+    # Проверяются типы, отличные от str; значения str-столбцов приводятся
+    # к строке, чтобы столбец не смешивал строки с числами
+    typed_cols = [
+        (i, c) for i, c in enumerate(non_id_cols) if c["type"] in ("int", "bool")
+    ]
+    str_cols = [i for i, c in enumerate(non_id_cols) if c["type"] == "str"]
+
+    checked = []
+    for values in rows_values:
+        if len(values) != len(non_id_cols):
+            raise ValueError("Некорректное количество значений.")
+        for i, col in typed_cols:
+            _validate_value(col, values[i])
+        if any(not isinstance(values[i], str) for i in str_cols):
+            values = list(values)
+            for i in str_cols:
+                values[i] = planner.as_str(values[i])
+        checked.append(values)
+    rows_values = checked
+
+    first_id = allocate_ids(metadata, table_name, table_data, len(rows_values))
+    # ID — первый столбец схемы, остальные значения идут в порядке схемы
+    make_row = compact.row_factory(schema, table_data)
+    new_rows = [
+        make_row(row_id, *values)
+        for row_id, values in enumerate(rows_values, start=first_id)
+    ]
+    stats = table_stats(metadata, table_name, table_data)
+    table_data.extend(new_rows)
+    stats["rows"] += len(new_rows)
+    _extend_bounds(stats, new_rows, [c["name"] for c in schema])
+    spec = metadata[table_name].get("partitions")
+    if spec is not None:
+        partitions.add_rows(spec, new_rows)
+    return table_data, new_rows
+
+
 def insert_row(
     metadata: Dict[str, Any],
     table_name: str,
@@ -45,39 +200,133 @@ def insert_row(
     table_data: List[Dict[str, Any]]
 ) -> Tuple[List[Dict[str, Any]], int]:
     """Добавляет новую запись с валидацией типов."""
-    schema = metadata[table_name]["columns"]
-    non_id_cols = [c for c in schema if c["name"] != "ID"]
+    table_data, new_rows = insert_rows(metadata, table_name, [values], table_data)
+    return table_data, new_rows[0]["ID"]
 
-    if len(values) != len(non_id_cols):
-        raise ValueError("Некорректное количество значений.")
 
-    new_id = max([r["ID"] for r in table_data], default=0) + 1
-    new_row = {"ID": new_id}
-
-    for col, val in zip(non_id_cols, values):
-        # Проверка типов данных
-        if col["type"] == "int" and not isinstance(val, int):
-            raise ValueError(f"Некорректное значение: {val}. Ожидался int.")
-        if col["type"] == "bool" and not isinstance(val, bool):
-            raise ValueError(f"Некорректное значение: {val}. Ожидался bool.")
-        new_row[col["name"]] = val
+def find_rows(
+    table_data: List[Dict[str, Any]],
+    where_clause: Any = None,
+    indexes: Dict[str, Any] = None
+) -> List[Dict[str, Any]]:
+    """Находит строки по условию WHERE, используя индексы, если они есть.
 
-    table_data.append(new_row)
-    return table_data, new_id
+    Условие — готовый план (planner.Plan), словарь равенств или дерево
+    из модуля conditions; в двух последних случаях план строится здесь.
+    """
+    if not where_clause:
+        return table_data
+    plan = where_clause
+    if not isinstance(plan, planner.Plan):
+        plan = planner.plan_where(where_clause, indexes)
+    return plan.find(table_data, indexes)
 
 
 def select_rows(
     table_data: List[Dict[str, Any]],
-    where_clause: Dict[str, Any] = None
+    where_clause: Any = None,
+    indexes: Dict[str, Any] = None
 ) -> List[Dict[str, Any]]:
     """Фильтрует записи по условию WHERE."""
+    return find_rows(table_data, where_clause, indexes)
+
+
+def iter_rows(
+    table_data: List[Dict[str, Any]],
+    where_clause: Any = None,
+    indexes: Dict[str, Any] = None
+) -> Iterator[Dict[str, Any]]:
+    """Потоковый вариант select_rows: строки выдаются по мере проверки."""
     if not where_clause:
-        return table_data
+        return iter(table_data)
+    plan = where_clause
+    if not isinstance(plan, planner.Plan):
+        plan = planner.plan_where(where_clause, indexes)
+    return plan.iter_find(table_data, indexes)
+
+
+def order_rows(
+    rows: Iterable[Dict[str, Any]],
+    order_by: List[Tuple[str, bool]],
+    limit: int | None = None,
+    offset: int = 0
+) -> Iterator[Dict[str, Any]]:
+    """Сортирует (order by) и обрезает (limit/offset) поток строк.
+
+    Без order by строки не накапливаются, а поток прерывается после
+    limit строк. С order by и limit хранятся только offset + limit
+    лучших строк (heapq), без limit поток сортируется целиком.
+    """
+    stop = None if limit is None else offset + limit
+    if not order_by:
+        return itertools.islice(rows, offset, stop)
+
+    if len({desc for _, desc in order_by}) == 1:
+        names = [col for col, _ in order_by]
+        key = operator.itemgetter(*names)
+        reverse = order_by[0][1]
+    else:
+        key = functools.cmp_to_key(_row_comparator(order_by))
+        reverse = False
+    if stop is None:
+        ordered = sorted(rows, key=key, reverse=reverse)
+    elif reverse:
+        ordered = heapq.nlargest(stop, rows, key=key)
+    else:
+        ordered = heapq.nsmallest(stop, rows, key=key)
+    return itertools.islice(ordered, offset, None)
 
-    return [
-        row for row in table_data
-        if all(row.get(k) == v for k, v in where_clause.items())
-    ]
+
+def _row_comparator(order_by: List[Tuple[str, bool]]) -> Callable[..., int]:
+    """Сравнение строк по столбцам с разным направлением сортировки."""
+    def compare(left: Dict[str, Any], right: Dict[str, Any]) -> int:
+        for col, desc in order_by:
+            a, b = left[col], right[col]
+            if a != b:
+                result = -1 if a < b else 1
+                return -result if desc else result
+        return 0
+    return compare
+
+
+def build_hash(rows: Iterable[Dict[str, Any]], column: str) -> Dict[Any, List[Any]]:
+    """Хэш-таблица значение столбца -> строки (для hash join)."""
+    table: Dict[Any, List[Any]] = {}
+    for row in rows:
+        value = row[column]
+        if value is not None:
+            table.setdefault(value, []).append(row)
+    return table
+
+
+def hash_join(
+    probe: Iterable[Dict[str, Any]],
+    column: str,
+    matches: Callable[[Any], Iterable[Dict[str, Any]]],
+) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Пары (строка probe, строка другой стороны) с равными значениями.
+
+    matches по значению столбца возвращает подходящие строки другой
+    стороны: из хэш-таблицы build_hash или через индекс.
+    """
+    for row in probe:
+        value = row[column]
+        if value is None:
+            continue
+        for other in matches(value):
+            yield row, other
+
+
+def merge_rows(
+    left_name: str,
+    left: Dict[str, Any],
+    right_name: str,
+    right: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Строка результата join: столбцы обеих строк с именами таблиц."""
+    row = {f"{left_name}.{k}": v for k, v in left.items()}
+    row.update({f"{right_name}.{k}": v for k, v in right.items()})
+    return row
 
 
 def update_rows(
@@ -85,23 +334,34 @@ def update_rows(
     table_name: str,
     table_data: List[Dict[str, Any]],
     set_clause: Dict[str, Any],
-    where_clause: Dict[str, Any]
+    where_clause: Any,
+    indexes: Dict[str, Any] = None
 ) -> Tuple[List[Dict[str, Any]], List[int]]:
     """Обновляет значения в строках, подходящих под условие."""
-    schema = metadata[table_name]["columns"]
-    updated_ids = []
+    if isinstance(where_clause, planner.Plan) and where_clause.assignments:
+        assignments = where_clause.assignments
+    else:
+        # Типы проверяются один раз, а не для каждой найденной строки
+        types = {c["name"]: c["type"] for c in metadata[table_name]["columns"]}
+        assignments = planner.validate_assignments(types, set_clause)
+    spec = metadata[table_name].get("partitions")
+    if spec is not None:
+        partitions.check_assignments(spec, assignments)
 
-    for row in table_data:
-        # Проверяем условие WHERE
-        if all(row.get(k) == v for k, v in where_clause.items()):
-            for col_name, new_val in set_clause.items():
-                # Валидация типа для обновляемого поля
-                col_info = next(c for c in schema if c["name"] == col_name)
-                if col_info["type"] == "int" and not isinstance(new_val, int):
-                    raise ValueError(f"Ожидался int для {col_name}")
-                row[col_name] = new_val
-            updated_ids.append(row["ID"])
+    stats = table_stats(metadata, table_name, table_data)
+    updated_ids = []
+    updated_rows = []
+    stale = set()
+    for row in find_rows(table_data, where_clause, indexes):
+        stale.update(_touched_bounds(stats, row, assignments))
+        row.update(assignments)
+        updated_ids.append(row["ID"])
+        updated_rows.append(row)
 
+    _forget_bounds(stats, stale)
+    _extend_bounds(stats, updated_rows, list(assignments))
+    if spec is not None:
+        partitions.widen(spec, updated_rows, list(assignments))
     return table_data, updated_ids
 
 
@@ -109,37 +369,292 @@ def delete_rows(
     metadata: Dict[str, Any],
     table_name: str,
     table_data: List[Dict[str, Any]],
-    where_clause: Dict[str, Any]
+    where_clause: Any,
+    indexes: Dict[str, Any] = None
 ) -> Tuple[List[Dict[str, Any]], List[int]]:
     """Удаляет строки, подходящие под условие."""
     if table_name not in metadata:
         raise KeyError(table_name)
 
-    new_data = []
-    deleted_ids = []
+    found = find_rows(table_data, where_clause, indexes)
+    deleted_ids = [row["ID"] for row in found]
+    if not deleted_ids:
+        return table_data, deleted_ids
 
-    for row in table_data:
-        if all(row.get(k) == v for k, v in where_clause.items()):
-            deleted_ids.append(row["ID"])
-        else:
-            new_data.append(row)
+    stats = table_stats(metadata, table_name, table_data)
+    stale = set()
+    for row in found:
+        stale.update(_touched_bounds(stats, row))
 
+    deleted = set(deleted_ids)
+    if table_data and isinstance(table_data[0], compact.Record):
+        # Чтение ячейки записи напрямую быстрее, чем row["ID"]
+        new_data = [row for row in table_data if row.ID not in deleted]
+    else:
+        new_data = [row for row in table_data if row["ID"] not in deleted]
+    stats["rows"] -= len(deleted_ids)
+    # Загруженные строки секционированной таблицы — лишь часть ее секций
+    if stats["rows"] > 0:
+        _forget_bounds(stats, stale)
+    else:
+        stats.update(compute_stats(metadata[table_name]["columns"], []))
+    spec = metadata[table_name].get("partitions")
+    if spec is not None:
+        partitions.remove_rows(spec, found)
     return new_data, deleted_ids
 
 
 def get_table_info(
     metadata: Dict[str, Any],
     table_name: str,
-    table_data: List[Dict[str, Any]]
+    table_data: List[Dict[str, Any]] | None = None,
+    part_sizes: List[int] | None = None
 ) -> str:
-    """Формирует строковую информацию о таблице."""
+    """Формирует строковую информацию о таблице.
+
+    Число записей и диапазоны значений берутся из статистики
+    в метаданных; строки нужны только для таблиц без нее.
+    part_sizes — размеры файлов секций секционированной таблицы.
+    """
     if table_name not in metadata:
         raise KeyError(table_name)
 
     schema = metadata[table_name]["columns"]
+    stats = metadata[table_name].get("stats")
+    if stats is None:
+        stats = compute_stats(schema, table_data or [])
     cols_str = ", ".join(f"{c['name']}:{c['type']}" for c in schema)
-    return (
-        f"Таблица: {table_name}\n"
-        f"Столбцы: {cols_str}\n"
-        f"Количество записей: {len(table_data)}"
-    )
+    lines = [
+        f"Таблица: {table_name}",
+        f"Столбцы: {cols_str}",
+        f"Количество записей: {stats['rows']}",
+    ]
+    ranges = [
+        f"{c['name']} {stats['min'][c['name']]}..{stats['max'][c['name']]}"
+        for c in schema
+        if c["type"] == "int" and c["name"] in stats["min"]
+    ]
+    if ranges:
+        lines.append(f"Диапазоны значений: {', '.join(ranges)}")
+    vacuum = metadata[table_name].get("vacuum")
+    if vacuum is not None:
+        lines.append(
+            f"Последняя очистка: {vacuum['size_before']} -> "
+            f"{vacuum['size_after']} байт"
+        )
+    spec = metadata[table_name].get("partitions")
+    if spec is not None:
+        lines.append(f"Секции {partitions.label(spec)}: {len(spec['parts'])}")
+        sizes = part_sizes or [0] * len(spec["parts"])
+        for number, (part, size) in enumerate(zip(spec["parts"], sizes)):
+            lines.append(f"  #{number}: записей {part['rows']}, {size} байт")
+    return "\n".join(lines)
+
+
+def compute_stats(
+    schema: List[Dict[str, str]],
+    table_data: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Число строк и минимум/максимум каждого столбца за один проход."""
+    stats: Dict[str, Any] = {
+        "rows": len(table_data), "min": {}, "max": {}, "stale": [],
+    }
+    _extend_bounds(stats, table_data, [c["name"] for c in schema])
+    return stats
+
+
+def table_stats(
+    metadata: Dict[str, Any],
+    table_name: str,
+    table_data: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Статистика таблицы из метаданных.
+
+    Для таблиц, созданных до ее появления, она однократно
+    вычисляется по строкам и дальше поддерживается изменениями.
+    """
+    table_meta = metadata[table_name]
+    if "stats" not in table_meta:
+        table_meta["stats"] = compute_stats(table_meta["columns"], table_data)
+    return table_meta["stats"]
+
+
+def _extend_bounds(
+    stats: Dict[str, Any],
+    rows: Iterable[Dict[str, Any]],
+    columns: List[str]
+) -> None:
+    """Расширяет минимумы и максимумы столбцов значениями строк."""
+    low, high = stats["min"], stats["max"]
+    columns = [c for c in columns if c not in stats["stale"]]
+    for row in rows:
+        for col in columns:
+            value = row[col]
+            if col not in low or value < low[col]:
+                low[col] = value
+            if col not in high or value > high[col]:
+                high[col] = value
+
+
+def _touched_bounds(
+    stats: Dict[str, Any],
+    row: Dict[str, Any],
+    new_values: Dict[str, Any] | None = None
+) -> List[str]:
+    """Столбцы, чей минимум или максимум может уйти вместе со значением строки.
+
+    new_values — присваивания UPDATE; None означает удаление строки.
+    """
+    columns = row if new_values is None else new_values
+    return [
+        col for col in columns
+        if (new_values is None or new_values[col] != row[col])
+        and row[col] in (stats["min"].get(col), stats["max"].get(col))
+    ]
+
+
+def _forget_bounds(stats: Dict[str, Any], columns: Iterable[str]) -> None:
+    """Помечает минимум и максимум столбцов неизвестными.
+
+    Пересчет потребовал бы прохода по всей таблице при каждом удалении,
+    поэтому такие столбцы вычисляются по строкам, пока их границы
+    не пересчитает refresh_bounds.
+    """
+    for col in columns:
+        stats["min"].pop(col, None)
+        stats["max"].pop(col, None)
+        if col not in stats["stale"]:
+            stats["stale"].append(col)
+
+
+def refresh_bounds(stats: Dict[str, Any], rows: Iterable[Dict[str, Any]]) -> bool:
+    """Пересчитывает границы столбцов, помеченных stale, по всем строкам.
+
+    Возвращает False, если пересчитывать было нечего.
+    """
+    columns = stats.get("stale")
+    if not columns:
+        return False
+    stats["stale"] = []
+    _extend_bounds(stats, rows, columns)
+    return True
+
+
+def validate_aggregates(
+    schema: List[Dict[str, str]],
+    items: List[Tuple[str, str]],
+    group_by: str | None
+) -> None:
+    """Проверяет агрегатные функции и столбец группировки по схеме."""
+    types = {c["name"]: c["type"] for c in schema}
+    if group_by is not None and group_by not in types:
+        raise KeyError(group_by)
+    if not any(func for func, _ in items):
+        raise ValueError("Нужна хотя бы одна функция: count, sum, min, max, avg.")
+    for func, column in items:
+        if not func:
+            if column != group_by:
+                raise ValueError(
+                    f'Столбец "{column}" можно выбрать только при group by {column}.'
+                )
+            continue
+        if func not in AGGREGATE_FUNCTIONS:
+            raise ValueError(f"Неизвестная функция: {func}.")
+        if column == "*":
+            if func != "count":
+                raise ValueError(f"{func}(*) не поддерживается.")
+            continue
+        if column not in types:
+            raise KeyError(column)
+        if func in ("sum", "avg") and types[column] != "int":
+            raise ValueError(f"{func} применим только к столбцам int.")
+
+
+def aggregate_label(func: str, column: str) -> str:
+    """Заголовок столбца результата: count(*), sum(age) или имя столбца."""
+    return f"{func}({column})" if func else column
+
+
+def aggregate_rows(
+    table_data: Iterable[Dict[str, Any]],
+    items: List[Tuple[str, str]],
+    group_by: str | None = None
+) -> List[Dict[str, Any]]:
+    """Вычисляет агрегаты за один проход по строкам.
+
+    Для каждой группы хранятся только число строк, суммы, минимумы
+    и максимумы нужных столбцов. Без group by результат — одна строка,
+    с group by — строка на группу в порядке значений столбца.
+    """
+    sum_cols = sorted({c for f, c in items if f in ("sum", "avg")})
+    min_cols = sorted({c for f, c in items if f == "min"})
+    max_cols = sorted({c for f, c in items if f == "max"})
+
+    # Группа: [число строк, суммы, минимумы, максимумы]
+    groups: Dict[Any, list] = {}
+    for row in table_data:
+        key = row[group_by] if group_by is not None else None
+        acc = groups.get(key)
+        if acc is None:
+            acc = groups[key] = [0, dict.fromkeys(sum_cols, 0), {}, {}]
+        acc[0] += 1
+        sums, low, high = acc[1], acc[2], acc[3]
+        for col in sum_cols:
+            sums[col] += row[col]
+        for col in min_cols:
+            value = row[col]
+            if col not in low or value < low[col]:
+                low[col] = value
+        for col in max_cols:
+            value = row[col]
+            if col not in high or value > high[col]:
+                high[col] = value
+
+    if group_by is None and not groups:
+        groups[None] = [0, dict.fromkeys(sum_cols, 0), {}, {}]
+
+    result = []
+    for key in sorted(groups, key=lambda k: (k is None, k)):
+        count, sums, low, high = groups[key]
+        out = {}
+        for func, column in items:
+            label = aggregate_label(func, column)
+            if not func:
+                out[label] = key
+            elif func == "count":
+                out[label] = count
+            elif func == "sum":
+                out[label] = sums[column] if count else None
+            elif func == "avg":
+                out[label] = sums[column] / count if count else None
+            elif func == "min":
+                out[label] = low.get(column)
+            else:
+                out[label] = high.get(column)
+        result.append(out)
+    return result
+
+
+def aggregate_from_stats(
+    table_meta: Dict[str, Any],
+    items: List[Tuple[str, str]]
+) -> Dict[str, Any] | None:
+    """Агрегаты всей таблицы по статистике в метаданных, без чтения строк.
+
+    Подходит для count, min и max; если нужна другая функция или
+    статистики нет (в том числе для столбца), возвращает None.
+    """
+    stats = table_meta.get("stats")
+    if stats is None or any(
+        f not in ("count", "min", "max") or (f != "count" and c in stats["stale"])
+        for f, c in items
+    ):
+        return None
+    out = {}
+    for func, column in items:
+        label = aggregate_label(func, column)
+        if func == "count":
+            out[label] = stats["rows"]
+        else:
+            out[label] = stats[func].get(column)
+    return out
@@ -1,15 +1,43 @@
 """
 Декораторы для обработки ошибок, подтверждения действий,
-логирования времени выполнения и механизм кэширования через замыкания.
+замера времени выполнения и механизм кэширования через замыкания.
 """
 
 import functools
-import time
-from typing import Any, Callable, Dict
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator
+
+from . import metrics
 
 # Тип для декорируемых функций
 FuncType = Callable[..., Any]
 
+# Подтверждать опасные операции автоматически (флаг --yes)
+_AUTO_CONFIRM = False
+
+# Сообщение об ошибке последней команды в текущем потоке
+_errors = threading.local()
+
+
+def set_auto_confirm(enabled: bool) -> None:
+    """Включает или отключает автоматическое подтверждение операций."""
+    global _AUTO_CONFIRM
+    _AUTO_CONFIRM = enabled
+
+
+def report_error(message: str) -> None:
+    """Выводит сообщение об ошибке команды и запоминает его (см. take_error)."""
+    print(message)
+    _errors.message = message
+
+
+def take_error() -> str | None:
+    """Возвращает и сбрасывает ошибку последней команды текущего потока."""
+    message = getattr(_errors, "message", None)
+    _errors.message = None
+    return message
+
 
 def handle_db_errors(func: FuncType) -> FuncType:
     """Декоратор для обработки исключений БД."""
@@ -18,15 +46,15 @@ def handle_db_errors(func: FuncType) -> FuncType:
         try:
             return func(*args, **kwargs)
         except FileNotFoundError:
-            print("Ошибка: Файл данных не найден. "
+            report_error("Ошибка: Файл данных не найден. "
             "Возможно, база данных не инициализирована."
             )
         except KeyError as e:
-            print(f"Ошибка: Таблица или столбец {e} не найден.")
+            report_error(f"Ошибка: Таблица или столбец {e} не найден.")
         except ValueError as e:
-            print(f"Ошибка валидации: {e}")
+            report_error(f"Ошибка валидации: {e}")
         except Exception as e:
-            print(f"Произошла непредвиденная ошибка: {e}")
+            report_error(f"Произошла непредвиденная ошибка: {e}")
         return None
     return wrapper
 
@@ -36,8 +64,13 @@ def confirm_action(action_name: str) -> Callable[[FuncType], FuncType]:
     def decorator(func: FuncType) -> FuncType:
         @functools.wraps(func)
         def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _AUTO_CONFIRM:
+                return func(*args, **kwargs)
             prompt_text = f'Вы уверены, что хотите выполнить "{action_name}"? [y/n]: '
-            answer = input(prompt_text).strip().lower()
+            try:
+                answer = input(prompt_text).strip().lower()
+            except EOFError:
+                answer = ""
             if answer != "y":
                 print("Операция отменена.")
                 return None
@@ -46,28 +79,108 @@ def confirm_action(action_name: str) -> Callable[[FuncType], FuncType]:
     return decorator
 
 
-def log_time(func: FuncType) -> FuncType:
-    """Декоратор для замера времени выполнения функции."""
-    @functools.wraps(func)
-    def wrapper(*args: Any, **kwargs: Any) -> Any:
-        start = time.monotonic()
-        result = func(*args, **kwargs)
-        elapsed = time.monotonic() - start
-        print(f"Функция {func.__name__} выполнилась за {elapsed:.3f} секунд.")
-        return result
-    return wrapper
+def timed(command: str) -> Callable[[FuncType], FuncType]:
+    """Декоратор для замера времени выполнения команды по фазам.
+
+    Результаты копятся в гистограммах модуля metrics (команда stats).
+    """
+    def decorator(func: FuncType) -> FuncType:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with metrics.track(command):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
 
+def create_cacher(max_size: int = 128) -> Callable[..., Any]:
+    """Реализация LRU-кэша через замыкание.
 
-def create_cacher() -> Callable[[Any, Callable[[], Any]], Any]:
-    """Реализация кэширования через замыкание."""
-    cache: Dict[Any, Any] = {}
+    Записи группируются по таблицам: у каждой таблицы есть счетчик версий,
+    и ``invalidate(table)`` делает все ее закэшированные результаты
+    недействительными. Счетчики попаданий, промахов и вытеснений доступны
+    через ``stats()``. Кэш можно использовать из нескольких потоков.
+    """
+    cache: OrderedDict = OrderedDict()
+    versions: Dict[str, int] = {}
+    counters = {"hits": 0, "misses": 0, "evictions": 0}
+    lock = threading.Lock()
 
-    def cache_result(key: Any, value_func: Callable[[], Any]) -> Any:
+    def cache_result(
+        key: Hashable,
+        value_func: Callable[[], Any],
+        table: str = "",
+    ) -> Any:
         """Проверяет наличие результата в кэше."""
-        if key in cache:
-            return cache[key]
+        with lock:
+            full_key = (table, versions.get(table, 0), key)
+            if full_key in cache:
+                counters["hits"] += 1
+                cache.move_to_end(full_key)
+                return cache[full_key]
+            counters["misses"] += 1
+
         value = value_func()
-        cache[key] = value
+        store(full_key, value)
         return value
 
+    def store(full_key: tuple, value: Any) -> None:
+        with lock:
+            # Пока значение вычислялось, таблица могла измениться
+            if versions.get(full_key[0], 0) != full_key[1]:
+                return
+            cache[full_key] = value
+            if len(cache) > max_size:
+                cache.popitem(last=False)
+                counters["evictions"] += 1
+
+    def invalidate(table: str) -> None:
+        """Увеличивает версию таблицы и удаляет ее результаты из кэша."""
+        with lock:
+            versions[table] = versions.get(table, 0) + 1
+            for full_key in [k for k in cache if k[0] == table]:
+                del cache[full_key]
+
+    def stats() -> Dict[str, int]:
+        """Возвращает счетчики кэша."""
+        with lock:
+            return {**counters, "size": len(cache), "max_size": max_size}
+
+    def stream(
+        key: Hashable,
+        rows_func: Callable[[], Iterable[Any]],
+        table: str = "",
+        max_rows: int = 0,
+    ) -> Iterator[Any]:
+        """Выдает строки результата по мере их вычисления.
+
+        Результат запоминается, только если поток прочитан до конца
+        и в нем не больше max_rows строк.
+        """
+        with lock:
+            full_key = (table, versions.get(table, 0), key)
+            if full_key in cache:
+                counters["hits"] += 1
+                cache.move_to_end(full_key)
+                cached = cache[full_key]
+            else:
+                counters["misses"] += 1
+                cached = None
+        if cached is not None:
+            yield from cached
+            return
+
+        buffer: list | None = []
+        for row in rows_func():
+            if buffer is not None:
+                buffer.append(row)
+                if len(buffer) > max_rows:
+                    buffer = None
+            yield row
+        if buffer is not None:
+            store(full_key, buffer)
+
+    cache_result.invalidate = invalidate
+    cache_result.stats = stats
+    cache_result.stream = stream
     return cache_result
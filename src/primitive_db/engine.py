@@ -2,29 +2,127 @@
 Модуль отвечает за запуск, цикл и парсинг команд.
 """
 
+import contextlib
+import itertools
 import shlex
-
-import prompt
-from prettytable import PrettyTable
-
-from . import core
+import sys
+import threading
+from typing import Callable, Iterable, Iterator
+
+from . import (
+    core,
+    indexes,
+    metrics,
+    output,
+    partitions,
+    planner,
+    statements,
+    vacuum,
+)
 from . import parser as db_parser
-from .constants import META_FILE
+from .constants import CSV_CHUNK_SIZE, SELECT_CACHE_MAX_ROWS, SELECT_CACHE_SIZE
 from .decorators import (
     confirm_action,
     create_cacher,
     handle_db_errors,
-    log_time,
+    report_error,
+    timed,
 )
-from .utils import (
-    load_metadata,
-    load_table_data,
-    save_metadata,
-    save_table_data,
+from .session import Session
+from .storage import (
+    PartitionedStorage,
+    convert_table,
+    delete_record,
+    get_storage,
+    insert_record,
+    update_record,
 )
+from .utils import BUFFER_POOL
 
 # Кэш для операций SELECT (реализация через замыкание)
-SELECT_CACHE = create_cacher()
+SELECT_CACHE = create_cacher(SELECT_CACHE_SIZE)
+
+# Загруженные метаданные и таблицы текущей сессии
+SESSION = Session()
+
+# Подготовленные команды (prepare) по именам
+PREPARED: dict[str, planner.Prepared] = {}
+# Подготовленные команды соединения сервера, выполняемого в этом потоке
+_connection = threading.local()
+
+
+def prepared_statements() -> dict[str, planner.Prepared]:
+    """Подготовленные команды текущего соединения сервера или сеанса."""
+    return getattr(_connection, "prepared", PREPARED)
+
+
+@contextlib.contextmanager
+def prepared_scope(prepared: dict[str, planner.Prepared]) -> Iterator[None]:
+    """Команды потока видят и создают подготовленные команды из prepared."""
+    _connection.prepared = prepared
+    try:
+        yield
+    finally:
+        del _connection.prepared
+
+
+def select_cache_key(table_name: str, where_clause) -> tuple:
+    """Нормализованный ключ SELECT: не зависит от регистра и пробелов во вводе.
+
+    В ключ входит состояние файлов таблицы, поэтому запись другим
+    процессом делает закэшированные результаты недействительными.
+    """
+    stamp = SESSION.data_stamp(table_name)
+    if not where_clause:
+        return (table_name, stamp)
+    return (table_name, stamp, repr(where_clause))
+
+
+def parse_command(user_input: str | statements.Statement) -> statements.Statement:
+    """Разбирает текст команды в дерево (готовое дерево возвращается как есть)."""
+    if not isinstance(user_input, str):
+        return user_input
+    with metrics.phase("parse"):
+        return db_parser.parse_statement(user_input)
+
+
+def plan_command(
+    statement: statements.Statement,
+    for_write: bool = False,
+    prepared: planner.Prepared | None = None,
+) -> planner.Plan:
+    """Строит план команды select/update/delete.
+
+    При for_write до построения плана захватывается блокировка писателя
+    таблицы, чтобы план опирался на актуальные метаданные. Подготовленная
+    команда берет типы и индексы из своего шаблона плана.
+    """
+    if isinstance(statement, statements.Insert):
+        raise ValueError("explain поддерживает только select, update и delete.")
+    if for_write:
+        SESSION.begin_write(statement.table)
+    with metrics.phase("parse"):
+        if prepared is not None:
+            template = prepared.template(SESSION.metadata)
+        else:
+            template = planner.PlanTemplate(
+                SESSION.metadata, statement.keyword, statement.table
+            )
+        assignments = (
+            dict(statement.assignments)
+            if isinstance(statement, statements.Update) else None
+        )
+        return template.plan(statement.where, assignments)
+
+
+def write_changes(
+    table_name: str,
+    records: list[dict],
+    rows: list[dict] | None = None,
+) -> None:
+    """Регистрирует изменения таблицы в сессии и сбрасывает кэш SELECT."""
+    SESSION.write(table_name, records, rows)
+    SELECT_CACHE.invalidate(table_name)
 
 
 def print_help() -> None:
@@ -32,18 +130,41 @@ def print_help() -> None:
     print("\n***Процесс работы с таблицей***")
     print("Функции:")
     print("<command> create_table <имя_таблицы> <столбец1:тип> .. - создать таблицу")
+    print("    [partition by range <строк> | partition by hash <столбец> <секций>]"
+          " - с секциями")
     print("<command> list_tables - показать список всех таблиц")
     print("<command> drop_table <имя_таблицы> - удалить таблицу")
+    print("<command> create_index <имя_таблицы> <столбец> [hash|sorted] - индекс")
+    print("<command> drop_index <имя_таблицы> <столбец> - удалить индекс")
+    print("<command> convert_table <имя_таблицы> <json|log|columnar> - формат")
+    print("<command> vacuum <имя_таблицы> - сжать файлы таблицы и перестроить индексы")
 
     print("\n***Операции с данными***")
     msg_insert = "<command> insert into <имя_таблицы> values (<значение1>, ..)"
     print(f"{msg_insert} - создать запись.")
+    print("<command> insert into <имя_таблицы> values (..), (..) - создать записи.")
+    print("<command> load_csv <имя_таблицы> <файл> - загрузить записи из CSV.")
     print("<command> select from <имя_таблицы> where <столбец> = <значение>")
+    print("    условия: = != < > <= >=, in (..), and, or и скобки")
     print("<command> select from <имя_таблицы> - прочитать все записи.")
+    print("<command> select count(*), sum(<столбец>) from <имя_таблицы> [where ..]")
+    print("    [group by <столбец>] - агрегаты: count, sum, min, max, avg")
+    print("<command> select .. [order by <столбец> [desc], ..] [limit N] [offset M]")
+    print("<command> select [a.x, b.y] from <a> join <b> on <a>.<столбец> = "
+          "<b>.<столбец> [where ..] - соединение таблиц")
+    print("<command> output <table|plain|csv|jsonl> [строк] - формат вывода select")
     msg_upd = "<command> update <имя_таблицы> set <столб1> = <знач1> where .."
     print(f"{msg_upd} - обновить запись.")
     print("<command> delete from <имя_таблицы> where <столбец> = <значение>")
     print("<command> info <имя_таблицы> - вывести информацию о таблице.")
+    print("<command> cache_stats - статистика кэша select и буферного пула.")
+    print("<command> explain <команда> - показать план select/update/delete.")
+    print("<command> prepare <имя> as <команда с параметрами ?> - подготовить команду")
+    print("<command> execute <имя> (<знач1>, ..) - выполнить подготовленную команду")
+    print("<command> begin - начать транзакцию (изменения копятся в памяти).")
+    print("<command> commit - зафиксировать транзакцию или изменения пакетного режима.")
+    print("<command> rollback - отменить изменения транзакции.")
+    print("<command> stats [reset] - время выполнения команд по фазам.")
 
     print("\nОбщие команды:")
     print("<command> exit - выйти из программы")
@@ -59,97 +180,418 @@ def welcome() -> None:
 
 
 @handle_db_errors
+@timed("create_table")
 def handle_create_table(tokens: list[str]) -> None:
     """Обработчик команды создания таблицы."""
     if len(tokens) < 3:
         raise ValueError("Некорректное значение. Попробуйте снова.")
 
     table_name = tokens[1]
-    columns = db_parser.parse_columns(tokens[2:])
+    with metrics.phase("parse"):
+        column_tokens, partitioning = db_parser.parse_partitioning(tokens[2:])
+        columns = db_parser.parse_columns(column_tokens)
 
-    metadata = load_metadata(META_FILE)
-    metadata = core.create_table(metadata, table_name, columns)
-    save_metadata(META_FILE, metadata)
+    SESSION.begin_write(table_name)
+    with metrics.phase("execute"):
+        metadata = core.create_table(
+            SESSION.metadata, table_name, columns, partitioning
+        )
+    SESSION.save_metadata(table_name)
 
     cols_info = metadata[table_name]["columns"]
     cols_str = ", ".join(f"{c['name']}:{c['type']}" for c in cols_info)
     print(f'Таблица "{table_name}" успешно создана со столбцами: {cols_str}')
+    spec = metadata[table_name].get("partitions")
+    if spec is not None:
+        print(f"Секционирование {partitions.label(spec)}.")
 
 
 @handle_db_errors
 @confirm_action("удаление таблицы")
+@timed("drop_table")
 def handle_drop_table(tokens: list[str]) -> None:
     """Обработчик команды удаления таблицы."""
     if len(tokens) != 2:
         raise ValueError("Нужно указать имя таблицы.")
 
+    _forbid_in_transaction("drop_table")
     table_name = tokens[1]
-    metadata = load_metadata(META_FILE)
-    metadata = core.drop_table(metadata, table_name)
-    save_metadata(META_FILE, metadata)
+    # Изменение схемы неявно фиксирует накопленные изменения
+    SESSION.flush()
+    SESSION.begin_write(table_name)
+    SESSION.forget(table_name)
+    metadata = SESSION.metadata
+    storage = get_storage(metadata, table_name)
+    indexes.drop_indexes(metadata, table_name)
+    core.drop_table(metadata, table_name)
+    SESSION.save_metadata(table_name)
+    SESSION.flush()
+    storage.drop(table_name)
+    SELECT_CACHE.invalidate(table_name)
     print(f'Таблица "{table_name}" успешно удалена.')
 
 
+@handle_db_errors
+@timed("create_index")
+def handle_create_index(tokens: list[str]) -> None:
+    """Обработчик команды создания индекса (hash или sorted)."""
+    if len(tokens) not in (3, 4):
+        raise ValueError(
+            "Используйте: create_index <имя_таблицы> <столбец> [hash|sorted]"
+        )
+
+    _forbid_in_transaction("create_index")
+    table_name, column = tokens[1], tokens[2]
+    kind = tokens[3].lower() if len(tokens) == 4 else "hash"
+    SESSION.begin_write(table_name)
+    # Таблица загружается до изменения схемы, поэтому индекс строится здесь
+    state = SESSION.table(table_name)
+    core.create_index(SESSION.metadata, table_name, column, kind)
+    SESSION.flush()
+    index = indexes.make_index(table_name, column, kind)
+    with metrics.phase("execute"):
+        state.indexes[column] = index.build(state.rows)
+    SESSION.save_metadata(table_name)
+    SESSION.flush()
+    print(f'Индекс ({kind}) по столбцу "{column}" таблицы "{table_name}" создан.')
+
+
+@handle_db_errors
+@timed("drop_index")
+def handle_drop_index(tokens: list[str]) -> None:
+    """Обработчик команды удаления индекса."""
+    if len(tokens) != 3:
+        raise ValueError("Используйте: drop_index <имя_таблицы> <столбец>")
+
+    _forbid_in_transaction("drop_index")
+    table_name, column = tokens[1], tokens[2]
+    SESSION.begin_write(table_name)
+    core.drop_index(SESSION.metadata, table_name, column)
+    SESSION.save_metadata(table_name)
+    SESSION.flush()
+    SESSION.forget(table_name)
+    indexes.HashIndex(table_name, column).drop()
+    print(f'Индекс по столбцу "{column}" таблицы "{table_name}" удален.')
+
+
+@handle_db_errors
+@timed("convert_table")
+def handle_convert_table(tokens: list[str]) -> None:
+    """Переводит таблицу в другой формат хранения (json, log, columnar)."""
+    if len(tokens) != 3:
+        raise ValueError("Используйте: convert_table <имя_таблицы> <формат>")
+
+    _forbid_in_transaction("convert_table")
+    table_name, storage_name = tokens[1], tokens[2]
+    SESSION.flush()
+    SESSION.begin_write(table_name)
+    SESSION.forget(table_name)
+    convert_table(SESSION.metadata, table_name, storage_name)
+    SESSION.save_metadata(table_name)
+    SESSION.flush()
+    print(f'Таблица "{table_name}" переведена в формат {storage_name}.')
+
+
+@handle_db_errors
+@timed("vacuum")
+def handle_vacuum(tokens: list[str]) -> None:
+    """Перезаписывает таблицу и ее индексы без устаревших версий строк."""
+    if len(tokens) != 2:
+        raise ValueError("Используйте: vacuum <имя_таблицы>")
+
+    _forbid_in_transaction("vacuum")
+    table_name = tokens[1]
+    SESSION.flush()
+    SESSION.begin_write(table_name)
+    SESSION.forget(table_name)
+    with metrics.phase("execute"):
+        report = vacuum.vacuum_table(SESSION.metadata, table_name)
+    SESSION.save_metadata(table_name)
+    SESSION.flush()
+    print(vacuum.format_report(report))
+
+
+def print_auto_vacuum() -> None:
+    """Выводит итоги фоновых очисток, завершившихся с прошлой команды."""
+    for report in vacuum.finished():
+        if "error" in report:
+            print(f'Автоочистка таблицы "{report["table"]}" не удалась: '
+                  f'{report["error"]}')
+        else:
+            print(f"Автоочистка. {vacuum.format_report(report)}")
+
+
 @handle_db_errors
 def handle_list_tables() -> None:
     """Выводит список таблиц."""
-    metadata = load_metadata(META_FILE)
+    metadata = SESSION.metadata
     if not metadata:
         print("Таблиц пока нет.")
         return
-    for name in metadata:
+    for name in list(metadata):
         print(f"- {name}")
 
 
 @handle_db_errors
-@log_time
-def handle_insert(user_input: str) -> None:
-    """Добавляет запись в таблицу."""
-    table_name, values = db_parser.parse_insert_command(user_input)
-    metadata = load_metadata(META_FILE)
-    table_data = load_table_data(table_name)
-
-    table_data, new_id = core.insert_row(metadata, table_name, values, table_data)
-    save_table_data(table_name, table_data)
-    print(f'Запись с ID={new_id} успешно добавлена в таблицу "{table_name}".')
+@timed("insert")
+def handle_insert(
+    user_input: str | statements.Insert,
+    prepared: planner.Prepared | None = None,
+) -> None:
+    """Добавляет одну или несколько записей в таблицу."""
+    statement = parse_command(user_input)
+    table_name, rows_values = statement.table, statement.rows
+    SESSION.begin_write(table_name)
+    # Секции секционированной таблицы не загружаются: строки дописываются
+    state = SESSION.table(table_name, parts=())
+
+    with metrics.phase("execute"):
+        _, new_rows = core.insert_rows(
+            SESSION.metadata, table_name, rows_values, state.rows
+        )
+    # Счетчик ID сохраняется до записи строк, чтобы ID не выдался повторно
+    SESSION.save_metadata(table_name)
+    write_changes(table_name, [insert_record(r) for r in new_rows])
+
+    ids_str = ", ".join(str(r["ID"]) for r in new_rows)
+    print(f'Запись с ID={ids_str} успешно добавлена в таблицу "{table_name}".')
 
 
 @handle_db_errors
-@log_time
-def handle_select(user_input: str) -> None:
-    """Выбирает и выводит данные с использованием PrettyTable и кэша."""
-    table_name, where_clause = db_parser.parse_select_command(user_input)
+@timed("load_csv")
+def handle_load_csv(tokens: list[str]) -> None:
+    """Потоково загружает строки из CSV-файла пачками по CSV_CHUNK_SIZE.
+
+    Первая строка файла считается заголовком, если совпадает с именами
+    столбцов таблицы (столбец ID в файле игнорируется).
+    """
+    if len(tokens) != 3:
+        raise ValueError("Используйте: load_csv <имя_таблицы> <файл>")
+
+    # csv нужен только этой команде
+    import csv
+
+    table_name, path = tokens[1], tokens[2]
+    SESSION.begin_write(table_name)
+    state = SESSION.table(table_name, parts=())
+    schema = SESSION.metadata[table_name]["columns"]
+    names = [c["name"] for c in schema if c["name"] != "ID"]
+
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        first = next(reader, None)
+        if first is None:
+            print("Файл пуст.")
+            return
+
+        header = [h.strip() for h in first]
+        if set(names) <= set(header):
+            positions = [header.index(n) for n in names]
+            pending_rows = []
+        else:
+            positions = list(range(len(names)))
+            pending_rows = [first]
+        types = [c["type"] for c in schema if c["name"] != "ID"]
+
+        total = 0
+        for chunk in _chunks(itertools.chain(pending_rows, reader), CSV_CHUNK_SIZE):
+            with metrics.phase("parse"):
+                rows_values = _convert_csv_rows(chunk, positions, types, total + 1)
+
+            with metrics.phase("execute"):
+                _, new_rows = core.insert_rows(
+                    SESSION.metadata, table_name, rows_values, state.rows
+                )
+            SESSION.save_metadata(table_name)
+            write_changes(table_name, [insert_record(r) for r in new_rows])
+            total += len(new_rows)
+
+    print(f'Загружено записей: {total} в таблицу "{table_name}".')
+
+
+def _convert_csv_rows(
+    chunk: list[list[str]],
+    positions: list[int],
+    types: list[str],
+    first_line: int,
+) -> list[list]:
+    """Приводит поля строк CSV к типам столбцов."""
+    rows_values = []
+    for line_no, raw in enumerate(chunk, start=first_line):
+        if len(raw) < len(positions):
+            raise ValueError(f"Строка {line_no}: некорректное число полей.")
+        try:
+            rows_values.append([
+                db_parser.convert_typed(raw[p], t)
+                for p, t in zip(positions, types)
+            ])
+        except ValueError as e:
+            raise ValueError(f"Строка {line_no}: {e}")
+    return rows_values
 
-    def fetch_data():
-        table_data = load_table_data(table_name)
-        return core.select_rows(table_data, where_clause)
 
-    # Используем замыкание для кэширования
-    rows = SELECT_CACHE(user_input, fetch_data)
+def _chunks(iterable: Iterable, size: int) -> Iterator[list]:
+    """Разбивает поток на списки длиной не более size."""
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
 
-    if not rows:
-        print("Записей не найдено.")
+
+@handle_db_errors
+@timed("select")
+def handle_select(
+    user_input: str | statements.Select,
+    prepared: planner.Prepared | None = None,
+) -> None:
+    """Выбирает данные и выводит их потоком в текущем формате.
+
+    Строки проходят цепочку генераторов от хранилища до вывода:
+    фильтр, order by/limit/offset, постраничный вывод.
+    """
+    statement = parse_command(user_input)
+    if statement.join is not None:
+        select_join(statement)
         return
+    plan = plan_command(statement, prepared=prepared)
+    table_name = plan.table_name
+    items, group_by = list(statement.items), statement.group_by
+    order_by, limit, offset = statement.order_by, statement.limit, statement.offset
+
+    if items or group_by is not None:
+        rows = iter(select_aggregates(plan, items, group_by))
+        columns = [core.aggregate_label(f, c) for f, c in items]
+    else:
+        # Короткие результаты кэшируются по мере вывода
+        key = select_cache_key(table_name, plan.condition)
+        rows = SELECT_CACHE.stream(
+            key,
+            lambda: SESSION.iter_select(table_name, plan),
+            table=table_name,
+            max_rows=SELECT_CACHE_MAX_ROWS,
+        )
+        columns = list(plan.types)
+    for column, _ in order_by:
+        if column not in columns:
+            raise KeyError(column)
+
+    with metrics.phase("execute"):
+        shown = output.write_rows(core.order_rows(rows, order_by, limit, offset))
+    if not shown and output.current_format() in ("table", "plain"):
+        print("Записей не найдено.")
+
+
+def _row_count(table_name: str) -> int:
+    """Число строк таблицы: из статистики в метаданных или по загруженным."""
+    stats = SESSION.metadata[table_name].get("stats")
+    if stats is not None:
+        return stats["rows"]
+    return len(SESSION.table(table_name).rows)
+
+
+def plan_join(statement: statements.Select) -> planner.JoinPlan:
+    """План соединения по метаданным и числу строк таблиц."""
+    join = statement.join
+    counts = {name: _row_count(name) for name in join[:2] if name in SESSION.metadata}
+    return planner.JoinPlan(SESSION.metadata, join, statement.where, counts)
+
+
+def iter_join(plan: planner.JoinPlan) -> Iterator[dict]:
+    """Соединенные строки: просмотр одной таблицы и поиск пар в другой."""
+    build_plan = plan.table_plans[plan.build]
+    build_column = plan.on[plan.build]
+    if plan.index_kind is not None:
+        state = SESSION.table(plan.build)
+        index, primary = state.indexes[build_column], state.indexes["ID"]
+        check = build_plan.predicate_for(state.rows) if build_plan.predicate else None
+
+        def matches(value):
+            rows = primary.fetch(index.lookup(value))
+            return [r for r in rows if check(r)] if check else rows
+    else:
+        table = core.build_hash(
+            SESSION.iter_select(plan.build, build_plan), build_column
+        )
+
+        def matches(value):
+            return table.get(value, ())
+
+    probe = SESSION.iter_select(plan.probe, plan.table_plans[plan.probe])
+    predicate = plan.predicate
+    for probe_row, build_row in core.hash_join(probe, plan.on[plan.probe], matches):
+        if plan.probe == plan.left:
+            row = core.merge_rows(plan.left, probe_row, plan.right, build_row)
+        else:
+            row = core.merge_rows(plan.left, build_row, plan.right, probe_row)
+        if predicate is None or predicate(row):
+            yield row
+
+
+def select_join(statement: statements.Select) -> None:
+    """SELECT с соединением двух таблиц: строки выводятся потоком."""
+    plan = plan_join(statement)
+    items, order_by = statement.items, statement.order_by
+    limit, offset = statement.limit, statement.offset
+    if statement.group_by is not None or any(func for func, _ in items):
+        raise ValueError("Агрегаты и group by для join не поддерживаются.")
+    columns = [plan.resolve(column) for _, column in items]
+    order_by = [(plan.resolve(column), desc) for column, desc in order_by]
+
+    rows = core.order_rows(iter_join(plan), order_by, limit, offset)
+    if columns:
+        rows = ({column: row[column] for column in columns} for row in rows)
+    with metrics.phase("execute"):
+        shown = output.write_rows(rows)
+    if not shown and output.current_format() in ("table", "plain"):
+        print("Записей не найдено.")
+
+
+def select_aggregates(
+    plan: planner.Plan,
+    items: list[tuple[str, str]],
+    group_by: str | None,
+) -> list[dict]:
+    """Вычисляет агрегаты SELECT (с кэшем).
+
+    count, min и max по всей таблице берутся из статистики
+    в метаданных без чтения строк.
+    """
+    table_name = plan.table_name
+    table_meta = SESSION.metadata[table_name]
+    core.validate_aggregates(table_meta["columns"], items, group_by)
+
+    def compute():
+        if plan.condition is None and group_by is None:
+            row = core.aggregate_from_stats(table_meta, items)
+            if row is not None:
+                return [row]
+        rows = SESSION.iter_select(table_name, plan)
+        with metrics.phase("execute"):
+            return core.aggregate_rows(rows, items, group_by)
 
-    table = PrettyTable()
-    table.field_names = rows[0].keys()
-    for row in rows:
-        table.add_row(row.values())
-    print(table)
+    key = select_cache_key(table_name, plan.condition) + (tuple(items), group_by)
+    return SELECT_CACHE(key, compute, table=table_name)
 
 
 @handle_db_errors
-@log_time
-def handle_update(user_input: str) -> None:
+@timed("update")
+def handle_update(
+    user_input: str | statements.Update,
+    prepared: planner.Prepared | None = None,
+) -> None:
     """Обновляет существующие записи."""
-    table_name, set_cl, where_cl = db_parser.parse_update_command(user_input)
-    metadata = load_metadata(META_FILE)
-    table_data = load_table_data(table_name)
-
-    table_data, updated_ids = core.update_rows(
-        metadata, table_name, table_data, set_cl, where_cl
-    )
-    save_table_data(table_name, table_data)
+    plan = plan_command(parse_command(user_input), True, prepared)
+    table_name = plan.table_name
+    state = SESSION.table(table_name, SESSION.parts_for(table_name, plan))
+
+    with metrics.phase("execute"):
+        table_data, updated_ids = core.update_rows(
+            SESSION.metadata, table_name, state.rows, plan.assignments, plan,
+            state.indexes,
+        )
+        updated_rows = state.indexes["ID"].fetch(updated_ids)
+    # Статистика таблицы в метаданных изменилась вместе со строками
+    SESSION.save_metadata(table_name)
+    write_changes(table_name, [update_record(r) for r in updated_rows])
 
     if updated_ids:
         ids_str = ", ".join(map(str, updated_ids))
@@ -158,17 +600,22 @@ def handle_update(user_input: str) -> None:
 
 @handle_db_errors
 @confirm_action("удаление записи")
-@log_time
-def handle_delete(user_input: str) -> None:
+@timed("delete")
+def handle_delete(
+    user_input: str | statements.Delete,
+    prepared: planner.Prepared | None = None,
+) -> None:
     """Удаляет записи по условию."""
-    table_name, where_clause = db_parser.parse_delete_command(user_input)
-    metadata = load_metadata(META_FILE)
-    table_data = load_table_data(table_name)
+    plan = plan_command(parse_command(user_input), True, prepared)
+    table_name = plan.table_name
+    state = SESSION.table(table_name, SESSION.parts_for(table_name, plan))
 
-    new_data, deleted_ids = core.delete_rows(
-        metadata, table_name, table_data, where_clause
-    )
-    save_table_data(table_name, new_data)
+    with metrics.phase("execute"):
+        new_data, deleted_ids = core.delete_rows(
+            SESSION.metadata, table_name, state.rows, plan, state.indexes
+        )
+    SESSION.save_metadata(table_name)
+    write_changes(table_name, [delete_record(i) for i in deleted_ids], new_data)
 
     if deleted_ids:
         ids_str = ", ".join(map(str, deleted_ids))
@@ -176,20 +623,284 @@ def handle_delete(user_input: str) -> None:
 
 
 @handle_db_errors
+@timed("info")
 def handle_info(tokens: list[str]) -> None:
     """Выводит структуру таблицы и количество записей."""
     if len(tokens) < 2:
         raise ValueError("Нужно указать имя таблицы.")
     table_name = tokens[1]
-    metadata = load_metadata(META_FILE)
-    table_data = load_table_data(table_name)
+    table_meta = SESSION.metadata[table_name]
+    # Для таблиц без статистики в метаданных строки считаются заново
+    table_data = None if "stats" in table_meta else SESSION.table(table_name).rows
+    storage = get_storage(SESSION.metadata, table_name)
+    part_sizes = None
+    if isinstance(storage, PartitionedStorage):
+        # В пакетном режиме изменения еще в памяти: размеры секций
+        # считаются по файлам, поэтому изменения сначала сохраняются.
+        # Транзакция до commit на диск не пишет
+        if not SESSION.in_transaction:
+            SESSION.flush()
+        part_sizes = storage.part_sizes(table_name)
+
+    with metrics.phase("execute"):
+        info_text = core.get_table_info(
+            SESSION.metadata, table_name, table_data, part_sizes
+        )
+    with metrics.phase("render"):
+        print(info_text)
+
+
+def handle_cache_stats() -> None:
+    """Выводит статистику кэша SELECT и буферного пула таблиц."""
+    stats = SELECT_CACHE.stats()
+    print(f"Попаданий: {stats['hits']}")
+    print(f"Промахов: {stats['misses']}")
+    print(f"Вытеснений: {stats['evictions']}")
+    print(f"Записей в кэше: {stats['size']} из {stats['max_size']}")
+    pool = BUFFER_POOL.stats()
+    print("Буферный пул таблиц и метаданных:")
+    print(f"Попаданий: {pool['hits']} ({pool['hit_rate']:.1%}), "
+          f"промахов: {pool['misses']} (из них устаревших: {pool['stale']})")
+    print(f"Вытеснений: {pool['evictions']}")
+    print(f"Записей: {pool['entries']}, занято: {pool['resident'] / 2**20:.1f} "
+          f"из {pool['budget'] / 2**20:.0f} МБ")
+
+
+def handle_output(tokens: list[str]) -> None:
+    """Задает формат вывода SELECT: output <table|plain|csv|jsonl> [строк]."""
+    if len(tokens) == 1:
+        print(f"Формат вывода: {output.current_format()}, "
+              f"строк на странице: {output.page_size()}")
+        return
+    try:
+        if len(tokens) > 3:
+            raise ValueError("Используйте: output <table|plain|csv|jsonl> [строк]")
+        size = int(tokens[2]) if len(tokens) == 3 else None
+        output.set_format(tokens[1].lower(), size)
+    except ValueError as e:
+        report_error(f"Ошибка валидации: {e}")
+        return
+    print(f"Формат вывода: {output.current_format()}")
 
-    info_text = core.get_table_info(metadata, table_name, table_data)
-    print(info_text)
+
+def handle_stats(tokens: list[str]) -> None:
+    """Выводит гистограммы времени команд по фазам (stats reset — очистить)."""
+    if tokens[1:] == ["reset"]:
+        metrics.reset()
+        print("Статистика очищена.")
+        return
+    print(metrics.format_stats())
+
+
+@handle_db_errors
+@timed("explain")
+def handle_explain(user_input: str) -> None:
+    """Выводит план выполнения команды, не выполняя ее."""
+    text = user_input.split(None, 1)[1] if " " in user_input.strip() else ""
+    statement = parse_command(text)
+    if isinstance(statement, statements.Select) and statement.join is not None:
+        print(plan_join(statement).describe())
+        return
+    plan = plan_command(statement)
+    print(plan.describe())
+    spec = SESSION.metadata[plan.table_name].get("partitions")
+    if spec is not None:
+        numbers = SESSION.parts_for(plan.table_name, plan)
+        print(partitions.describe(spec, numbers))
+    if plan.statement != "select":
+        return
+    items, group_by = list(statement.items), statement.group_by
+    if items:
+        labels = ", ".join(core.aggregate_label(f, c) for f, c in items)
+        print(f"Агрегаты (за один проход): {labels}")
+    if group_by is not None:
+        print(f"Группировка: {group_by}")
+    order_by, limit, offset = statement.order_by, statement.limit, statement.offset
+    if order_by:
+        keys = ", ".join(f"{c} desc" if d else c for c, d in order_by)
+        if limit is None:
+            print(f"Сортировка: {keys} (полная)")
+        else:
+            print(f"Сортировка: {keys} (top-k: хранится {offset + limit} строк)")
+    if limit is not None or offset:
+        bound = "без ограничения" if limit is None else f"limit {limit}"
+        print(f"Вывод: {bound}, offset {offset}")
+    stats_only = core.aggregate_from_stats(SESSION.metadata[plan.table_name], items)
+    if items and plan.condition is None and group_by is None and stats_only:
+        print("Строки не читаются: значения берутся из статистики в метаданных")
+
+
+@handle_db_errors
+@timed("prepare")
+def handle_prepare(user_input: str) -> None:
+    """Разбирает и проверяет команду с параметрами ? и сохраняет ее под именем."""
+    with metrics.phase("parse"):
+        name, statement, params = db_parser.parse_prepare(user_input)
+    prepared = planner.Prepared(name, statement, params)
+    # Таблицы и столбцы проверяются сразу, а не при первом execute
+    for table_name in statements.tables(statement):
+        if table_name not in SESSION.metadata:
+            raise KeyError(table_name)
+    if isinstance(statement, statements.Select) and statement.join is not None:
+        plan_join(statement)
+    elif not isinstance(statement, statements.Insert):
+        assignments = (
+            dict(statement.assignments)
+            if isinstance(statement, statements.Update) else None
+        )
+        prepared.template(SESSION.metadata).plan(statement.where, assignments)
+    prepared_statements()[name] = prepared
+    print(f'Команда "{name}" подготовлена, параметров: {params}.')
+
+
+@handle_db_errors
+def handle_execute(user_input: str) -> None:
+    """Выполняет подготовленную команду с аргументами.
+
+    Текст команды не разбирается заново: аргументы подставляются в
+    готовое дерево, а план строится по сохраненному шаблону.
+    """
+    name, args = db_parser.parse_execute(user_input)
+    prepared = prepared_statements().get(name)
+    if prepared is None:
+        raise ValueError(f'Подготовленной команды "{name}" нет.')
+    statement = statements.bind(prepared.statement, args, prepared.params)
+    STATEMENT_HANDLERS[type(statement)](statement, prepared)
+
+
+def _forbid_in_transaction(command: str) -> None:
+    """Команды, сразу меняющие файлы таблицы, нельзя выполнять в транзакции."""
+    if SESSION.in_transaction:
+        raise ValueError(
+            f"Команда {command} недоступна внутри транзакции: "
+            "выполните commit или rollback."
+        )
+
+
+@handle_db_errors
+@timed("begin")
+def handle_begin() -> None:
+    """Начинает транзакцию."""
+    SESSION.begin()
+    print("Транзакция начата.")
+
+
+@handle_db_errors
+@timed("commit")
+def handle_commit() -> None:
+    """Фиксирует транзакцию или сохраняет накопленные изменения пакетного
+    режима, после чего освобождает блокировки."""
+    if SESSION.in_transaction:
+        SESSION.commit()
+        SESSION.release()
+        print("Транзакция зафиксирована.")
+        return
+    SESSION.release()
+    print("Изменения сохранены.")
+
+
+@handle_db_errors
+@timed("rollback")
+def handle_rollback() -> None:
+    """Отменяет изменения транзакции."""
+    for table_name in SESSION.rollback():
+        SELECT_CACHE.invalidate(table_name)
+    print("Транзакция отменена.")
+
+
+def _rollback_unfinished() -> None:
+    """Отменяет транзакцию, не завершенную до конца сеанса."""
+    if SESSION.in_transaction:
+        print("Транзакция не была зафиксирована.")
+        handle_rollback()
+
+
+# Обработчики команд с данными по виду дерева команды
+STATEMENT_HANDLERS = {
+    statements.Select: handle_select,
+    statements.Insert: handle_insert,
+    statements.Update: handle_update,
+    statements.Delete: handle_delete,
+}
+# Команды, которые получают исходный текст и разбирают его сами
+TEXT_COMMANDS = {
+    "explain": handle_explain,
+    "prepare": handle_prepare,
+    "execute": handle_execute,
+}
+# Команды, которые получают аргументы, разобранные shlex
+TOKEN_COMMANDS = {
+    "create_table": handle_create_table,
+    "drop_table": handle_drop_table,
+    "create_index": handle_create_index,
+    "drop_index": handle_drop_index,
+    "convert_table": handle_convert_table,
+    "vacuum": handle_vacuum,
+    "info": handle_info,
+    "load_csv": handle_load_csv,
+    "stats": handle_stats,
+    "output": handle_output,
+}
+# Команды без аргументов
+PLAIN_COMMANDS = {
+    "help": print_help,
+    "list_tables": handle_list_tables,
+    "cache_stats": handle_cache_stats,
+    "begin": handle_begin,
+    "commit": handle_commit,
+    "rollback": handle_rollback,
+}
+
+
+def _with_tokens(handler: Callable[[list[str]], None]) -> Callable[[str], None]:
+    return lambda user_input: handler(shlex.split(user_input))
+
+
+def _without_args(handler: Callable[[], None]) -> Callable[[str], None]:
+    return lambda user_input: handler()
+
+
+def build_dispatch() -> dict[str, Callable[[str], None]]:
+    """Таблица разбора: первое слово команды в нижнем регистре -> обработчик.
+
+    Строится один раз при загрузке модуля, поэтому команда выбирается
+    одним поиском в словаре вместо цепочки сравнений.
+    """
+    dispatch: dict[str, Callable[[str], None]] = {
+        cls.keyword: handler for cls, handler in STATEMENT_HANDLERS.items()
+    }
+    dispatch.update(TEXT_COMMANDS)
+    dispatch.update(
+        (name, _with_tokens(handler)) for name, handler in TOKEN_COMMANDS.items()
+    )
+    dispatch.update(
+        (name, _without_args(handler)) for name, handler in PLAIN_COMMANDS.items()
+    )
+    return dispatch
+
+
+DISPATCH = build_dispatch()
+
+
+def execute(user_input: str) -> bool:
+    """Выполняет одну команду. Возвращает False, если нужно завершить работу."""
+    word = user_input.split(None, 1)[0].lower()
+    if word == "exit":
+        return False
+    handler = DISPATCH.get(word)
+    if handler is None:
+        report_error(f"Функции {user_input.split(None, 1)[0]} нет. Попробуйте снова.")
+        return True
+    handler(user_input)
+    return True
 
 
 def run() -> None:
     """Основной цикл обработки команд."""
+    # prompt нужен только интерактивному режиму
+    import prompt
+
+    output.set_pager(sys.stdout.isatty())
     while True:
         try:
             user_input = prompt.string(">>>Введите команду: ")
@@ -199,31 +910,41 @@ def run() -> None:
         if not user_input:
             continue
 
-        low_input = user_input.lower()
-        if low_input == "exit":
-            break
-        if low_input == "help":
-            print_help()
-            continue
-
-        tokens = shlex.split(user_input)
-        command = tokens[0]
-
-        if command == "create_table":
-            handle_create_table(tokens)
-        elif command == "list_tables":
-            handle_list_tables()
-        elif command == "drop_table":
-            handle_drop_table(tokens)
-        elif low_input.startswith("insert into"):
-            handle_insert(user_input)
-        elif low_input.startswith("select"):
-            handle_select(user_input)
-        elif low_input.startswith("update"):
-            handle_update(user_input)
-        elif low_input.startswith("delete"):
-            handle_delete(user_input)
-        elif command == "info":
-            handle_info(tokens)
-        else:
-            print(f"Функции {command} нет. Попробуйте снова.")
+        try:
+            if not execute(user_input):
+                break
+        finally:
+            # Блокировки не удерживаются, пока пользователь вводит команду,
+            # а следующая команда видит актуальное состояние файлов.
+            # Внутри транзакции таблицы остаются в памяти до commit
+            if not SESSION.in_transaction:
+                # Измененные таблицы проверяет фоновая автоочистка
+                vacuum.schedule(SESSION.writing())
+                with metrics.track("flush"):
+                    SESSION.reset()
+        print_auto_vacuum()
+    _rollback_unfinished()
+    vacuum.stop()
+    print_auto_vacuum()
+
+
+def run_script(lines: Iterable[str]) -> None:
+    """Пакетное выполнение команд с однократной загрузкой таблиц.
+
+    Изменения накапливаются в памяти и сохраняются командой commit
+    и в конце сценария. Пустые строки и комментарии (--, #) пропускаются.
+    """
+    SESSION.reset()
+    SESSION.autocommit = False
+    try:
+        for line in lines:
+            statement = line.strip().rstrip(";").strip()
+            if not statement or statement.startswith(("--", "#")):
+                continue
+            if not execute(statement):
+                break
+    finally:
+        _rollback_unfinished()
+        with metrics.track("flush"):
+            SESSION.reset()
+        SESSION.autocommit = True
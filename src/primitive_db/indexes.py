@@ -0,0 +1,379 @@
+"""
+Индексы по столбцам таблиц.
+
+Индекс хранится рядом с данными в ``data/<table>.<column>.idx``:
+журнал строк ``["+", значение, ID]`` / ``["-", ID]``, который
+дописывается при каждом изменении таблицы. Столбец ID индексируется
+неявно (первичный ключ) и на диске не хранится.
+
+Файлы таблицы и журнал индекса записываются по очереди, поэтому после
+изменений в журнал добавляется строка ``["=", состояние]`` — время
+изменения и размеры файлов таблицы, которым соответствует индекс.
+Если последняя такая отметка не совпадает с файлами таблицы (процесс
+упал между двумя записями), индекс не загружается, а строится заново.
+
+Виды индексов: ``hash`` (только равенство) и ``sorted`` (упорядоченный
+массив значений, поддерживает диапазоны за O(log n + k)).
+"""
+
+import bisect
+import json
+import os
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from . import locks
+from .constants import DATA_DIR, LOG_CHECKPOINT_MIN
+from .utils import Stamp, _ensure_data_dir, atomic_write
+
+Row = Dict[str, Any]
+
+PRIMARY_KEY = "ID"
+
+INDEX_KINDS = ("hash", "sorted")
+
+
+class PrimaryKeyIndex:
+    """Неявный индекс по ID, строится по загруженным строкам.
+
+    Кроме словаря строк хранит упорядоченный список ID, поэтому
+    диапазон по ID находится двоичным поиском за O(log n + k).
+    """
+
+    def __init__(self, rows: Iterable[Row]) -> None:
+        self.rows_by_id: Dict[int, Row] = {r[PRIMARY_KEY]: r for r in rows}
+        self.ids: List[int] = sorted(self.rows_by_id)
+
+    def lookup(self, value: Any) -> Set[int]:
+        """Возвращает множество ID с данным значением."""
+        return {value} if value in self.rows_by_id else set()
+
+    def range(self, op: str, value: Any) -> Set[int]:
+        """Возвращает ID, удовлетворяющие сравнению ``ID <op> value``."""
+        return set(_range_slice(self.ids, op, value))
+
+    def fetch(self, ids: Iterable[int]) -> List[Row]:
+        """Возвращает строки по ID в порядке возрастания ID."""
+        return [self.rows_by_id[i] for i in sorted(ids) if i in self.rows_by_id]
+
+    def apply(self, records: List[Dict[str, Any]]) -> None:
+        """Применяет записи журнала таблицы."""
+        for rec in records:
+            if rec["op"] == "delete":
+                if self.rows_by_id.pop(rec["id"], None) is not None:
+                    del self.ids[bisect.bisect_left(self.ids, rec["id"])]
+                continue
+            row_id = rec["row"][PRIMARY_KEY]
+            if row_id not in self.rows_by_id:
+                # Новые ID обычно больше всех прежних: вставка в конец
+                if not self.ids or row_id > self.ids[-1]:
+                    self.ids.append(row_id)
+                else:
+                    bisect.insort(self.ids, row_id)
+            self.rows_by_id[row_id] = rec["row"]
+
+    def flush(self, stamp: Stamp) -> None:
+        """Индекс по ID не хранится на диске."""
+
+
+class HashIndex:
+    """Хэш-индекс значение -> множество ID с журналом на диске."""
+
+    def __init__(self, table_name: str, column: str) -> None:
+        self.table_name = table_name
+        self.column = column
+        self.entries: Dict[Any, Set[int]] = {}
+        self.values_by_id: Dict[int, Any] = {}
+        self._ops_in_file = 0
+        self._pending: List[List[Any]] = []
+        # Состояние файлов таблицы из последней отметки журнала
+        self.stamp: List[Any] | None = None
+
+    @property
+    def path(self) -> str:
+        return os.path.join(DATA_DIR, f"{self.table_name}.{self.column}.idx")
+
+    def lookup(self, value: Any) -> Set[int]:
+        """Возвращает множество ID с данным значением."""
+        return self.entries.get(value, set())
+
+    def _add(self, value: Any, row_id: int) -> None:
+        self.entries.setdefault(value, set()).add(row_id)
+        self.values_by_id[row_id] = value
+
+    def _remove(self, row_id: int) -> None:
+        if row_id not in self.values_by_id:
+            return
+        value = self.values_by_id.pop(row_id)
+        ids = self.entries.get(value)
+        if ids is not None:
+            ids.discard(row_id)
+            if not ids:
+                del self.entries[value]
+
+    def build(
+        self,
+        rows: Iterable[Row],
+        persist: bool = True,
+        stamp: Stamp | None = None,
+    ) -> "HashIndex":
+        """Строит индекс по строкам и (по умолчанию) сохраняет его на диск.
+
+        stamp — состояние файлов таблицы, которым соответствуют rows.
+        """
+        self.entries = {}
+        self.values_by_id = {}
+        for row in rows:
+            self._add(row.get(self.column), row[PRIMARY_KEY])
+        if persist:
+            self.save(stamp)
+        return self
+
+    def load(self, stamp: Stamp | None = None) -> bool:
+        """Загружает индекс с диска.
+
+        Возвращает False, если файла нет или (при заданном stamp) индекс
+        не соответствует текущему состоянию файлов таблицы.
+        """
+        lines = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        lines.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # Недописанная строка журнала — дальше читать нечего
+                        break
+        except FileNotFoundError:
+            return False
+        for op in lines:
+            if op[0] == "+":
+                self._remove(op[2])
+                self._add(op[1], op[2])
+            elif op[0] == "-":
+                self._remove(op[1])
+            else:
+                self.stamp = op[1]
+        self._ops_in_file = len(lines)
+        if stamp is not None and self.stamp != _stamp_entry(stamp):
+            return False
+        long_log = self._ops_in_file > max(
+            LOG_CHECKPOINT_MIN, 2 * len(self.values_by_id)
+        )
+        if long_log and locks.holds_writer(self.table_name):
+            self.save(stamp)
+        return True
+
+    def save(self, stamp: Stamp | None = None) -> None:
+        """Перезаписывает файл индекса в компактном виде.
+
+        Без stamp отметка не пишется: индекс считается соответствующим
+        таблице только после следующего flush.
+        """
+        _ensure_data_dir()
+        self.stamp = None if stamp is None else _stamp_entry(stamp)
+        with atomic_write(self.path) as f:
+            for row_id, value in self.values_by_id.items():
+                f.write(_dump(["+", value, row_id]))
+            if self.stamp is not None:
+                f.write(_dump(["=", self.stamp]))
+        self._ops_in_file = len(self.values_by_id) + (self.stamp is not None)
+        self._pending = []
+
+    def apply(self, records: List[Dict[str, Any]]) -> None:
+        """Применяет записи журнала таблицы в памяти."""
+        for rec in records:
+            if rec["op"] == "delete":
+                self._remove(rec["id"])
+                self._pending.append(["-", rec["id"]])
+                continue
+            row = rec["row"]
+            row_id = row[PRIMARY_KEY]
+            value = row.get(self.column)
+            if self.values_by_id.get(row_id, _MISSING) == value:
+                continue
+            self._remove(row_id)
+            self._add(value, row_id)
+            self._pending.append(["+", value, row_id])
+
+    def flush(self, stamp: Stamp) -> None:
+        """Дописывает накопленные изменения и отметку stamp в файл индекса.
+
+        Вызывается после записи файлов таблицы; stamp — их состояние.
+        """
+        entry = _stamp_entry(stamp)
+        if not self._pending and entry == self.stamp:
+            return
+        ops = self._pending + [["=", entry]]
+        _ensure_data_dir()
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(_dump(op) for op in ops))
+        self._ops_in_file += len(ops)
+        self._pending = []
+        self.stamp = entry
+
+    def drop(self) -> None:
+        """Удаляет файл индекса."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+_MISSING = object()
+
+
+class SortedIndex(HashIndex):
+    """Упорядоченный индекс: отсортированные пары (значение, ID).
+
+    Массив строится при первом диапазонном запросе и далее
+    поддерживается вставками через bisect.
+    """
+
+    def __init__(self, table_name: str, column: str) -> None:
+        super().__init__(table_name, column)
+        self._sorted: List[Tuple[Any, int]] | None = None
+
+    def _add(self, value: Any, row_id: int) -> None:
+        super()._add(value, row_id)
+        if self._sorted is not None:
+            bisect.insort(self._sorted, (value, row_id))
+
+    def _remove(self, row_id: int) -> None:
+        if self._sorted is not None and row_id in self.values_by_id:
+            key = (self.values_by_id[row_id], row_id)
+            pos = bisect.bisect_left(self._sorted, key)
+            if pos < len(self._sorted) and self._sorted[pos] == key:
+                del self._sorted[pos]
+        super()._remove(row_id)
+
+    def build(
+        self,
+        rows: Iterable[Row],
+        persist: bool = True,
+        stamp: Stamp | None = None,
+    ) -> "SortedIndex":
+        self._sorted = None
+        super().build(rows, persist, stamp)
+        return self
+
+    def range(self, op: str, value: Any) -> Set[int]:
+        """Возвращает ID, удовлетворяющие сравнению ``column <op> value``."""
+        if self._sorted is None:
+            self._sorted = sorted((v, i) for i, v in self.values_by_id.items())
+        lo, hi = _range_bounds(self._sorted, op, value)
+        return {row_id for _, row_id in self._sorted[lo:hi]}
+
+
+def _range_bounds(items: List[Any], op: str, value: Any) -> Tuple[int, int]:
+    """Границы среза упорядоченного списка для сравнения с value."""
+    if items and isinstance(items[0], tuple):
+        # Пары (значение, ID): сравниваем только по значению
+        low_key, high_key = (value, float("-inf")), (value, float("inf"))
+    else:
+        low_key = high_key = value
+    if op == ">":
+        return bisect.bisect_right(items, high_key), len(items)
+    if op == ">=":
+        return bisect.bisect_left(items, low_key), len(items)
+    if op == "<":
+        return 0, bisect.bisect_left(items, low_key)
+    if op == "<=":
+        return 0, bisect.bisect_right(items, high_key)
+    raise ValueError(f"Оператор {op} не поддерживается индексом.")
+
+
+def _range_slice(items: List[Any], op: str, value: Any) -> List[Any]:
+    lo, hi = _range_bounds(items, op, value)
+    return items[lo:hi]
+
+
+def _dump(op: List[Any]) -> str:
+    return json.dumps(op, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _stamp_entry(stamp: Stamp) -> List[Any]:
+    """Состояние файлов таблицы в том виде, в каком оно читается из JSON."""
+    return [None if item is None else list(item) for item in stamp]
+
+
+def index_defs(table_meta: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """Пары (столбец, вид) индексов таблицы.
+
+    Старые описания в виде строки с именем столбца считаются хэш-индексами.
+    """
+    defs = []
+    for entry in table_meta.get("indexes", []):
+        if isinstance(entry, str):
+            defs.append((entry, "hash"))
+        else:
+            defs.append((entry["column"], entry.get("type", "hash")))
+    return defs
+
+
+def make_index(table_name: str, column: str, kind: str = "hash") -> HashIndex:
+    """Создает объект индекса нужного вида."""
+    if kind == "sorted":
+        return SortedIndex(table_name, column)
+    return HashIndex(table_name, column)
+
+
+def get_indexes(
+    metadata: Dict[str, Any],
+    table_name: str,
+    rows: List[Row],
+    stamp: Stamp,
+) -> Dict[str, Any]:
+    """Возвращает все индексы таблицы, включая неявный индекс по ID.
+
+    rows — строки из файлов таблицы с состоянием stamp. Индекс, файла
+    которого нет или который отстал от таблицы, строится по rows.
+    """
+    indexes: Dict[str, Any] = {PRIMARY_KEY: PrimaryKeyIndex(rows)}
+    writer = locks.holds_writer(table_name)
+    for column, kind in index_defs(metadata[table_name]):
+        index = make_index(table_name, column, kind)
+        if not index.load(stamp):
+            # Читатель строит недостающий индекс только в памяти
+            index.build(rows, persist=writer, stamp=stamp)
+        indexes[column] = index
+    return indexes
+
+
+def load_indexes(
+    metadata: Dict[str, Any],
+    table_name: str,
+    stamp: Stamp,
+) -> Dict[str, Any] | None:
+    """Индексы таблицы из файлов (без индекса по ID).
+
+    None, если какого-то файла нет или индекс не соответствует stamp:
+    тогда индексы можно построить только по всем строкам таблицы.
+    """
+    indexes: Dict[str, Any] = {}
+    for column, kind in index_defs(metadata[table_name]):
+        index = make_index(table_name, column, kind)
+        if not index.load(stamp):
+            return None
+        indexes[column] = index
+    return indexes
+
+
+def apply_records(indexes: Dict[str, Any], records: List[Dict[str, Any]]) -> None:
+    """Поддерживает актуальность всех индексов таблицы в памяти."""
+    for index in indexes.values():
+        index.apply(records)
+
+
+def flush_indexes(indexes: Dict[str, Any], stamp: Stamp) -> None:
+    """Сохраняет изменения всех индексов таблицы на диск.
+
+    Вызывается после записи файлов таблицы с их новым состоянием stamp.
+    """
+    for index in indexes.values():
+        index.flush(stamp)
+
+
+def drop_indexes(metadata: Dict[str, Any], table_name: str) -> None:
+    """Удаляет файлы всех индексов таблицы."""
+    for column, _ in index_defs(metadata[table_name]):
+        HashIndex(table_name, column).drop()
@@ -0,0 +1,73 @@
+"""
+Лексический анализатор команд.
+
+Команда разбивается на токены за один проход одним регулярным
+выражением. Виды токенов:
+
+- ``value`` — строка в кавычках (текст без кавычек, ``\\"`` заменено на ``"``);
+- ``op`` — оператор сравнения (``==`` и ``<>`` приводятся к ``=`` и ``!=``);
+- ``punct`` — скобка, запятая или ``*``;
+- ``param`` — параметр подготовленной команды ``?``;
+- ``word`` — все остальное: ключевые слова, имена (в том числе
+  ``table.column``) и литералы без кавычек.
+
+У каждого токена заранее вычислен текст в нижнем регистре (``low``),
+поэтому разбор сравнивает ключевые слова без повторных ``lower()``.
+"""
+
+import re
+from typing import List, NamedTuple
+
+_TOKEN = re.compile(
+    r"""\s*(?:
+        "((?:[^"\\]|\\.)*)"
+      | '((?:[^'\\]|\\.)*)'
+      | (<=|>=|!=|<>|==|=|<|>)
+      | ([(),*])
+      | (\?)
+      | ([^\s<>=!(),*?"']+)
+    )""",
+    re.VERBOSE,
+)
+_ESCAPE = re.compile(r"\\(.)")
+_OPERATORS = {"==": "=", "<>": "!="}
+
+
+class Token(NamedTuple):
+    """Токен команды: вид, текст и текст в нижнем регистре."""
+
+    kind: str
+    text: str
+    low: str
+
+
+def tokenize(text: str) -> List[Token]:
+    """Разбивает команду на токены."""
+    tokens = []
+    text = text.strip()
+    pos, end = 0, len(text)
+    match = _TOKEN.match
+    while pos < end:
+        found = match(text, pos)
+        if found is None:
+            if text[pos:].lstrip()[0] in "\"'":
+                raise ValueError("Незакрытая кавычка в команде.")
+            raise ValueError(f"Некорректная команда около: {text[pos:]}")
+        double, single, op, punct, param, word = found.groups()
+        if word is not None:
+            tokens.append(Token("word", word, word.lower()))
+        elif double is not None:
+            if "\\" in double:
+                double = _ESCAPE.sub(r"\1", double)
+            tokens.append(Token("value", double, double))
+        elif single is not None:
+            tokens.append(Token("value", single, single))
+        elif op is not None:
+            op = _OPERATORS.get(op, op)
+            tokens.append(Token("op", op, op))
+        elif punct is not None:
+            tokens.append(Token("punct", punct, punct))
+        else:
+            tokens.append(Token("param", param, param))
+        pos = found.end()
+    return tokens
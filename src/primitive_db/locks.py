@@ -0,0 +1,144 @@
+"""
+Межпроцессные блокировки таблиц (fcntl.flock).
+
+У каждой таблицы два файла блокировок в ``data/``:
+
+- ``<table>.wlock`` — блокировка писателя. Ее держит процесс, который
+  изменяет таблицу, от чтения данных до сохранения изменений, поэтому
+  писатели одной таблицы выполняются по очереди и не теряют обновлений.
+- ``<table>.lock`` — блокировка чтения/публикации. Читатели берут ее
+  разделяемой на время чтения файлов, писатель — исключительной только
+  на короткое время записи на диск. Пока писатель выполняет команду,
+  читатели продолжают работать с последним сохраненным состоянием.
+
+Секции таблицы (``<table>#<n>``, см. модуль ``partitions``) защищаются
+блокировками своей таблицы.
+
+Блокировки повторно входимы в пределах потока: вложенный запрос
+использует тот же дескриптор, исключительная блокировка поглощает
+разделяемую. Разные потоки открывают свои дескрипторы, поэтому
+блокируют друг друга так же, как разные процессы. На платформах
+без ``fcntl`` блокировки не действуют.
+"""
+
+import contextlib
+import os
+import threading
+from typing import Dict, Iterator, List
+
+from .constants import DATA_DIR, META_FILE, PARTITION_SEP
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+META_LOCK = META_FILE + ".lock"
+
+
+class _Held:
+    """Открытый файл блокировки и стек режимов вложенных захватов."""
+
+    def __init__(self, fd: int) -> None:
+        self.fd = fd
+        self.modes: List[int] = []
+
+
+_local = threading.local()
+
+
+def _held() -> Dict[str, _Held]:
+    """Блокировки, захваченные текущим потоком."""
+    if not hasattr(_local, "held"):
+        _local.held = {}
+    return _local.held
+
+
+def _owner(table_name: str) -> str:
+    """Таблица, блокировками которой защищается таблица или секция."""
+    return table_name.split(PARTITION_SEP, 1)[0]
+
+
+def table_lock_path(table_name: str) -> str:
+    """Файл блокировки чтения/публикации таблицы."""
+    return os.path.join(DATA_DIR, f"{_owner(table_name)}.lock")
+
+
+def writer_lock_path(table_name: str) -> str:
+    """Файл блокировки писателя таблицы."""
+    return os.path.join(DATA_DIR, f"{_owner(table_name)}.wlock")
+
+
+def _acquire(path: str, exclusive: bool) -> None:
+    held = _held().get(path)
+    if held is None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        held = _Held(os.open(path, os.O_RDWR | os.O_CREAT, 0o666))
+        _held()[path] = held
+    current = max(held.modes, default=0)
+    mode = 2 if exclusive else 1
+    if mode > current and fcntl is not None:
+        fcntl.flock(held.fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+    held.modes.append(mode)
+
+
+def _release(path: str) -> None:
+    held = _held()[path]
+    mode = held.modes.pop()
+    if held.modes:
+        rest = max(held.modes)
+        if rest < mode and fcntl is not None:
+            # Исключительная блокировка снова становится разделяемой
+            fcntl.flock(held.fd, fcntl.LOCK_SH)
+        return
+    if fcntl is not None:
+        fcntl.flock(held.fd, fcntl.LOCK_UN)
+    os.close(held.fd)
+    del _held()[path]
+
+
+@contextlib.contextmanager
+def shared(path: str) -> Iterator[None]:
+    """Разделяемая блокировка файла на время блока with."""
+    _acquire(path, exclusive=False)
+    try:
+        yield
+    finally:
+        _release(path)
+
+
+@contextlib.contextmanager
+def exclusive(path: str) -> Iterator[None]:
+    """Исключительная блокировка файла на время блока with."""
+    _acquire(path, exclusive=True)
+    try:
+        yield
+    finally:
+        _release(path)
+
+
+def reading(table_name: str) -> contextlib.AbstractContextManager:
+    """Блокировка на время чтения файлов таблицы."""
+    return shared(table_lock_path(table_name))
+
+
+def publishing(table_name: str) -> contextlib.AbstractContextManager:
+    """Блокировка на время записи файлов таблицы."""
+    return exclusive(table_lock_path(table_name))
+
+
+def acquire_writer(table_name: str) -> None:
+    """Захватывает блокировку писателя таблицы (ждет другие процессы)."""
+    _acquire(writer_lock_path(table_name), exclusive=True)
+
+
+def release_writer(table_name: str) -> None:
+    """Освобождает блокировку писателя таблицы."""
+    _release(writer_lock_path(table_name))
+
+
+def holds_writer(table_name: str) -> bool:
+    """Держит ли текущий поток блокировку писателя таблицы."""
+    return writer_lock_path(table_name) in _held()
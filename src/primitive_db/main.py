@@ -1,17 +1,151 @@
 #!/usr/bin/env python3
 """
 Точка входа в приложение Primitive DB.
+
+Модули движка импортируются только после разбора аргументов, поэтому
+``database --help`` и ошибки в аргументах не тратят время на их загрузку.
 """
 
-from src.primitive_db.engine import run, welcome
+import argparse
+import sys
 
+from src.primitive_db.constants import (
+    BUFFER_POOL_MB,
+    OUTPUT_FORMATS,
+    VACUUM_GARBAGE_RATIO,
+)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Разбирает аргументы командной строки."""
+    arg_parser = argparse.ArgumentParser(
+        prog="database",
+        description="Примитивная база данных",
+        epilog=(
+            "database bench --help — бенчмарки CRUD-операций; "
+            "database serve --help — сетевой режим"
+        ),
+    )
+    source = arg_parser.add_mutually_exclusive_group()
+    source.add_argument(
+        "--script",
+        metavar="FILE",
+        help="выполнить команды из файла в пакетном режиме",
+    )
+    source.add_argument(
+        "-c", "--command",
+        metavar="STATEMENT",
+        action="append",
+        help=(
+            "выполнить команду и выйти (пакетный режим); можно повторять, "
+            "команды выполняются по порядку"
+        ),
+    )
+    arg_parser.add_argument(
+        "-y", "--yes",
+        action="store_true",
+        help="не запрашивать подтверждение опасных операций",
+    )
+    arg_parser.add_argument(
+        "--format",
+        choices=OUTPUT_FORMATS,
+        default="table",
+        help="формат вывода select (table — постранично, остальные — потоком)",
+    )
+    arg_parser.add_argument(
+        "--metrics",
+        metavar="FILE",
+        help="дописывать время каждой команды по фазам в файл (JSON lines)",
+    )
+    arg_parser.add_argument(
+        "--auto-vacuum",
+        metavar="RATIO",
+        nargs="?",
+        type=float,
+        const=VACUUM_GARBAGE_RATIO,
+        help=(
+            "очищать в фоне таблицы, где доля устаревших версий строк "
+            f"больше RATIO (по умолчанию {VACUUM_GARBAGE_RATIO})"
+        ),
+    )
+    arg_parser.add_argument(
+        "--buffer-pool",
+        metavar="MB",
+        type=int,
+        default=BUFFER_POOL_MB,
+        help=(
+            "бюджет памяти буферного пула таблиц между командами "
+            f"(по умолчанию {BUFFER_POOL_MB}, 0 — выключить)"
+        ),
+    )
+    arg_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="профилировать сессию (cProfile, tracemalloc) и вывести горячие точки",
+    )
+    return arg_parser.parse_args(argv)
+
+
+def start(args: argparse.Namespace) -> None:
+    """Запускает пакетный или интерактивный режим."""
+    from src.primitive_db.engine import run, run_script, welcome
+
+    if args.command:
+        run_script(args.command)
+        return
+    if args.script:
+        with open(args.script, "r", encoding="utf-8") as f:
+            run_script(f)
+        return
+    if not sys.stdin.isatty():
+        # Команды переданы через конвейер: читаем их целиком, чтобы
+        # запросы подтверждения не забирали строки сценария
+        run_script(sys.stdin.read().splitlines())
+        return
 
-def main() -> None:
-    """Запуск приветствия и основного цикла программы."""
     print("Проект запущен!")
     welcome()
     run()
 
 
+def main() -> None:
+    """Запуск приветствия и основного цикла программы."""
+    if sys.argv[1:2] == ["bench"]:
+        from src.benchmarks.suite import main as bench_main
+
+        bench_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["serve"]:
+        from src.primitive_db.server import main as serve_main
+
+        serve_main(sys.argv[2:])
+        return
+
+    args = parse_args()
+    from src.primitive_db import metrics, output, vacuum
+    from src.primitive_db.decorators import set_auto_confirm
+    from src.primitive_db.utils import BUFFER_POOL
+
+    try:
+        vacuum.set_auto_vacuum(args.auto_vacuum)
+    except ValueError as e:
+        sys.exit(f"Ошибка: {e}")
+    if args.buffer_pool < 0:
+        sys.exit("Ошибка: бюджет буферного пула не может быть отрицательным.")
+    BUFFER_POOL.set_budget(args.buffer_pool * 1024 * 1024)
+    set_auto_confirm(args.yes)
+    output.set_format(args.format)
+    metrics.set_metrics_file(args.metrics)
+
+    try:
+        if args.profile:
+            metrics.profile_session(lambda: start(args))
+        else:
+            start(args)
+    finally:
+        vacuum.set_auto_vacuum(None)
+        metrics.set_metrics_file(None)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,239 @@
+"""
+Инструментирование: время фаз выполнения команд и профилирование.
+
+Каждая команда, обернутая в ``track``, раскладывается на фазы (parse,
+metadata_load, table_load, execute, serialize, render). Время фазы
+считается без вложенных фаз, поэтому сумма фаз близка к общему времени.
+Замеры копятся в гистограммах процесса (команда ``stats``) и, если задан
+файл метрик, пишутся в него строками JSON.
+"""
+
+import bisect
+import contextlib
+import io
+import json
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, TextIO
+
+PHASES = ("parse", "metadata_load", "table_load", "execute", "serialize", "render")
+
+# Верхние границы корзин гистограммы, в миллисекундах
+BUCKETS_MS = (
+    0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500,
+    5000, 10000, float("inf"),
+)
+
+
+class Histogram:
+    """Гистограмма длительностей с корзинами фиксированных границ."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS_MS)
+
+    def add(self, seconds: float) -> None:
+        ms = seconds * 1000
+        self.count += 1
+        self.total += ms
+        self.min = min(self.min, ms)
+        self.max = max(self.max, ms)
+        self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+
+    def percentile(self, q: float) -> float:
+        """Оценка перцентиля (верхняя граница корзины, не больше max)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, hits in zip(BUCKETS_MS, self.buckets):
+            seen += hits
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class _CommandRecord:
+    """Замеры одной выполняемой команды."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.phases: Dict[str, float] = {}
+        # Стек: время вложенных фаз для каждой открытой фазы
+        self.child_time: List[float] = []
+
+
+_HISTOGRAMS: Dict[str, Dict[str, Histogram]] = {}
+_metrics_file: TextIO | None = None
+# Гистограммы и файл общие для процесса, текущая команда — своя у потока
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def _current() -> _CommandRecord | None:
+    return getattr(_local, "record", None)
+
+
+def set_metrics_file(path: str | None) -> None:
+    """Включает запись метрик каждой команды в файл (JSON lines)."""
+    global _metrics_file
+    if _metrics_file is not None:
+        _metrics_file.close()
+        _metrics_file = None
+    if path:
+        _metrics_file = open(path, "a", encoding="utf-8")
+
+
+@contextlib.contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Замеряет фазу текущей команды (вне команды ничего не делает)."""
+    record = _current()
+    if record is None:
+        yield
+        return
+    record.child_time.append(0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        own = elapsed - record.child_time.pop()
+        record.phases[name] = record.phases.get(name, 0.0) + own
+        if record.child_time:
+            record.child_time[-1] += elapsed
+
+
+@contextlib.contextmanager
+def track(command: str) -> Iterator[None]:
+    """Замеряет выполнение команды целиком и по фазам."""
+    if _current() is not None:
+        # Вложенная команда учитывается внутри внешней
+        yield
+        return
+    record = _CommandRecord(command)
+    _local.record = record
+    record.child_time.append(0.0)
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        total = time.perf_counter() - start
+        _local.record = None
+        other = total - record.child_time.pop()
+        if other > 0:
+            record.phases["other"] = other
+        _record(record, total, failed)
+
+
+def _record(record: _CommandRecord, total: float, failed: bool) -> None:
+    with _lock:
+        histograms = _HISTOGRAMS.setdefault(record.name, {})
+        histograms.setdefault("total", Histogram()).add(total)
+        for name, seconds in record.phases.items():
+            histograms.setdefault(name, Histogram()).add(seconds)
+        if _metrics_file is not None:
+            _write_entry(record, total, failed)
+
+
+def _write_entry(record: _CommandRecord, total: float, failed: bool) -> None:
+    if _metrics_file is not None:
+        entry = {
+            "ts": round(time.time(), 3),
+            "command": record.name,
+            "total_ms": round(total * 1000, 4),
+            "phases_ms": {k: round(v * 1000, 4) for k, v in record.phases.items()},
+            "error": failed,
+        }
+        _metrics_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        _metrics_file.flush()
+
+
+def reset() -> None:
+    """Очищает накопленные гистограммы."""
+    with _lock:
+        _HISTOGRAMS.clear()
+
+
+def snapshot() -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Сводка гистограмм: команда -> фаза -> count/mean/p50/p99/max (мс)."""
+    return {
+        command: {
+            name: {
+                "count": h.count,
+                "mean_ms": round(h.mean, 4),
+                "p50_ms": round(h.percentile(0.5), 4),
+                "p99_ms": round(h.percentile(0.99), 4),
+                "max_ms": round(h.max, 4),
+            }
+            for name, h in histograms.items()
+        }
+        for command, histograms in _HISTOGRAMS.items()
+    }
+
+
+def format_stats() -> str:
+    """Текстовый отчет для команды stats."""
+    if not _HISTOGRAMS:
+        return "Статистика пока не собрана."
+    lines = []
+    for command, histograms in sorted(_HISTOGRAMS.items()):
+        total = histograms["total"]
+        lines.append(
+            f"{command}: вызовов {total.count}, среднее {total.mean:.3f} мс, "
+            f"p50 ≤{total.percentile(0.5):.3f} мс, "
+            f"p99 ≤{total.percentile(0.99):.3f} мс, max {total.max:.3f} мс"
+        )
+        for name in (*PHASES, "other"):
+            h = histograms.get(name)
+            if h is None:
+                continue
+            share = h.total / total.total * 100 if total.total else 0.0
+            lines.append(
+                f"    {name:<14} среднее {h.total / total.count:.3f} мс ({share:.1f}%)"
+            )
+    return "\n".join(lines)
+
+
+def profile_session(
+    func: Callable[[], Any],
+    out: TextIO = sys.stderr,
+    limit: int = 20,
+) -> Any:
+    """Выполняет func под cProfile и tracemalloc и печатает горячие точки."""
+    # Модули профилирования нужны только с --profile
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return func()
+    finally:
+        profiler.disable()
+        memory = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        buffer = io.StringIO()
+        stats = pstats.Stats(profiler, stream=buffer)
+        stats.sort_stats("cumulative").print_stats(limit)
+        out.write("\n=== Профиль CPU (по суммарному времени) ===\n")
+        out.write(buffer.getvalue())
+        out.write("=== Память (tracemalloc) ===\n")
+        out.write(f"текущая: {current / 1024:.1f} КиБ, пик: {peak / 1024:.1f} КиБ\n")
+        for stat in memory.statistics("lineno")[: limit // 2]:
+            out.write(f"{stat}\n")
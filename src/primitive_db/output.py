@@ -0,0 +1,127 @@
+"""
+Вывод результатов SELECT.
+
+Строки поступают потоком и выводятся по мере получения, не накапливаясь
+целиком. Форматы:
+
+- ``table`` — PrettyTable постранично: форматируется только текущая
+  страница; в интерактивном режиме после страницы спрашивается,
+  продолжать ли вывод;
+- ``plain`` — значения через табуляцию, первой строкой — заголовок;
+- ``csv`` — CSV с заголовком;
+- ``jsonl`` — по JSON-объекту на строку.
+"""
+
+import itertools
+import json
+import sys
+from typing import Any, Callable, Dict, Iterable, List
+
+from . import compact, metrics
+from .constants import OUTPUT_CHUNK_ROWS, OUTPUT_FORMATS, OUTPUT_PAGE_SIZE
+
+Row = Dict[str, Any]
+
+FORMATS = OUTPUT_FORMATS
+
+_settings: Dict[str, Any] = {
+    "format": "table",
+    "page_size": OUTPUT_PAGE_SIZE,
+    "pager": False,
+}
+
+
+def set_format(name: str, page_size: int | None = None) -> None:
+    """Задает формат вывода (и размер страницы для table)."""
+    if name not in FORMATS:
+        raise ValueError(f"Неизвестный формат вывода: {name}.")
+    if page_size is not None and page_size < 1:
+        raise ValueError("Размер страницы должен быть положительным.")
+    _settings["format"] = name
+    if page_size is not None:
+        _settings["page_size"] = page_size
+
+
+def current_format() -> str:
+    """Текущий формат вывода."""
+    return _settings["format"]
+
+
+def page_size() -> int:
+    """Число строк на странице формата table."""
+    return _settings["page_size"]
+
+
+def set_pager(enabled: bool) -> None:
+    """Включает запрос продолжения между страницами (интерактивный режим)."""
+    _settings["pager"] = enabled
+
+
+def _write_table(page: List[Row], first: bool) -> None:
+    # prettytable загружается при первом выводе таблицы, а не при запуске
+    from prettytable import PrettyTable
+
+    table = PrettyTable()
+    table.field_names = list(page[0])
+    table.add_rows([list(row.values()) for row in page])
+    print(table)
+
+
+def _write_plain(page: List[Row], first: bool) -> None:
+    lines = ["\t".join(page[0])] if first else []
+    lines.extend("\t".join(str(v) for v in row.values()) for row in page)
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+def _write_csv(page: List[Row], first: bool) -> None:
+    import csv
+
+    writer = csv.writer(sys.stdout, lineterminator="\n")
+    if first:
+        writer.writerow(page[0])
+    writer.writerows(row.values() for row in page)
+
+
+def _write_jsonl(page: List[Row], first: bool) -> None:
+    sys.stdout.write(
+        "".join(
+            json.dumps(row, ensure_ascii=False, default=compact.to_json) + "\n"
+            for row in page
+        )
+    )
+
+
+_WRITERS: Dict[str, Callable[[List[Row], bool], None]] = {
+    "table": _write_table,
+    "plain": _write_plain,
+    "csv": _write_csv,
+    "jsonl": _write_jsonl,
+}
+
+
+def _ask_more() -> bool:
+    try:
+        answer = input("-- Enter — следующая страница, q — прервать: ")
+    except (EOFError, KeyboardInterrupt):
+        return False
+    return answer.strip().lower() != "q"
+
+
+def write_rows(rows: Iterable[Row]) -> int:
+    """Выводит поток строк в текущем формате и возвращает их число."""
+    fmt = _settings["format"]
+    writer = _WRITERS[fmt]
+    size = _settings["page_size"] if fmt == "table" else OUTPUT_CHUNK_ROWS
+    rows = iter(rows)
+
+    count = 0
+    page = list(itertools.islice(rows, size))
+    while page:
+        with metrics.phase("render"):
+            writer(page, count == 0)
+            sys.stdout.flush()
+        count += len(page)
+        page = list(itertools.islice(rows, size))
+        if page and fmt == "table" and _settings["pager"] and not _ask_more():
+            break
+    return count
@@ -0,0 +1,120 @@
+"""
+Параллельное сканирование больших таблиц в пуле процессов.
+
+Снимок поколоночной таблицы делится на участки по номерам строк.
+Каждый рабочий процесс сам открывает файл снимка через mmap и проверяет
+условие на своем участке, так что строки таблицы не передаются между
+процессами — туда уходят только путь, условие и границы участка.
+Результаты склеиваются в порядке участков, то есть в порядке ID.
+"""
+
+import atexit
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+from . import columnar
+from .constants import (
+    PARALLEL_SCAN_MIN_ROWS,
+    PARALLEL_SCAN_PARTITION_ROWS,
+    PARALLEL_SCAN_WORKERS,
+)
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+Row = Dict[str, Any]
+
+_pool: "Executor | None" = None
+_pool_lock = threading.Lock()
+
+
+def workers() -> int:
+    """Число рабочих процессов (0 — параллельное сканирование отключено)."""
+    if PARALLEL_SCAN_WORKERS is not None:
+        return PARALLEL_SCAN_WORKERS
+    return os.cpu_count() or 1
+
+
+def _get_pool() -> "Executor":
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # multiprocessing и concurrent.futures загружаются только
+            # для первого параллельного сканирования, а не при запуске
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            methods = multiprocessing.get_all_start_methods()
+            # fork небезопасен в многопоточном процессе (сервер)
+            method = "forkserver" if "forkserver" in methods else "spawn"
+            _pool = ProcessPoolExecutor(
+                max_workers=workers(),
+                mp_context=multiprocessing.get_context(method),
+            )
+        return _pool
+
+
+def shutdown() -> None:
+    """Останавливает пул процессов, если он был запущен."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+
+atexit.register(shutdown)
+
+
+def partitions(
+    rows: int, size: int = PARALLEL_SCAN_PARTITION_ROWS
+) -> List[Tuple[int, int]]:
+    """Границы [start, stop) участков, покрывающих rows строк."""
+    return [(start, min(start + size, rows)) for start in range(0, rows, size)]
+
+
+def should_parallelize(condition: Any, rows: int) -> bool:
+    """Стоит ли сканировать снимок из rows строк параллельно.
+
+    Без условия все строки все равно материализуются в основном
+    процессе, а поиск по ID выполняется двоичным поиском, поэтому
+    в этих случаях пул процессов только замедлил бы выборку.
+    """
+    if condition is None or rows < PARALLEL_SCAN_MIN_ROWS or workers() < 2:
+        return False
+    if getattr(condition, "column", None) == "ID" and getattr(
+        condition, "op", None
+    ) == "=":
+        return False
+    return len(partitions(rows)) > 1
+
+
+def _scan_partition(path: str, condition: Any, start: int, stop: int) -> List[Row]:
+    """Выполняется в рабочем процессе: выборка из участка снимка."""
+    with columnar.ColumnarReader(path) as reader:
+        return reader.select(condition, start, stop)
+
+
+def scan(path: str, condition: Any, rows: int) -> List[Row]:
+    """Строки снимка, удовлетворяющие условию, в порядке ID."""
+    # Рабочие процессы могут иметь другой текущий каталог
+    path = os.path.abspath(path)
+    bounds = partitions(rows)
+    from concurrent.futures.process import BrokenProcessPool
+
+    try:
+        pool = _get_pool()
+        futures = [
+            pool.submit(_scan_partition, path, condition, start, stop)
+            for start, stop in bounds
+        ]
+        result: List[Row] = []
+        for future in futures:
+            result.extend(future.result())
+        return result
+    except (BrokenProcessPool, OSError):
+        # Процессы не удалось запустить — сканируем в текущем процессе
+        shutdown()
+        with columnar.ColumnarReader(path) as reader:
+            return reader.select(condition)
@@ -1,9 +1,32 @@
 """
-Функции для разбора сложных команд (where, set, values) через shlex.
+Разбор команд select/insert/update/delete в дерево (модуль statements).
+
+Текст команды один раз разбивается на токены (модуль ``lexer``),
+по которым рекурсивный спуск строит дерево; ключевые слова
+сравниваются без учета регистра. Здесь же разбираются описания
+столбцов create_table и значения CSV.
 """
 
-import shlex
-from typing import Any, Dict, List, Tuple
+import re
+from typing import Any, List, Tuple
+
+from .conditions import And, Comparison, InList, Or
+from .lexer import Token, tokenize
+from .statements import Delete, Insert, Param, Select, Statement, Update
+
+# Необязательные части SELECT в допустимом порядке (по первому слову)
+_SELECT_CLAUSES = ("where", "group", "order", "limit", "offset")
+_CLAUSE_NAMES = {"group": "group by", "order": "order by"}
+_COLUMN_NAME = re.compile(r"\w+(?:\.\w+)?")
+_INT_LITERAL = re.compile(r"-?\d+")
+_SELECT_USAGE = "Ошибка в синтаксисе SELECT. Используйте: select [...] from <table>"
+_INSERT_USAGE = (
+    "Ошибка в синтаксисе INSERT. Используйте: insert into <table> values (...)"
+)
+_JOIN_USAGE = (
+    "Ошибка в синтаксисе JOIN. Используйте: select [...] from <a> "
+    "join <b> on <a>.<столбец> = <b>.<столбец>"
+)
 
 
 def _convert_literal(val: str) -> Any:
@@ -17,8 +40,8 @@ def _convert_literal(val: str) -> Any:
         return True
     if val.lower() == "false":
         return False
-    # Обработка чисел
-    if val.isdigit():
+    # Обработка чисел (в том числе отрицательных)
+    if _INT_LITERAL.fullmatch(val):
         return int(val)
     return val
 
@@ -34,60 +57,415 @@ def parse_columns(tokens: List[str]) -> List[Tuple[str, str]]:
     return res
 
 
-def parse_condition(tokens: List[str]) -> Dict[str, Any]:
-    """Преобразует часть токенов ['age', '=', '25'] в словарь {'age': 25}."""
-    if len(tokens) < 3 or tokens[1] != "=":
-        raise ValueError("Некорректное условие. Используйте формат 'поле = значение'.")
-    return {tokens[0]: _convert_literal(tokens[2])}
+def parse_partitioning(
+    tokens: List[str],
+) -> Tuple[List[str], Tuple[str, str, int] | None]:
+    """Отделяет от токенов create_table описание секционирования.
+
+    ``partition by range <строк в секции>`` или
+    ``partition by hash <столбец> <число секций>``. Возвращает токены
+    столбцов и (вид, столбец, число) или None.
+    """
+    low = [t.lower() for t in tokens]
+    if "partition" not in low:
+        return tokens, None
+    pos = low.index("partition")
+    clause = low[pos:]
+    usage = (
+        "Используйте: partition by range <строк в секции> | "
+        "partition by hash <столбец> <число секций>"
+    )
+    if len(clause) == 4 and clause[1:3] == ["by", "range"]:
+        column, number = "ID", clause[3]
+    elif len(clause) == 5 and clause[1:3] == ["by", "hash"]:
+        column, number = tokens[pos + 3], clause[4]
+    else:
+        raise ValueError(usage)
+    try:
+        return tokens[:pos], (clause[2], column, int(number))
+    except ValueError:
+        raise ValueError(usage) from None
+
+
+def convert_typed(value: str, col_type: str) -> Any:
+    """Преобразует строку (например, из CSV) к типу столбца."""
+    value = value.strip()
+    if col_type == "int":
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError(f"Некорректное значение: {value}. Ожидался int.")
+    if col_type == "bool":
+        low = value.lower()
+        if low in ("true", "1"):
+            return True
+        if low in ("false", "0"):
+            return False
+        raise ValueError(f"Некорректное значение: {value}. Ожидался bool.")
+    return value
+
+
+class _Parser:
+    """Рекурсивный спуск по токенам команды.
+
+    Условие WHERE разбирается по грамматике:
+    expr := term (OR term)* ; term := atom (AND atom)*
+    atom := "(" expr ")" | col op value | col IN "(" value, .. ")"
+
+    С params=True вместо значений допускаются параметры ``?``;
+    их число накапливается в ``self.params``.
+    """
+
+    def __init__(self, tokens: List[Token], pos: int = 0, params: bool = False):
+        self.tokens = tokens
+        self.pos = pos
+        self.allow_params = params
+        self.params = 0
+
+    def _peek(self) -> Token | None:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _next(self, what: str = "конец команды") -> Token:
+        token = self._peek()
+        if token is None:
+            raise ValueError(f"Неожиданный {what}.")
+        self.pos += 1
+        return token
+
+    def _is_keyword(self, word: str) -> bool:
+        token = self._peek()
+        return token is not None and token.kind == "word" and token.low == word
+
+    def _accept(self, word: str) -> bool:
+        """Пропускает ключевое слово word, если оно следующее."""
+        if self._is_keyword(word):
+            self.pos += 1
+            return True
+        return False
+
+    def _is_punct(self, text: str) -> bool:
+        token = self._peek()
+        return token is not None and token.kind == "punct" and token.text == text
+
+    def _expect(self, text: str) -> None:
+        token = self._next()
+        if token.text != text or token.kind not in ("punct", "op"):
+            raise ValueError(f"Ожидалось '{text}', получено '{token.text}'.")
+
+    def _keyword(self, word: str, usage: str) -> None:
+        if not self._accept(word):
+            raise ValueError(usage)
+
+    def _name(self, usage: str) -> str:
+        token = self._peek()
+        if token is None or token.kind != "word":
+            raise ValueError(usage)
+        self.pos += 1
+        return token.text
+
+    def _value(self) -> Any:
+        token = self._next("конец условия")
+        if token.kind == "value":
+            return token.text
+        if token.kind == "word":
+            return _convert_literal(token.text)
+        if token.kind == "param":
+            return self._param()
+        raise ValueError(f"Ожидалось значение, получено '{token.text}'.")
+
+    def _param(self) -> Param:
+        if not self.allow_params:
+            raise ValueError("Параметры ? допустимы только в команде prepare.")
+        self.params += 1
+        return Param(self.params - 1)
+
+    def _count(self, clause: str) -> Any:
+        token = self._peek()
+        if token is not None and token.kind == "param":
+            self.pos += 1
+            return self._param()
+        if (
+            token is None or token.kind != "word"
+            or not _INT_LITERAL.fullmatch(token.text) or int(token.text) < 0
+        ):
+            raise ValueError(f"После {clause} нужно неотрицательное целое число.")
+        self.pos += 1
+        return int(token.text)
+
+    def end(self) -> None:
+        token = self._peek()
+        if token is not None:
+            raise ValueError(f"Лишний текст в команде: '{token.text}'.")
+
+    # --- WHERE ---
+
+    def condition(self) -> Any:
+        if self._peek() is None:
+            raise ValueError("Пустое условие WHERE.")
+        return self._expr()
+
+    def _expr(self) -> Any:
+        items = [self._term()]
+        while self._accept("or"):
+            items.append(self._term())
+        return items[0] if len(items) == 1 else Or(tuple(items))
+
+    def _term(self) -> Any:
+        items = [self._atom()]
+        while self._accept("and"):
+            items.append(self._atom())
+        return items[0] if len(items) == 1 else And(tuple(items))
+
+    def _atom(self) -> Any:
+        if self._is_punct("("):
+            self.pos += 1
+            condition = self._expr()
+            self._expect(")")
+            return condition
+
+        token = self._next("конец условия")
+        if token.kind != "word":
+            raise ValueError(f"Ожидалось имя столбца, получено '{token.text}'.")
+        column = token.text
+        if self._accept("in"):
+            self._expect("(")
+            values = [self._value()]
+            while self._is_punct(","):
+                self.pos += 1
+                values.append(self._value())
+            self._expect(")")
+            return InList(column, tuple(values))
+
+        op = self._next("конец условия")
+        if op.kind != "op":
+            raise ValueError(
+                "Некорректное условие. Используйте формат 'поле <оператор> значение'."
+            )
+        return Comparison(column, op.text, self._value())
+
+    # --- команды ---
+
+    def statement(self) -> Statement:
+        token = self._peek()
+        command = token.low if token is not None else ""
+        if command == "select":
+            return self._select()
+        if command == "insert":
+            return self._insert()
+        if command == "update":
+            return self._update()
+        if command == "delete":
+            return self._delete()
+        raise ValueError("Ожидалась команда select, insert, update или delete.")
+
+    def _select(self) -> Select:
+        self.pos += 1
+        items = self._select_list()
+        self._keyword("from", _SELECT_USAGE)
+        table = self._name(_SELECT_USAGE)
+        join = self._join(table) if self._accept("join") else None
+
+        parts: dict = {}
+        seen = -1
+        while self._peek() is not None:
+            word = self._peek().low
+            if word not in _SELECT_CLAUSES:
+                break
+            order = _SELECT_CLAUSES.index(word)
+            if order <= seen:
+                if word in parts:
+                    name = _CLAUSE_NAMES.get(word, word)
+                    raise ValueError(f"Часть '{name}' указана несколько раз.")
+                raise ValueError(
+                    "Порядок частей SELECT: where, group by, order by, limit, offset."
+                )
+            seen = order
+            self.pos += 1
+            if word == "where":
+                parts[word] = self.condition()
+            elif word == "group":
+                self._keyword("by", "После group нужно by.")
+                parts[word] = self._name("После group by нужно указать один столбец.")
+            elif word == "order":
+                self._keyword("by", "После order нужно by.")
+                parts[word] = self._order_by()
+            else:
+                parts[word] = self._count(word)
+        self.end()
+        return Select(
+            table,
+            where=parts.get("where"),
+            items=items,
+            group_by=parts.get("group"),
+            order_by=parts.get("order", ()),
+            limit=parts.get("limit"),
+            offset=parts.get("offset", 0),
+            join=join,
+        )
+
+    def _select_item(self) -> Tuple[str, str]:
+        """Выражение списка select: count(*), sum(age) или имя столбца."""
+        token = self._next()
+        if token.kind == "word" and self._is_punct("("):
+            self.pos += 1
+            arg = self._next()
+            if arg.kind != "word" and arg.text != "*":
+                raise ValueError(f"Некорректное выражение в select: '{token.text}'.")
+            self._expect(")")
+            return token.low, arg.text
+        if token.kind != "word" or not _COLUMN_NAME.fullmatch(token.text):
+            raise ValueError(f"Некорректное выражение в select: '{token.text}'.")
+        return "", token.text
+
+    def _select_list(self) -> Tuple[Tuple[str, str], ...]:
+        if self._is_keyword("from"):
+            return ()
+        if self._is_punct("*"):
+            self.pos += 1
+            return ()
+        items = [self._select_item()]
+        while self._is_punct(","):
+            self.pos += 1
+            items.append(self._select_item())
+        return tuple(items)
 
+    def _order_by(self) -> Tuple[Tuple[str, bool], ...]:
+        order_by = []
+        while True:
+            func, column = self._select_item()
+            if func:
+                column = f"{func}({column})"
+            descending = False
+            if self._accept("desc"):
+                descending = True
+            else:
+                self._accept("asc")
+            order_by.append((column, descending))
+            if not self._is_punct(","):
+                return tuple(order_by)
+            self.pos += 1
 
-def parse_insert_command(command: str) -> Tuple[str, List[Any]]:
-    """Разбирает команду INSERT."""
-    tokens = shlex.split(command)
-    if len(tokens) < 5 or tokens[3].lower() != "values":
-        raise ValueError("Ошибка в синтаксисе INSERT. Используйте: insert into <table> values (...)")
+    def _join(self, left: str) -> Tuple[str, str, str, str]:
+        """Источник ``a join b on a.x = b.y`` (join уже пропущен)."""
+        right = self._name(_JOIN_USAGE)
+        self._keyword("on", _JOIN_USAGE)
+        first = self._name(_JOIN_USAGE)
+        op = self._next()
+        if op.kind != "op" or op.text != "=":
+            raise ValueError(_JOIN_USAGE)
+        second = self._name(_JOIN_USAGE)
+        sides = {}
+        for name in (first, second):
+            table, dot, column = name.partition(".")
+            if not dot or not _COLUMN_NAME.fullmatch(name):
+                raise ValueError(_JOIN_USAGE)
+            sides[table] = column
+        if left == right:
+            raise ValueError("Соединение таблицы с самой собой не поддерживается.")
+        if set(sides) != {left, right}:
+            raise ValueError(
+                f"В условии on должны участвовать таблицы {left} и {right}."
+            )
+        return left, right, sides[left], sides[right]
 
-    table_name = tokens[2]
-    # Собираем значения, игнорируя возможные скобки, если они попали в токены
-    values = [_convert_literal(v.strip("(),")) for v in tokens[4:]]
-    return table_name, values
+    def _insert(self) -> Insert:
+        self.pos += 1
+        self._keyword("into", _INSERT_USAGE)
+        table = self._name(_INSERT_USAGE)
+        self._keyword("values", _INSERT_USAGE)
+        if not self._is_punct("("):
+            raise ValueError(_INSERT_USAGE)
+        rows = [self.arguments()]
+        while self._is_punct(","):
+            self.pos += 1
+            rows.append(self.arguments())
+        self.end()
+        return Insert(table, tuple(rows))
 
+    def arguments(self) -> Tuple[Any, ...]:
+        """Список значений в скобках: ``(v1, v2, ..)``."""
+        self._expect("(")
+        if self._is_punct(")"):
+            self.pos += 1
+            return ()
+        values = [self._value()]
+        while self._is_punct(","):
+            self.pos += 1
+            values.append(self._value())
+        self._expect(")")
+        return tuple(values)
 
-def parse_select_command(command: str) -> Tuple[str, Dict[str, Any] | None]:
-    """Разбирает команду SELECT."""
-    tokens = shlex.split(command)
-    table_name = tokens[2]
-    where_clause = None
+    def _update(self) -> Update:
+        self.pos += 1
+        usage = "Ошибка в синтаксисе UPDATE. Используйте: update <table> set .."
+        table = self._name(usage)
+        self._keyword("set", usage)
+        assignments = [self._assignment()]
+        while self._is_punct(","):
+            self.pos += 1
+            assignments.append(self._assignment())
+        self._keyword("where", "Ошибка в синтаксисе UPDATE: нужно условие WHERE.")
+        where = self.condition()
+        self.end()
+        return Update(table, tuple(assignments), where)
 
-    if "where" in [t.lower() for t in tokens]:
-        where_idx = [t.lower() for t in tokens].index("where")
-        where_clause = parse_condition(tokens[where_idx + 1:])
+    def _assignment(self) -> Tuple[str, Any]:
+        pair = self.tokens[self.pos : self.pos + 2]
+        if len(pair) < 2 or pair[0].kind != "word" or pair[1].text != "=":
+            raise ValueError(
+                "Некорректное условие. Используйте формат 'поле = значение'."
+            )
+        self.pos += 2
+        return pair[0].text, self._value()
 
-    return table_name, where_clause
+    def _delete(self) -> Delete:
+        self.pos += 1
+        usage = "Ошибка в синтаксисе DELETE. Используйте: delete from <table> where .."
+        self._keyword("from", usage)
+        table = self._name(usage)
+        self._keyword("where", "Ошибка в синтаксисе DELETE: нужно условие WHERE.")
+        where = self.condition()
+        self.end()
+        return Delete(table, where)
 
 
-def parse_update_command(command: str) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
-    """Разбирает команду UPDATE."""
-    tokens = shlex.split(command)
-    table_name = tokens[1]
+def parse_statement(command: str) -> Statement:
+    """Разбирает команду select/insert/update/delete в дерево."""
+    return _Parser(tokenize(command)).statement()
 
-    low_tokens = [t.lower() for t in tokens]
-    set_idx = low_tokens.index("set")
-    where_idx = low_tokens.index("where")
 
-    set_clause = parse_condition(tokens[set_idx + 1 : where_idx])
-    where_clause = parse_condition(tokens[where_idx + 1 :])
+def parse_where(text: str) -> Any:
+    """Разбирает текст условия WHERE в дерево условий."""
+    parser = _Parser(tokenize(text))
+    condition = parser.condition()
+    parser.end()
+    return condition
 
-    return table_name, set_clause, where_clause
 
+def parse_prepare(command: str) -> Tuple[str, Statement, int]:
+    """Разбирает ``prepare <имя> as <команда с параметрами ?>``.
 
-def parse_delete_command(command: str) -> Tuple[str, Dict[str, Any]]:
-    """Разбирает команду DELETE."""
-    tokens = shlex.split(command)
-    table_name = tokens[2]
+    Возвращает имя, дерево команды и число параметров.
+    """
+    tokens = tokenize(command)
+    if (
+        len(tokens) < 4 or tokens[1].kind != "word"
+        or tokens[2].kind != "word" or tokens[2].low != "as"
+    ):
+        raise ValueError("Используйте: prepare <имя> as <команда>")
+    parser = _Parser(tokens, pos=3, params=True)
+    statement = parser.statement()
+    return tokens[1].text, statement, parser.params
 
-    low_tokens = [t.lower() for t in tokens]
-    where_idx = low_tokens.index("where")
-    where_clause = parse_condition(tokens[where_idx + 1:])
 
-    return table_name, where_clause
+def parse_execute(command: str) -> Tuple[str, Tuple[Any, ...]]:
+    """Разбирает ``execute <имя> [(аргумент, ..)]``."""
+    tokens = tokenize(command)
+    if len(tokens) < 2 or tokens[1].kind != "word":
+        raise ValueError("Используйте: execute <имя> (аргумент, ..)")
+    if len(tokens) == 2:
+        return tokens[1].text, ()
+    parser = _Parser(tokens, pos=2)
+    args = parser.arguments()
+    parser.end()
+    return tokens[1].text, args
@@ -0,0 +1,206 @@
+"""
+Секционирование таблиц по диапазонам ID или по хэшу столбца.
+
+Секционирование задается при ``create_table`` и хранится в описании
+таблицы в ``db_meta.json`` (поле ``partitions``)::
+
+    {"by": "range", "column": "ID", "size": 100000, "parts": [...]}
+    {"by": "hash", "column": "name", "count": 8, "parts": [...]}
+
+Секция по диапазону ``range`` с номером n содержит строки с ID от
+``n * size + 1`` до ``(n + 1) * size``; новые секции появляются по мере
+роста ID, поэтому вставка затрагивает только последнюю. Секция ``hash``
+выбирается по CRC32 значения столбца; число секций постоянно.
+
+Каждая секция хранится своими файлами (``data/<table>#<n>.*``, формат
+тот же, что у таблицы) и описывается в ``parts`` числом строк и
+минимумами/максимумами столбцов. Границы только расширяются: после
+удаления или изменения строки они остаются верной, хотя и не точной,
+оценкой, поэтому секцию можно пропустить, только если условие
+исключено границами. ``vacuum`` пересчитывает их точно.
+"""
+
+import json
+import zlib
+from typing import Any, Dict, Iterable, List
+
+from .conditions import And, Comparison, InList, Or
+from .constants import PARTITION_MAX_COUNT, PARTITION_SEP
+
+Row = Dict[str, Any]
+
+PARTITION_KINDS = ("range", "hash")
+
+
+def make_spec(
+    columns: List[Dict[str, str]],
+    kind: str,
+    column: str,
+    number: int,
+) -> Dict[str, Any]:
+    """Описание секционирования для новой таблицы.
+
+    number — строк ID в секции для ``range`` или число секций для ``hash``.
+    """
+    if kind not in PARTITION_KINDS:
+        raise ValueError(f"Некорректный вид секционирования: {kind}.")
+    if column not in {c["name"] for c in columns}:
+        raise KeyError(column)
+    if kind == "range":
+        if column != "ID":
+            raise ValueError("Секционирование по диапазону возможно только по ID.")
+        if number < 1:
+            raise ValueError("Размер секции должен быть положительным.")
+        return {"by": "range", "column": "ID", "size": number, "parts": []}
+    if not 1 <= number <= PARTITION_MAX_COUNT:
+        raise ValueError(
+            f"Число секций должно быть от 1 до {PARTITION_MAX_COUNT}."
+        )
+    parts = [_empty_part() for _ in range(number)]
+    return {"by": "hash", "column": column, "count": number, "parts": parts}
+
+
+def part_name(table_name: str, number: int) -> str:
+    """Имя секции, по которому движок хранения называет ее файлы."""
+    return f"{table_name}{PARTITION_SEP}{number}"
+
+
+def _empty_part() -> Dict[str, Any]:
+    return {"rows": 0, "min": {}, "max": {}}
+
+
+def _hash(value: Any) -> int:
+    # hash() строк меняется от запуска к запуску, CRC32 — нет
+    return zlib.crc32(json.dumps(value).encode("utf-8"))
+
+
+def partition_of(spec: Dict[str, Any], row: Row) -> int:
+    """Номер секции, в которой хранится строка."""
+    if spec["by"] == "range":
+        return (row["ID"] - 1) // spec["size"]
+    return _hash(row[spec["column"]]) % spec["count"]
+
+
+def _part(spec: Dict[str, Any], number: int) -> Dict[str, Any]:
+    """Описание секции; недостающие секции диапазона создаются пустыми."""
+    parts = spec["parts"]
+    while len(parts) <= number:
+        parts.append(_empty_part())
+    return parts[number]
+
+
+def _extend(part: Dict[str, Any], row: Row, columns: Iterable[str]) -> None:
+    low, high = part["min"], part["max"]
+    for col in columns:
+        value = row[col]
+        if col not in low or value < low[col]:
+            low[col] = value
+        if col not in high or value > high[col]:
+            high[col] = value
+
+
+def add_rows(spec: Dict[str, Any], rows: Iterable[Row]) -> None:
+    """Учитывает новые строки в описаниях их секций."""
+    for row in rows:
+        part = _part(spec, partition_of(spec, row))
+        part["rows"] += 1
+        _extend(part, row, row.keys())
+
+
+def widen(spec: Dict[str, Any], rows: Iterable[Row], columns: List[str]) -> None:
+    """Расширяет границы секций новыми значениями измененных столбцов."""
+    for row in rows:
+        _extend(_part(spec, partition_of(spec, row)), row, columns)
+
+
+def remove_rows(spec: Dict[str, Any], rows: Iterable[Row]) -> None:
+    """Учитывает удаление строк (границы секций не сужаются)."""
+    for row in rows:
+        _part(spec, partition_of(spec, row))["rows"] -= 1
+
+
+def recompute(spec: Dict[str, Any], rows: Iterable[Row]) -> None:
+    """Пересчитывает число строк и точные границы всех секций."""
+    count = len(spec["parts"])
+    spec["parts"] = [_empty_part() for _ in range(count)]
+    add_rows(spec, rows)
+
+
+def check_assignments(spec: Dict[str, Any], columns: Iterable[str]) -> None:
+    """Запрещает изменять столбец, по которому выбирается секция."""
+    if spec["column"] in columns:
+        raise ValueError(
+            f'Столбец секционирования "{spec["column"]}" нельзя изменить.'
+        )
+
+
+def _bounds_allow(part: Dict[str, Any], column: str, op: str, value: Any) -> bool:
+    """Может ли в секции найтись значение столбца, подходящее под сравнение."""
+    low, high = part["min"].get(column), part["max"].get(column)
+    if low is None or high is None:
+        return True
+    # Как и в conditions, bool не сравнивается с int
+    if isinstance(value, bool) != isinstance(low, bool):
+        return False
+    try:
+        if op == "=":
+            return low <= value <= high
+        if op == "!=":
+            return not low == high == value
+        if op == "<":
+            return low < value
+        if op == "<=":
+            return low <= value
+        if op == ">":
+            return high > value
+        if op == ">=":
+            return high >= value
+    except TypeError:
+        return False
+    return True
+
+
+def _may_match(
+    spec: Dict[str, Any], number: int, part: Dict[str, Any], condition: Any
+) -> bool:
+    if isinstance(condition, Comparison):
+        if (
+            spec["by"] == "hash"
+            and condition.column == spec["column"]
+            and condition.op == "="
+            and _hash(condition.value) % spec["count"] != number
+        ):
+            return False
+        return _bounds_allow(part, condition.column, condition.op, condition.value)
+    if isinstance(condition, InList):
+        return any(
+            _may_match(spec, number, part, Comparison(condition.column, "=", v))
+            for v in condition.values
+        )
+    if isinstance(condition, And):
+        return all(_may_match(spec, number, part, c) for c in condition.items)
+    if isinstance(condition, Or):
+        return any(_may_match(spec, number, part, c) for c in condition.items)
+    return True
+
+
+def candidates(spec: Dict[str, Any], condition: Any) -> List[int]:
+    """Номера непустых секций, которые не исключены условием."""
+    return [
+        number
+        for number, part in enumerate(spec["parts"])
+        if part["rows"] > 0
+        and (condition is None or _may_match(spec, number, part, condition))
+    ]
+
+
+def label(spec: Dict[str, Any]) -> str:
+    """Вид секционирования словами."""
+    if spec["by"] == "range":
+        return f"по диапазонам ID по {spec['size']} строк"
+    return f'по хэшу столбца "{spec["column"]}"'
+
+
+def describe(spec: Dict[str, Any], numbers: List[int]) -> str:
+    """Строка для explain: сколько секций будет прочитано."""
+    return f"Секции ({label(spec)}): читается {len(numbers)} из {len(spec['parts'])}"
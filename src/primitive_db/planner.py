@@ -0,0 +1,608 @@
+"""
+Планировщик запросов: превращает разобранную команду в план выполнения.
+
+План содержит скомпилированный предикат (замыкание с заранее выбранными
+столбцом, оператором и значением), проверенные по схеме присваивания
+для UPDATE и способ доступа к строкам: полный просмотр или индекс.
+"""
+
+import copy
+import operator
+from typing import Any, Callable, Dict, Iterator, List, Set, Tuple
+
+from . import compact, conditions
+from .conditions import And, Comparison, InList, Or
+from .constants import PARALLEL_SCAN_MIN_ROWS
+from .indexes import PRIMARY_KEY, index_defs
+from .statements import Param
+
+Row = Dict[str, Any]
+Predicate = Callable[[Row], bool]
+
+# Столбцы этих типов проверяются при компиляции, а не для каждой строки
+_TYPED = {
+    "int": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "bool": lambda v: isinstance(v, bool),
+}
+
+
+def _never(row: Row) -> bool:
+    return False
+
+
+def compile_condition(
+    condition: Any,
+    types: Dict[str, str] | None = None,
+    records: bool = False,
+) -> Predicate:
+    """Компилирует дерево условий в функцию row -> bool.
+
+    Если известны типы столбцов, несовместимые сравнения отбрасываются
+    заранее, а для int/bool сравнение выполняется без проверок типов.
+    С records=True предикат читает столбцы компактных записей через
+    ``attrgetter`` (см. модуль compact), а не через ``row[column]``.
+    """
+    if isinstance(condition, Comparison):
+        column, value = condition.column, condition.value
+        if types is not None and column not in types:
+            raise KeyError(column)
+        is_valid = _TYPED.get(types[column]) if types is not None else None
+        get = operator.attrgetter(column) if records else None
+        if is_valid is None:
+            if get is None:
+                return condition.matches
+            return lambda row: condition.test(get(row))
+        if not is_valid(value):
+            return _never
+        compare = conditions.OPERATORS[condition.op]
+        if get is not None:
+            return lambda row: compare(get(row), value)
+        return lambda row: compare(row[column], value)
+
+    if isinstance(condition, InList):
+        column = condition.column
+        if types is not None and column not in types:
+            raise KeyError(column)
+        is_valid = _TYPED.get(types[column]) if types is not None else None
+        get = operator.attrgetter(column) if records else None
+        if is_valid is None:
+            if get is None:
+                return condition.matches
+            return lambda row: condition.test(get(row))
+        values = frozenset(v for v in condition.values if is_valid(v))
+        if not values:
+            return _never
+        if get is not None:
+            return lambda row: get(row) in values
+        return lambda row: row[column] in values
+
+    if isinstance(condition, (And, Or)):
+        parts = [compile_condition(item, types, records) for item in condition.items]
+        if isinstance(condition, And):
+            return lambda row: all(part(row) for part in parts)
+        return lambda row: any(part(row) for part in parts)
+
+    raise ValueError(f"Неизвестное условие: {condition!r}")
+
+
+class AccessPath:
+    """Способ получения строк-кандидатов."""
+
+    # Чем меньше, тем избирательнее (используется при выборе пути)
+    rank = 100
+
+    def ids(self, indexes: Dict[str, Any]) -> Set[int] | None:
+        """ID кандидатов или None для полного просмотра."""
+        return None
+
+    def describe(self) -> str:
+        return "полный просмотр таблицы"
+
+
+class IndexLookup(AccessPath):
+    """Поиск значений (= или IN) по индексу."""
+
+    def __init__(self, column: str, kind: str, values: Tuple[Any, ...]) -> None:
+        self.column = column
+        self.kind = kind
+        self.values = values
+        self.rank = (0 if column == PRIMARY_KEY else 1) + (len(values) > 1)
+
+    def ids(self, indexes: Dict[str, Any]) -> Set[int]:
+        index = indexes[self.column]
+        result: Set[int] = set()
+        for value in self.values:
+            result |= index.lookup(value)
+        return result
+
+    def describe(self) -> str:
+        values = ", ".join(repr(v) for v in self.values)
+        return f"индекс {self.kind} по {self.column}, значения: {values}"
+
+
+class IndexRange(AccessPath):
+    """Диапазон по упорядоченному индексу."""
+
+    rank = 3
+
+    def __init__(self, column: str, kind: str, op: str, value: Any) -> None:
+        self.column = column
+        self.kind = kind
+        self.op = op
+        self.value = value
+
+    def ids(self, indexes: Dict[str, Any]) -> Set[int] | None:
+        try:
+            return indexes[self.column].range(self.op, self.value)
+        except TypeError:
+            return None
+
+    def describe(self) -> str:
+        return (
+            f"индекс {self.kind} по {self.column}, "
+            f"диапазон {self.column} {self.op} {self.value!r}"
+        )
+
+
+class IndexUnion(AccessPath):
+    """Объединение индексных путей для ветвей OR."""
+
+    def __init__(self, paths: List[AccessPath]) -> None:
+        self.paths = paths
+        self.rank = 4 + max(p.rank for p in paths)
+
+    def ids(self, indexes: Dict[str, Any]) -> Set[int] | None:
+        result: Set[int] = set()
+        for path in self.paths:
+            ids = path.ids(indexes)
+            if ids is None:
+                return None
+            result |= ids
+        return result
+
+    def describe(self) -> str:
+        return "объединение: " + "; ".join(p.describe() for p in self.paths)
+
+
+FULL_SCAN = AccessPath()
+
+
+def choose_access(condition: Any, index_kinds: Dict[str, str]) -> AccessPath:
+    """Выбирает самый избирательный доступный путь доступа."""
+    if isinstance(condition, Comparison):
+        kind = index_kinds.get(condition.column)
+        if kind is None:
+            return FULL_SCAN
+        if condition.op == "=":
+            return IndexLookup(condition.column, kind, (condition.value,))
+        if condition.op in conditions.RANGE_OPERATORS and kind in ("sorted", "pk"):
+            return IndexRange(condition.column, kind, condition.op, condition.value)
+        return FULL_SCAN
+    if isinstance(condition, InList):
+        kind = index_kinds.get(condition.column)
+        if kind is None:
+            return FULL_SCAN
+        return IndexLookup(condition.column, kind, condition.values)
+    if isinstance(condition, And):
+        paths = [choose_access(item, index_kinds) for item in condition.items]
+        return min(paths, key=lambda p: p.rank)
+    if isinstance(condition, Or):
+        paths = [choose_access(item, index_kinds) for item in condition.items]
+        if any(p is FULL_SCAN for p in paths):
+            return FULL_SCAN
+        return IndexUnion(paths)
+    return FULL_SCAN
+
+
+class Plan:
+    """Скомпилированный план команды select/update/delete."""
+
+    def __init__(
+        self,
+        statement: str,
+        table_name: str,
+        condition: Any = None,
+        types: Dict[str, str] | None = None,
+        index_kinds: Dict[str, str] | None = None,
+        assignments: Dict[str, Any] | None = None,
+        storage: str = "",
+    ) -> None:
+        self.statement = statement
+        self.table_name = table_name
+        self.condition = condition
+        self.types = types
+        self.predicate = (
+            compile_condition(condition, types) if condition is not None else None
+        )
+        self._record_predicate: Predicate | None = None
+        self.access = (
+            choose_access(condition, index_kinds or {})
+            if condition is not None else FULL_SCAN
+        )
+        self.assignments = assignments or {}
+        self.storage = storage
+
+    def predicate_for(self, rows: List[Row]) -> Predicate:
+        """Предикат для строк rows: словарей или компактных записей."""
+        if not rows or not isinstance(rows[0], compact.Record):
+            return self.predicate
+        if self._record_predicate is None:
+            self._record_predicate = compile_condition(
+                self.condition, self.types, records=True
+            )
+        return self._record_predicate
+
+    def find(self, table_data: List[Row], indexes: Dict[str, Any] | None) -> List[Row]:
+        """Выполняет план над загруженной таблицей."""
+        if self.predicate is None:
+            return table_data
+        predicate = self.predicate_for(table_data)
+        if indexes and self.access is not FULL_SCAN:
+            ids = self.access.ids(indexes)
+            if ids is not None:
+                candidates = indexes[PRIMARY_KEY].fetch(ids)
+                return [row for row in candidates if predicate(row)]
+        return [row for row in table_data if predicate(row)]
+
+    def iter_find(
+        self, table_data: List[Row], indexes: Dict[str, Any] | None
+    ) -> Iterator[Row]:
+        """Как find, но при полном просмотре выдает строки по одной."""
+        if self.predicate is None:
+            return iter(table_data)
+        if indexes and self.access is not FULL_SCAN:
+            return iter(self.find(table_data, indexes))
+        predicate = self.predicate_for(table_data)
+        return (row for row in table_data if predicate(row))
+
+    def describe(self) -> str:
+        """Текстовое описание плана для команды explain."""
+        lines = [f'План: {self.statement} для таблицы "{self.table_name}"']
+        lines.append(f"Доступ: {self.access.describe()}")
+        if self.condition is not None:
+            lines.append(f"Фильтр: {format_condition(self.condition)}")
+        if self.assignments:
+            sets = ", ".join(f"{k} = {v!r}" for k, v in self.assignments.items())
+            lines.append(f"Присваивания: {sets}")
+        if self.storage:
+            lines.append(f"Формат хранения: {self.storage}")
+        if self.storage == "columnar" and self.statement == "select":
+            lines.append(
+                "Если таблица не загружена: чтение снимка через mmap "
+                "по столбцам условия"
+            )
+            if self.condition is not None:
+                lines.append(
+                    f"Снимок от {PARALLEL_SCAN_MIN_ROWS} строк сканируется "
+                    "параллельно в пуле процессов"
+                )
+        return "\n".join(lines)
+
+
+def format_condition(condition: Any) -> str:
+    """Человекочитаемая запись условия."""
+    if isinstance(condition, Comparison):
+        return f"{condition.column} {condition.op} {condition.value!r}"
+    if isinstance(condition, InList):
+        values = ", ".join(repr(v) for v in condition.values)
+        return f"{condition.column} in ({values})"
+    if isinstance(condition, (And, Or)):
+        glue = " and " if isinstance(condition, And) else " or "
+        return "(" + glue.join(format_condition(i) for i in condition.items) + ")"
+    return repr(condition)
+
+
+def as_str(value: Any) -> str:
+    """Значение для столбца str: литералы без кавычек хранятся строками.
+
+    Столбец не должен смешивать строки с числами: их нельзя сравнить
+    при поиске минимума и максимума и при сортировке.
+    """
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value if isinstance(value, str) else str(value)
+
+
+def coerce_condition(condition: Any, types: Dict[str, str]) -> Any:
+    """Копия условия, в которой значения для столбцов str приведены к строке.
+
+    Так ``name = 5`` находит строку, вставленную как ``values (5)``:
+    при вставке такое значение тоже сохраняется строкой (см. as_str).
+    Параметры подготовленной команды и None не изменяются.
+    """
+    def coerce(column: str, value: Any) -> Any:
+        if types.get(column) != "str" or value is None or isinstance(value, Param):
+            return value
+        return as_str(value)
+
+    if isinstance(condition, Comparison):
+        return condition._replace(value=coerce(condition.column, condition.value))
+    if isinstance(condition, InList):
+        return condition._replace(
+            values=tuple(coerce(condition.column, v) for v in condition.values)
+        )
+    if isinstance(condition, (And, Or)):
+        return type(condition)(
+            tuple(coerce_condition(item, types) for item in condition.items)
+        )
+    return condition
+
+
+def validate_assignments(
+    types: Dict[str, str],
+    set_clause: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Проверяет типы присваиваемых значений один раз для всей команды.
+
+    Тип параметра подготовленной команды проверяется после подстановки.
+    Значения для столбцов str приводятся к строке.
+    """
+    assignments = dict(set_clause)
+    for col_name, new_val in set_clause.items():
+        if col_name not in types:
+            raise KeyError(col_name)
+        if col_name == PRIMARY_KEY:
+            raise ValueError("Столбец ID изменять нельзя.")
+        if isinstance(new_val, Param):
+            continue
+        if types[col_name] == "int" and not isinstance(new_val, int):
+            raise ValueError(f"Ожидался int для {col_name}")
+        if types[col_name] == "bool" and not isinstance(new_val, bool):
+            raise ValueError(f"Ожидался bool для {col_name}")
+        if types[col_name] == "str":
+            assignments[col_name] = as_str(new_val)
+    return assignments
+
+
+def available_indexes(table_meta: Dict[str, Any]) -> Dict[str, str]:
+    """Столбцы с индексами и их вид (ID — неявный первичный ключ)."""
+    kinds = {PRIMARY_KEY: "pk"}
+    kinds.update(dict(index_defs(table_meta)))
+    return kinds
+
+
+class PlanTemplate:
+    """Часть плана, которая зависит только от описания таблицы.
+
+    Типы столбцов, доступные индексы и формат хранения читаются из
+    метаданных один раз; подготовленная команда (``Prepared``) хранит
+    шаблон и строит по нему планы для каждого набора аргументов.
+    """
+
+    def __init__(self, metadata: Dict[str, Any], statement: str, table_name: str):
+        if table_name not in metadata:
+            raise KeyError(table_name)
+        table_meta = metadata[table_name]
+        self.statement = statement
+        self.table_name = table_name
+        self.types = {c["name"]: c["type"] for c in table_meta["columns"]}
+        self.index_kinds = available_indexes(table_meta)
+        self.storage = table_meta.get("storage", "")
+        self._key = copy.deepcopy(_schema_key(table_meta))
+
+    @property
+    def columns(self) -> List[str]:
+        """Имена столбцов в порядке схемы."""
+        return list(self.types)
+
+    def valid_for(self, metadata: Dict[str, Any]) -> bool:
+        """Не изменились ли с построения шаблона столбцы, индексы и формат."""
+        table_meta = metadata.get(self.table_name)
+        return table_meta is not None and _schema_key(table_meta) == self._key
+
+    def plan(
+        self,
+        where_clause: Any = None,
+        set_clause: Dict[str, Any] | None = None,
+    ) -> Plan:
+        """План команды с данными условием и присваиваниями."""
+        assignments = (
+            validate_assignments(self.types, set_clause)
+            if set_clause is not None else None
+        )
+        condition = conditions.as_condition(where_clause)
+        if condition is not None:
+            condition = coerce_condition(condition, self.types)
+        return Plan(
+            self.statement,
+            self.table_name,
+            condition,
+            types=self.types,
+            index_kinds=self.index_kinds,
+            assignments=assignments,
+            storage=self.storage,
+        )
+
+
+def _schema_key(table_meta: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (
+        table_meta["columns"], table_meta.get("indexes"), table_meta.get("storage")
+    )
+
+
+def plan_statement(
+    metadata: Dict[str, Any],
+    statement: str,
+    table_name: str,
+    where_clause: Any = None,
+    set_clause: Dict[str, Any] | None = None,
+) -> Plan:
+    """Строит план команды по метаданным таблицы (без загрузки данных)."""
+    return PlanTemplate(metadata, statement, table_name).plan(where_clause, set_clause)
+
+
+class Prepared:
+    """Подготовленная команда: дерево с параметрами ``?`` и шаблон плана.
+
+    Шаблон строится при первом использовании и перестраивается, только
+    если описание таблицы изменилось (см. ``PlanTemplate.valid_for``).
+    """
+
+    def __init__(self, name: str, statement: Any, params: int) -> None:
+        self.name = name
+        self.statement = statement
+        self.params = params
+        self._template: PlanTemplate | None = None
+
+    def template(self, metadata: Dict[str, Any]) -> PlanTemplate:
+        """Шаблон плана, актуальный для metadata."""
+        template = self._template
+        if template is None or not template.valid_for(metadata):
+            template = PlanTemplate(
+                metadata, self.statement.keyword, self.statement.table
+            )
+            self._template = template
+        return template
+
+
+def plan_where(where_clause: Any, indexes: Dict[str, Any] | None = None) -> Plan:
+    """План для условия без схемы (используется функциями core напрямую)."""
+    index_kinds = {}
+    for column, index in (indexes or {}).items():
+        if column == PRIMARY_KEY:
+            index_kinds[column] = "pk"
+        else:
+            index_kinds[column] = "sorted" if hasattr(index, "range") else "hash"
+    return Plan("select", "", conditions.as_condition(where_clause),
+                index_kinds=index_kinds)
+
+
+class JoinPlan:
+    """План соединения двух таблиц по равенству столбцов (hash join).
+
+    Столбцы результата называются ``<таблица>.<столбец>``. Условия WHERE,
+    затрагивающие одну таблицу, проверяются при чтении этой таблицы
+    (планом ``table_plans``), остальные — на соединенных строках.
+
+    Хэш-таблица строится по меньшей стороне (по числу строк). Если на
+    столбце соединения одной из таблиц есть индекс, вместо построения
+    используется он, а другая таблица просматривается потоком.
+    """
+
+    def __init__(
+        self,
+        metadata: Dict[str, Any],
+        join: Tuple[str, str, str, str],
+        condition: Any,
+        counts: Dict[str, int],
+    ) -> None:
+        self.left, self.right, left_column, right_column = join
+        self.on = {self.left: left_column, self.right: right_column}
+        schemas = {}
+        for table_name, column in self.on.items():
+            if table_name not in metadata:
+                raise KeyError(table_name)
+            schemas[table_name] = {
+                c["name"]: c["type"] for c in metadata[table_name]["columns"]
+            }
+            if column not in schemas[table_name]:
+                raise KeyError(f"{table_name}.{column}")
+        if schemas[self.left][left_column] != schemas[self.right][right_column]:
+            raise ValueError("Столбцы соединения должны быть одного типа.")
+        self._schemas = schemas
+        self.types = {
+            f"{table_name}.{name}": col_type
+            for table_name, schema in schemas.items()
+            for name, col_type in schema.items()
+        }
+        self.columns = list(self.types)
+        self.counts = counts
+
+        # Условия на одну таблицу проверяются при ее чтении
+        pushed: Dict[str, List[Any]] = {self.left: [], self.right: []}
+        residual = []
+        if condition is not None:
+            condition = conditions.rename(condition, self.resolve)
+        for item in conditions.conjuncts(condition):
+            tables = {c.split(".", 1)[0] for c in conditions.columns(item)}
+            if len(tables) == 1:
+                pushed[tables.pop()].append(
+                    conditions.rename(item, lambda c: c.split(".", 1)[1])
+                )
+            else:
+                residual.append(item)
+        self.table_plans = {
+            table_name: plan_statement(
+                metadata, "select", table_name, _combine(items)
+            )
+            for table_name, items in pushed.items()
+        }
+        self.condition = _combine(residual)
+        self.predicate = (
+            compile_condition(self.condition, self.types)
+            if self.condition is not None else None
+        )
+
+        # Сторона с индексом на столбце соединения не строит хэш-таблицу
+        indexed = [
+            table_name for table_name, column in self.on.items()
+            if column in available_indexes(metadata[table_name])
+        ]
+        if indexed:
+            self.build = max(indexed, key=lambda t: counts.get(t, 0))
+            self.index_kind = available_indexes(metadata[self.build])[
+                self.on[self.build]
+            ]
+        else:
+            self.build = min(
+                (self.right, self.left), key=lambda t: counts.get(t, 0)
+            )
+            self.index_kind = None
+        self.probe = self.right if self.build == self.left else self.left
+
+    def resolve(self, column: str) -> str:
+        """Полное имя столбца (``a.x``) по имени из команды."""
+        if "." in column:
+            if column not in self.types:
+                raise KeyError(column)
+            return column
+        owners = [t for t, schema in self._schemas.items() if column in schema]
+        if not owners:
+            raise KeyError(column)
+        if len(owners) > 1:
+            raise ValueError(
+                f'Столбец "{column}" есть в обеих таблицах: укажите '
+                f"{self.left}.{column} или {self.right}.{column}."
+            )
+        return f"{owners[0]}.{column}"
+
+    def describe(self) -> str:
+        """Текстовое описание плана для команды explain."""
+        on = (
+            f"{self.left}.{self.on[self.left]} = "
+            f"{self.right}.{self.on[self.right]}"
+        )
+        lines = [f"План: hash join {self.left} и {self.right} по {on}"]
+        build = f"{self.build}.{self.on[self.build]}"
+        if self.index_kind is not None:
+            lines.append(f"Хэш-таблица: индекс {self.index_kind} по {build}")
+        else:
+            lines.append(
+                f"Хэш-таблица: строится по {build} "
+                f"(меньшая сторона, строк: {self.counts.get(self.build, 0)})"
+            )
+        lines.append(
+            f"Просмотр: {self.probe} (строк: {self.counts.get(self.probe, 0)}), "
+            "результат выдается потоком"
+        )
+        for table_name in (self.left, self.right):
+            plan = self.table_plans[table_name]
+            if plan.condition is None:
+                continue
+            if table_name == self.build and self.index_kind is not None:
+                access = "проверяется у строк, найденных по индексу"
+            else:
+                access = plan.access.describe()
+            lines.append(
+                f"Фильтр {table_name}: {format_condition(plan.condition)} ({access})"
+            )
+        if self.condition is not None:
+            lines.append(f"Фильтр после соединения: {format_condition(self.condition)}")
+        return "\n".join(lines)
+
+
+def _combine(items: List[Any]) -> Any:
+    """Условие из списка конъюнктов (None для пустого списка)."""
+    if not items:
+        return None
+    return items[0] if len(items) == 1 else And(tuple(items))
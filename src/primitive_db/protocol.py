@@ -0,0 +1,32 @@
+"""
+Строковый протокол сетевого режима.
+
+Клиент отправляет одну команду на строку (UTF-8). Сервер отвечает
+строкой статуса ``OK`` или ``ERR <сообщение>``, затем выводом команды
+и строкой-терминатором ``.``. Строки вывода, начинающиеся с точки,
+передаются с дополнительной точкой в начале.
+"""
+
+from typing import Iterable, List
+
+TERMINATOR = "."
+STATUS_OK = "OK"
+STATUS_ERROR = "ERR"
+
+
+def encode_response(output: str, error: str | None = None) -> bytes:
+    """Кодирует ответ сервера."""
+    status = STATUS_OK if error is None else f"{STATUS_ERROR} {error}"
+    lines = [status.replace("\n", " ")]
+    for line in output.splitlines():
+        lines.append("." + line if line.startswith(".") else line)
+    lines.append(TERMINATOR)
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def decode_body(lines: Iterable[str]) -> str:
+    """Собирает вывод команды из строк ответа (без статуса и терминатора)."""
+    result: List[str] = []
+    for line in lines:
+        result.append(line[1:] if line.startswith("..") else line)
+    return "\n".join(result)
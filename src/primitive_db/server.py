@@ -0,0 +1,350 @@
+"""
+Сетевой режим: ``database serve``.
+
+Сервер принимает команды на том же языке, что и интерактивный режим,
+по TCP или Unix-сокету (см. модуль ``protocol``). Метаданные и таблицы
+остаются в памяти между командами; перед каждой командой проверяется,
+не изменил ли файлы таблицы другой процесс.
+
+Команда, завершившаяся ошибкой, возвращается клиенту со статусом
+``ERR``. Подготовленные команды (``prepare``) видны только соединению,
+которое их создало. Сессия, формат вывода и статистика общие для всех
+клиентов, поэтому транзакции (``begin``/``commit``/``rollback``),
+``output <формат>`` и ``stats reset`` отклоняются.
+
+Команды выполняются в пуле потоков. Чтения одной таблицы идут
+параллельно, изменения таблицы выполняются по одному и не пересекаются
+с ее чтением. Создание и удаление таблиц ожидает завершения всех команд.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import shlex
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, List, Tuple
+
+from . import engine, planner, statements
+from .constants import SERVER_HOST, SERVER_LINE_LIMIT, SERVER_PORT, SERVER_WORKERS
+from .decorators import set_auto_confirm, take_error
+from .protocol import encode_response
+
+# Команды, изменяющие одну таблицу
+WRITE_COMMANDS = {
+    "insert", "update", "delete", "load_csv",
+    "create_index", "drop_index", "convert_table", "vacuum",
+}
+# Команды, меняющие набор таблиц
+DDL_COMMANDS = {"create_table", "drop_table"}
+# Транзакции требуют отдельной сессии на соединение; commit сбросил бы
+# изменения и блокировки писателя команд других клиентов
+TRANSACTION_COMMANDS = {"begin", "commit", "rollback"}
+# С аргументами эти команды меняют настройки процесса для всех клиентов
+# (формат вывода, накопленную статистику); без аргументов только показывают их
+SETTINGS_COMMANDS = {"output", "stats"}
+
+
+def refusal(line: str) -> str | None:
+    """Сообщение, если команду нельзя выполнять в сетевом режиме."""
+    words = line.split()
+    word = words[0].lower()
+    if word in TRANSACTION_COMMANDS:
+        return "Транзакции в сетевом режиме не поддерживаются."
+    if word in SETTINGS_COMMANDS and len(words) > 1:
+        return (
+            f"Команда {word} с аргументами меняет настройки всех клиентов "
+            "и в сетевом режиме недоступна."
+        )
+    return None
+
+
+# Подготовленные команды одного соединения по именам
+Prepared = Dict[str, planner.Prepared]
+
+
+def classify(line: str, prepared: Prepared | None = None) -> Tuple[str, List[str]]:
+    """Вид команды (read, write или ddl) и имена затрагиваемых таблиц.
+
+    prepared — подготовленные команды соединения (для execute).
+    """
+    try:
+        tokens = shlex.split(line)
+    except ValueError:
+        return "read", []
+    if not tokens:
+        return "read", []
+    word = tokens[0].lower()
+    if word == "explain":
+        statement = line.split(None, 1)[1] if len(tokens) > 1 else ""
+        return "read", classify(statement)[1]
+    if word == "prepare":
+        # prepare <имя> as <команда>: таблицы команды только читаются
+        statement = line.split(None, 3)[3] if len(tokens) > 3 else ""
+        return "read", classify(statement)[1]
+    if word == "execute":
+        found = (prepared or {}).get(tokens[1]) if len(tokens) > 1 else None
+        if found is None:
+            return "read", []
+        kind = "write" if statements.is_write(found.statement) else "read"
+        return kind, statements.tables(found.statement)
+
+    tables = []
+    if word in ("select", "delete"):
+        # select count(*), sum(x) from <table> [join <table> on ...] ...
+        low_tokens = [t.lower() for t in tokens]
+        if "from" in low_tokens[1:-1]:
+            tables.append(tokens[low_tokens.index("from") + 1])
+        if word == "select" and "join" in low_tokens[1:-1]:
+            tables.append(tokens[low_tokens.index("join") + 1])
+    elif word == "insert":
+        if len(tokens) > 2:
+            tables.append(tokens[2].split("(")[0])
+    elif len(tokens) > 1:
+        tables.append(tokens[1])
+
+    if word in DDL_COMMANDS:
+        return "ddl", tables
+    if word in WRITE_COMMANDS:
+        return "write", tables
+    return "read", tables
+
+
+class ReadWriteLock:
+    """Блокировка читатели/писатель для сопрограмм.
+
+    Ожидающий писатель не пропускает новых читателей вперед себя.
+    """
+
+    def __init__(self) -> None:
+        self._cond = asyncio.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextlib.asynccontextmanager
+    async def read(self) -> AsyncIterator[None]:
+        async with self._cond:
+            await self._cond.wait_for(
+                lambda: not self._writer and not self._waiting_writers
+            )
+            self._readers += 1
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._readers -= 1
+                self._cond.notify_all()
+
+    @contextlib.asynccontextmanager
+    async def write(self) -> AsyncIterator[None]:
+        async with self._cond:
+            self._waiting_writers += 1
+            try:
+                await self._cond.wait_for(
+                    lambda: not self._writer and not self._readers
+                )
+            finally:
+                self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class _ThreadOutput(io.TextIOBase):
+    """sys.stdout, направляющий вывод потока в его буфер (если он задан)."""
+
+    def __init__(self, fallback: io.TextIOBase) -> None:
+        self._fallback = fallback
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def capture(self) -> Iterator[io.StringIO]:
+        buffer = io.StringIO()
+        self._local.buffer = buffer
+        try:
+            yield buffer
+        finally:
+            self._local.buffer = None
+
+    def write(self, text: str) -> int:
+        buffer = getattr(self._local, "buffer", None)
+        return (self._fallback if buffer is None else buffer).write(text)
+
+    def flush(self) -> None:
+        if getattr(self._local, "buffer", None) is None:
+            self._fallback.flush()
+
+
+class Server:
+    """Выполнение команд клиентов над общей долгоживущей сессией."""
+
+    def __init__(self, workers: int = SERVER_WORKERS) -> None:
+        self._db_lock = ReadWriteLock()
+        self._table_locks: Dict[str, ReadWriteLock] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="primitive-db"
+        )
+        self._output = _ThreadOutput(sys.stdout)
+
+    def _table_lock(self, table_name: str) -> ReadWriteLock:
+        if table_name not in self._table_locks:
+            self._table_locks[table_name] = ReadWriteLock()
+        return self._table_locks[table_name]
+
+    def _run(
+        self, line: str, tables: List[str], writes: bool, prepared: Prepared
+    ) -> Tuple[str, str | None]:
+        """Выполняет команду в рабочем потоке.
+
+        Возвращает вывод команды и сообщение об ошибке (None — успех).
+        """
+        take_error()
+        with self._output.capture() as buffer, engine.prepared_scope(prepared):
+            try:
+                if not tables:
+                    engine.SESSION.revalidate_tables()
+                for table in tables:
+                    if engine.SESSION.revalidate(table):
+                        engine.SELECT_CACHE.invalidate(table)
+                engine.execute(line)
+            finally:
+                if writes:
+                    for table in tables:
+                        engine.SESSION.end_write(table)
+        return buffer.getvalue(), take_error()
+
+    async def execute(
+        self, line: str, prepared: Prepared | None = None
+    ) -> Tuple[str, str | None]:
+        """Выполняет команду с блокировками базы и таблицы.
+
+        Возвращает вывод команды и сообщение об ошибке (None — успех).
+        """
+        message = refusal(line)
+        if message is not None:
+            return "", message
+        prepared = {} if prepared is None else prepared
+        kind, tables = classify(line, prepared)
+        async with contextlib.AsyncExitStack() as stack:
+            if kind == "ddl":
+                await stack.enter_async_context(self._db_lock.write())
+            else:
+                await stack.enter_async_context(self._db_lock.read())
+            # Таблицы блокируются в порядке имен, чтобы не было взаимоблокировок
+            for table in sorted(set(tables)):
+                lock = self._table_lock(table)
+                mode = lock.read() if kind == "read" else lock.write()
+                await stack.enter_async_context(mode)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, self._run, line, tables, kind != "read", prepared
+            )
+
+    async def handle_client(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        """Обслуживает одно соединение: команда за командой."""
+        prepared: Prepared = {}
+        try:
+            while True:
+                try:
+                    raw = await reader.readline()
+                except ValueError:
+                    writer.write(encode_response("", "Слишком длинная команда."))
+                    break
+                if not raw:
+                    break
+                line = raw.decode("utf-8", errors="replace").strip()
+                if line.lower() == "exit":
+                    writer.write(encode_response(""))
+                    break
+                if not line:
+                    writer.write(encode_response(""))
+                else:
+                    try:
+                        output, error = await self.execute(line, prepared)
+                        writer.write(encode_response(output, error))
+                    except Exception as e:
+                        writer.write(encode_response("", f"{type(e).__name__}: {e}"))
+                await writer.drain()
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    @contextlib.contextmanager
+    def installed(self) -> Iterator[None]:
+        """Перехватывает вывод команд на время работы сервера."""
+        stdout = sys.stdout
+        sys.stdout = self._output
+        try:
+            yield
+        finally:
+            sys.stdout = stdout
+            self._executor.shutdown(wait=True)
+            engine.SESSION.reset()
+
+
+async def serve(
+    host: str = SERVER_HOST,
+    port: int = SERVER_PORT,
+    unix_path: str | None = None,
+    workers: int = SERVER_WORKERS,
+) -> None:
+    """Запускает сервер и обслуживает клиентов до остановки."""
+    set_auto_confirm(True)
+    engine.SESSION.autocommit = True
+    # Метаданные загружаются заранее и дальше только обновляются
+    _ = engine.SESSION.metadata
+
+    server = Server(workers)
+    if unix_path:
+        if os.path.exists(unix_path):
+            os.remove(unix_path)
+        listener = await asyncio.start_unix_server(
+            server.handle_client, path=unix_path, limit=SERVER_LINE_LIMIT
+        )
+        address = unix_path
+    else:
+        listener = await asyncio.start_server(
+            server.handle_client, host=host, port=port, limit=SERVER_LINE_LIMIT
+        )
+        address = ", ".join(
+            f"{sock.getsockname()[0]}:{sock.getsockname()[1]}"
+            for sock in listener.sockets
+        )
+    print(f"Сервер Primitive DB слушает {address}", flush=True)
+    with server.installed():
+        async with listener:
+            await listener.serve_forever()
+
+
+def main(argv: List[str] | None = None) -> None:
+    """Точка входа команды ``database serve``."""
+    arg_parser = argparse.ArgumentParser(
+        prog="database serve", description="Сетевой режим Primitive DB"
+    )
+    arg_parser.add_argument("--host", default=SERVER_HOST)
+    arg_parser.add_argument("--port", type=int, default=SERVER_PORT)
+    arg_parser.add_argument("--unix", metavar="PATH",
+                            help="слушать Unix-сокет вместо TCP")
+    arg_parser.add_argument("--workers", type=int, default=SERVER_WORKERS,
+                            help="число потоков для выполнения команд")
+    args = arg_parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.workers))
+    except KeyboardInterrupt:
+        print("Сервер остановлен.")
@@ -0,0 +1,559 @@
+"""
+Состояние сессии: метаданные и таблицы, загруженные в память.
+
+В режиме автофиксации (интерактивный цикл) каждое изменение сразу
+записывается на диск. В пакетном режиме каждая таблица загружается
+один раз, изменения накапливаются в памяти и сбрасываются на диск
+командой ``commit`` или в конце сценария.
+
+Команда ``begin`` начинает транзакцию в любом режиме: до ``commit``
+изменения только накапливаются в памяти, ``commit`` записывает их
+вместе через WAL (модуль ``wal``), ``rollback`` забывает их.
+
+Перед изменением таблицы сессия захватывает блокировку писателя
+(``begin_write``) и перечитывает описание таблицы, поэтому несколько
+процессов могут работать с одним каталогом базы. Блокировки
+освобождаются при ``release``/``reset``. Метаданные сохраняются
+слиянием: в файл переносятся только таблицы, измененные этой сессией.
+
+Долгоживущая сессия (режим сервера) держит таблицы в памяти между
+командами и вызывает ``revalidate``, чтобы заметить изменения файлов
+другими процессами. Сессией можно пользоваться из нескольких потоков,
+если команды над одной таблицей не пересекаются с ее изменением.
+
+Загруженные таблицы переживают ``reset`` в буферном пуле процесса
+(``utils.BUFFER_POOL``): читатели делят строки и индексы с пулом,
+писатель забирает таблицу из пула и возвращает ее после сохранения
+изменений. Запись пула сверяется со временем изменения и размером
+файлов таблицы и ее индексов.
+
+У секционированной таблицы (модуль ``partitions``) изменяющие команды
+загружают только секции, которые могут содержать подходящие строки;
+недостающие секции догружаются при следующих обращениях. Такое
+частичное состояние не попадает в буферный пул.
+"""
+
+import copy
+import os
+import sys
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple
+
+from . import (
+    compact,
+    conditions,
+    core,
+    indexes,
+    locks,
+    metrics,
+    partitions,
+    planner,
+    wal,
+)
+from .constants import DATA_DIR, META_FILE
+from .storage import PartitionedStorage, StorageBackend, get_storage
+from .utils import BUFFER_POOL, Stamp, file_stamp, load_metadata, save_metadata
+
+Row = Dict[str, Any]
+
+
+def _pool_key(table_name: str) -> Tuple[str, str, str]:
+    """Ключ таблицы в буферном пуле (каталоги баз в одном процессе различаются)."""
+    return ("table", os.path.abspath(DATA_DIR), table_name)
+
+
+def _estimate_size(state: "TableState") -> int:
+    """Грубая оценка памяти таблицы по выборке строк и словарям индексов."""
+    rows = state.rows
+    size = sys.getsizeof(rows)
+    if rows:
+        sample = rows[:: max(1, len(rows) // 64)]
+        sample_size = sum(
+            sys.getsizeof(row) + sum(map(sys.getsizeof, row.values()))
+            for row in sample
+        )
+        size += sample_size * len(rows) // len(sample)
+    for index in state.indexes.values():
+        size += sum(
+            sys.getsizeof(value)
+            for value in vars(index).values()
+            if isinstance(value, (dict, list))
+        )
+    return size
+
+
+class TableState:
+    """Загруженная таблица: строки, индексы и несохраненные записи журнала."""
+
+    def __init__(
+        self,
+        storage: StorageBackend,
+        rows: List[Row],
+        table_indexes: Dict[str, Any],
+        stamp: Stamp = (),
+    ) -> None:
+        self.storage = storage
+        self.rows = rows
+        self.indexes = table_indexes
+        self.pending: List[Dict[str, Any]] = []
+        # Состояние файлов таблицы, которому соответствуют строки в памяти
+        self.stamp = stamp
+        # Строки изменены через Session.write (такую таблицу можно вернуть
+        # в пул только после сохранения)
+        self.written = False
+        # Загруженные секции секционированной таблицы (None — все строки)
+        self.parts: Set[int] | None = None
+
+
+class Session:
+    """Кэш метаданных и таблиц с отложенной записью изменений."""
+
+    def __init__(self, autocommit: bool = True) -> None:
+        self.autocommit = autocommit
+        self._metadata: Dict[str, Any] | None = None
+        self._dirty_tables: Set[str] = set()
+        self._tables: Dict[str, TableState] = {}
+        self._writing: Set[str] = set()
+        self._disk_metadata: Dict[str, Any] = {}
+        self._disk_stamp: Stamp | None = None
+        self._lock = threading.RLock()
+        # Режим автофиксации до begin (None — транзакция не начата)
+        self._saved_autocommit: bool | None = None
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """Метаданные, загружаемые из файла один раз за сессию."""
+        if self._metadata is None:
+            with metrics.phase("metadata_load"):
+                # Транзакция, прерванная сбоем, доприменяется до чтения
+                wal.recover()
+                metadata = load_metadata(META_FILE)
+                # Описания захваченных таблиц изменяются: берутся копии
+                for table_name in self._writing & metadata.keys():
+                    metadata[table_name] = copy.deepcopy(metadata[table_name])
+                self._metadata = metadata
+        return self._metadata
+
+    @property
+    def in_transaction(self) -> bool:
+        """Начата ли транзакция командой begin."""
+        return self._saved_autocommit is not None
+
+    def begin(self) -> None:
+        """Начинает транзакцию: изменения копятся в памяти до commit.
+
+        Несохраненные изменения пакетного режима записываются сразу,
+        чтобы rollback вернул таблицы к состоянию на момент begin.
+        """
+        if self.in_transaction:
+            raise ValueError("Транзакция уже начата.")
+        self.flush()
+        self._saved_autocommit = self.autocommit
+        self.autocommit = False
+
+    def commit(self) -> None:
+        """Фиксирует транзакцию: изменения всех таблиц пишутся вместе.
+
+        Сначала все изменения одним файлом попадают в WAL, затем
+        применяются к метаданным и таблицам (с fsync), после чего
+        WAL удаляется.
+        """
+        if not self.in_transaction:
+            raise ValueError("Транзакция не начата.")
+        with self._lock:
+            tables = {
+                name: state.pending
+                for name, state in self._tables.items()
+                if state.pending
+            }
+            if tables or self._dirty_tables:
+                with metrics.phase("serialize"):
+                    wal_path = wal.write(
+                        {name: self.metadata.get(name) for name in self._dirty_tables},
+                        tables,
+                    )
+                self.flush(sync=True)
+                wal.remove(wal_path)
+        self._end_transaction()
+
+    def rollback(self) -> List[str]:
+        """Отменяет транзакцию и возвращает имена измененных в ней таблиц.
+
+        До commit на диск ничего не пишется, поэтому достаточно забыть
+        загруженное состояние: метаданные (счетчики ID, статистика)
+        и строки перечитаются с диска.
+        """
+        if not self.in_transaction:
+            raise ValueError("Транзакция не начата.")
+        with self._lock:
+            changed = {name for name, state in self._tables.items() if state.pending}
+            changed |= self._dirty_tables
+            self._tables = {}
+            self._dirty_tables = set()
+            self._metadata = None
+        self._end_transaction()
+        self.release()
+        return sorted(changed)
+
+    def _end_transaction(self) -> None:
+        self.autocommit = bool(self._saved_autocommit)
+        self._saved_autocommit = None
+
+    def table(
+        self, table_name: str, parts: Iterable[int] | None = None
+    ) -> TableState:
+        """Возвращает таблицу, загружая ее при первом обращении.
+
+        Для секционированной таблицы parts — номера секций, которые
+        должны быть загружены (None — вся таблица, см. ``parts_for``);
+        у обычной таблицы parts не учитывается.
+        """
+        state = self._tables.get(table_name)
+        if state is None:
+            state = self._load_table(table_name, parts)
+            self._tables[table_name] = state
+            if table_name in self._writing and state.parts is None:
+                self._refresh_bounds(table_name, state)
+        elif state.parts is not None:
+            self._load_parts(table_name, state, parts)
+        return state
+
+    def _refresh_bounds(self, table_name: str, state: TableState) -> None:
+        """Пересчитывает устаревшие минимумы и максимумы таблицы.
+
+        Удаление граничного значения помечает столбец stale (см.
+        ``core._forget_bounds``). Писатель, загрузивший всю таблицу,
+        пересчитывает такие столбцы, пока строки в памяти еще совпадают
+        с файлами, и сохраняет статистику вместе со своими изменениями.
+        """
+        stats = self.metadata[table_name].get("stats")
+        if stats is not None and core.refresh_bounds(stats, state.rows):
+            with self._lock:
+                self._dirty_tables.add(table_name)
+
+    def parts_for(self, table_name: str, where_clause: Any) -> List[int] | None:
+        """Секции, которые могут содержать строки под условием.
+
+        None — таблица не секционирована.
+        """
+        spec = self.metadata[table_name].get("partitions")
+        if spec is None:
+            return None
+        if isinstance(where_clause, planner.Plan):
+            where_clause = where_clause.condition
+        return partitions.candidates(spec, conditions.as_condition(where_clause))
+
+    def data_stamp(self, table_name: str) -> Stamp:
+        """Время изменения и размер файлов таблицы на диске.
+
+        Меняется при каждой записи таблицы, в том числе другим процессом.
+        """
+        storage = get_storage(self.metadata, table_name)
+        return file_stamp(storage.data_files(table_name))
+
+    def _pool_stamp(self, table_name: str, storage: StorageBackend) -> Stamp:
+        """Схема таблицы и состояние ее файлов для проверки записи пула."""
+        table_meta = self.metadata[table_name]
+        index_list = tuple(indexes.index_defs(table_meta))
+        index_files = [
+            indexes.make_index(table_name, column, kind).path
+            for column, kind in index_list
+        ]
+        return (
+            storage.name,
+            tuple((c["name"], c["type"]) for c in table_meta["columns"]),
+            index_list,
+            file_stamp(storage.data_files(table_name)),
+            file_stamp(index_files),
+        )
+
+    def _load_table(
+        self, table_name: str, parts: Iterable[int] | None = None
+    ) -> TableState:
+        """Берет таблицу из буферного пула или загружает ее с диска.
+
+        Писатель забирает таблицу из пула: до сохранения его изменения
+        не должны быть видны другим сессиям процесса. Секционированную
+        таблицу писатель загружает сам, с описанием секций из своей
+        копии метаданных.
+        """
+        storage = get_storage(self.metadata, table_name)
+        key = _pool_key(table_name)
+        writer = table_name in self._writing
+        partitioned = isinstance(storage, PartitionedStorage)
+        if partitioned and parts is not None:
+            state = self._load_partial(table_name, storage, parts)
+            if state is not None:
+                return state
+        pooled = not (writer and partitioned)
+        with metrics.phase("table_load"), locks.reading(table_name):
+            stamp = self._pool_stamp(table_name, storage)
+            if pooled:
+                take = BUFFER_POOL.take if writer else BUFFER_POOL.get
+                state = take(key, stamp)
+                if state is not None:
+                    return state
+            rows = compact.compact_rows(
+                self.metadata[table_name]["columns"], storage.load(table_name)
+            )
+            table_indexes = indexes.get_indexes(
+                self.metadata, table_name, rows, stamp[3]
+            )
+        state = TableState(storage, rows, table_indexes, stamp[3])
+        if pooled and not writer:
+            BUFFER_POOL.put(key, state, stamp, _estimate_size(state))
+        return state
+
+    def _load_partial(
+        self, table_name: str, storage: PartitionedStorage, parts: Iterable[int]
+    ) -> TableState | None:
+        """Загружает только указанные секции таблицы.
+
+        None, если индексы нельзя прочитать из файлов: отсутствующий или
+        отставший индекс строится по всем строкам таблицы.
+        """
+        numbers = set(parts)
+        columns = self.metadata[table_name]["columns"]
+        with metrics.phase("table_load"), locks.reading(table_name):
+            stamp = file_stamp(storage.data_files(table_name))
+            table_indexes = indexes.load_indexes(self.metadata, table_name, stamp)
+            if table_indexes is None:
+                return None
+            rows = compact.compact_rows(
+                columns, storage.load_parts(table_name, numbers)
+            )
+        table_indexes[indexes.PRIMARY_KEY] = indexes.PrimaryKeyIndex(rows)
+        state = TableState(storage, rows, table_indexes, stamp)
+        state.parts = numbers
+        return state
+
+    def _load_parts(
+        self, table_name: str, state: TableState, parts: Iterable[int] | None
+    ) -> None:
+        """Догружает в частично загруженную таблицу недостающие секции.
+
+        Строки, уже находящиеся в памяти, новее файлов и не заменяются.
+        """
+        spec = self.metadata[table_name]["partitions"]
+        wanted = set(range(len(spec["parts"])) if parts is None else parts)
+        missing = wanted - state.parts
+        with self._lock:
+            if missing:
+                columns = self.metadata[table_name]["columns"]
+                with metrics.phase("table_load"):
+                    loaded = compact.compact_rows(
+                        columns, state.storage.load_parts(table_name, missing)
+                    )
+                known = state.indexes[indexes.PRIMARY_KEY].rows_by_id
+                rows = state.rows + [r for r in loaded if r["ID"] not in known]
+                rows.sort(key=lambda r: r["ID"])
+                state.rows = rows
+                state.indexes[indexes.PRIMARY_KEY] = indexes.PrimaryKeyIndex(rows)
+            state.parts = None if parts is None else state.parts | missing
+
+    def _check_in(self, table_name: str) -> None:
+        """Возвращает в буферный пул таблицу, сохраненную писателем.
+
+        Вызывается под блокировкой писателя, поэтому файлы таблицы
+        соответствуют строкам в памяти.
+        """
+        state = self._tables.get(table_name)
+        if state is None or not state.written or state.pending:
+            return
+        if state.parts is not None:
+            return
+        if self._metadata is None or table_name not in self._metadata:
+            return
+        stamp = self._pool_stamp(table_name, state.storage)
+        state.written = False
+        BUFFER_POOL.put(_pool_key(table_name), state, stamp, _estimate_size(state))
+
+    def select(
+        self,
+        table_name: str,
+        where_clause: Dict[str, Any] | None,
+    ) -> List[Row]:
+        """Выборка строк; если таблица не загружена, а движок умеет
+        читать снимок частично, таблица не загружается целиком."""
+        rows = self.iter_select(table_name, where_clause)
+        with metrics.phase("execute"):
+            return list(rows)
+
+    def iter_select(
+        self,
+        table_name: str,
+        where_clause: Dict[str, Any] | None,
+    ) -> Iterator[Row]:
+        """Потоковый вариант select: строки выдаются по мере чтения."""
+        state = self._tables.get(table_name)
+        if state is None:
+            storage = get_storage(self.metadata, table_name)
+            if storage.supports_scan:
+                if isinstance(where_clause, planner.Plan):
+                    where_clause = where_clause.condition
+                with metrics.phase("table_load"):
+                    return storage.iter_scan(table_name, where_clause)
+            state = self.table(table_name)
+        elif state.parts is not None:
+            state = self.table(table_name, self.parts_for(table_name, where_clause))
+        return core.iter_rows(state.rows, where_clause, state.indexes)
+
+    def begin_write(self, table_name: str) -> None:
+        """Захватывает блокировку писателя таблицы до конца транзакции.
+
+        После захвата описание таблицы перечитывается с диска, а
+        загруженные строки забываются: другой процесс мог изменить их.
+        """
+        if table_name in self._writing:
+            return
+        locks.acquire_writer(table_name)
+        with self._lock:
+            self._writing.add(table_name)
+            if self._metadata is not None:
+                disk = load_metadata(META_FILE)
+                if table_name in disk:
+                    # Описание из буферного пула общее: изменяется копия
+                    self._metadata[table_name] = copy.deepcopy(disk[table_name])
+                else:
+                    self._metadata.pop(table_name, None)
+            self._tables.pop(table_name, None)
+
+    def writing(self) -> List[str]:
+        """Таблицы, захваченные сессией для изменения."""
+        return sorted(self._writing)
+
+    def end_write(self, table_name: str) -> None:
+        """Сохраняет изменения и освобождает блокировку писателя таблицы."""
+        try:
+            self.flush()
+            with self._lock:
+                self._check_in(table_name)
+        finally:
+            with self._lock:
+                if table_name in self._writing:
+                    self._writing.discard(table_name)
+                    locks.release_writer(table_name)
+
+    def revalidate(self, table_name: str) -> bool:
+        """Забывает таблицу, если ее файлы или описание изменил другой процесс.
+
+        Возвращает True, если загруженное состояние оказалось устаревшим.
+        """
+        with self._lock:
+            if table_name in self._writing or table_name in self._dirty_tables:
+                return False
+            changed = False
+            if self._metadata is not None:
+                disk = self._read_disk_metadata()
+                if disk.get(table_name) != self._metadata.get(table_name):
+                    if table_name in disk:
+                        self._metadata[table_name] = copy.deepcopy(disk[table_name])
+                    else:
+                        self._metadata.pop(table_name, None)
+                    changed = True
+            state = self._tables.get(table_name)
+            if state is not None and not state.pending:
+                files = state.storage.data_files(table_name)
+                if changed or state.stamp != file_stamp(files):
+                    del self._tables[table_name]
+                    changed = True
+            return changed
+
+    def revalidate_tables(self) -> None:
+        """Учитывает таблицы, созданные или удаленные другими процессами."""
+        with self._lock:
+            if self._metadata is None:
+                return
+            disk = self._read_disk_metadata()
+            for table_name in set(disk) - set(self._metadata):
+                self._metadata[table_name] = copy.deepcopy(disk[table_name])
+            busy = self._writing | self._dirty_tables
+            for table_name in set(self._metadata) - set(disk) - busy:
+                del self._metadata[table_name]
+                self._tables.pop(table_name, None)
+
+    def _read_disk_metadata(self) -> Dict[str, Any]:
+        """Метаданные на диске (перечитываются, только если файл изменился)."""
+        stamp = file_stamp([META_FILE])
+        if stamp != self._disk_stamp:
+            self._disk_metadata = load_metadata(META_FILE)
+            self._disk_stamp = stamp
+        return self._disk_metadata
+
+    def save_metadata(self, table_name: str) -> None:
+        """Отмечает описание таблицы в метаданных измененным."""
+        with self._lock:
+            self._dirty_tables.add(table_name)
+        if self.autocommit:
+            self.flush()
+
+    def write(
+        self,
+        table_name: str,
+        records: List[Dict[str, Any]],
+        rows: List[Row] | None = None,
+    ) -> None:
+        """Регистрирует изменения таблицы (и, при необходимости, новые строки)."""
+        state = self.table(table_name)
+        with self._lock:
+            if rows is not None:
+                state.rows = rows
+            indexes.apply_records(state.indexes, records)
+            state.pending.extend(records)
+            state.written = True
+        if self.autocommit:
+            self.flush()
+
+    def forget(self, table_name: str) -> None:
+        """Убирает таблицу из памяти без сохранения изменений."""
+        self._tables.pop(table_name, None)
+        BUFFER_POOL.discard(_pool_key(table_name))
+
+    def flush(self, sync: bool = False) -> None:
+        """Сохраняет на диск все накопленные изменения (sync — с fsync)."""
+        with metrics.phase("serialize"), self._lock:
+            # Метаданные (счетчики ID) сохраняются раньше строк
+            if self._dirty_tables:
+                self._merge_metadata()
+            for table_name, state in list(self._tables.items()):
+                if not state.pending and table_name not in self._writing:
+                    continue
+                with locks.publishing(table_name):
+                    if state.pending:
+                        state.storage.append(table_name, state.pending, sync)
+                        state.pending = []
+                    state.stamp = file_stamp(state.storage.data_files(table_name))
+                    # Отметка в журналах индексов связывает их с этими файлами
+                    indexes.flush_indexes(state.indexes, state.stamp)
+
+    def _merge_metadata(self) -> None:
+        """Переносит в файл метаданных описания измененных таблиц."""
+        with locks.exclusive(locks.META_LOCK):
+            disk = load_metadata(META_FILE)
+            for table_name in self._dirty_tables:
+                if table_name in self.metadata:
+                    disk[table_name] = self.metadata[table_name]
+                else:
+                    disk.pop(table_name, None)
+            save_metadata(META_FILE, disk)
+            self._disk_metadata = disk
+            self._disk_stamp = file_stamp([META_FILE])
+        self._dirty_tables = set()
+
+    def release(self) -> None:
+        """Сохраняет изменения и освобождает блокировки писателя."""
+        try:
+            self.flush()
+            with self._lock:
+                for table_name in self._writing:
+                    self._check_in(table_name)
+        finally:
+            for table_name in self._writing:
+                locks.release_writer(table_name)
+            self._writing = set()
+
+    def reset(self) -> None:
+        """Сбрасывает изменения на диск и забывает загруженное состояние."""
+        self.release()
+        self._metadata = None
+        self._tables = {}
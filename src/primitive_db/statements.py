@@ -0,0 +1,120 @@
+"""
+Дерево разобранной команды (AST) и параметры подготовленных команд.
+
+``parser.parse_statement`` превращает текст select/insert/update/delete
+в один из классов ниже. Вместо значений в дереве могут стоять
+параметры ``Param`` (``?`` в тексте команды); ``bind`` подставляет
+в них аргументы ``execute``.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple
+
+from . import conditions
+
+
+class Param(NamedTuple):
+    """Параметр ``?`` с порядковым номером (с нуля)."""
+
+    index: int
+
+
+class Select(NamedTuple):
+    """select [выражения] from <таблица> [join ..] [where ..] [..]."""
+
+    keyword = "select"
+
+    table: str
+    where: Any = None
+    # Пары (функция, столбец); функция "" — столбец без агрегата
+    items: Tuple[Tuple[str, str], ...] = ()
+    group_by: str | None = None
+    # Пары (столбец, по убыванию)
+    order_by: Tuple[Tuple[str, bool], ...] = ()
+    limit: Any = None
+    offset: Any = 0
+    # (левая таблица, правая, столбец левой, столбец правой)
+    join: Tuple[str, str, str, str] | None = None
+
+
+class Insert(NamedTuple):
+    """insert into <таблица> values (..), (..)."""
+
+    keyword = "insert"
+
+    table: str
+    rows: Tuple[Tuple[Any, ...], ...]
+
+
+class Update(NamedTuple):
+    """update <таблица> set <столбец> = <значение>, .. where .."""
+
+    keyword = "update"
+
+    table: str
+    assignments: Tuple[Tuple[str, Any], ...]
+    where: Any
+
+
+class Delete(NamedTuple):
+    """delete from <таблица> where .."""
+
+    keyword = "delete"
+
+    table: str
+    where: Any
+
+
+Statement = Select | Insert | Update | Delete
+
+
+def tables(statement: Statement) -> List[str]:
+    """Таблицы, которые затрагивает команда."""
+    if isinstance(statement, Select) and statement.join is not None:
+        return list(statement.join[:2])
+    return [statement.table]
+
+
+def is_write(statement: Statement) -> bool:
+    """Изменяет ли команда таблицу."""
+    return not isinstance(statement, Select)
+
+
+def _bind_count(value: Any, args: Sequence[Any], clause: str) -> Any:
+    value = _bind_value(value, args)
+    if value is not None and (
+        isinstance(value, bool) or not isinstance(value, int) or value < 0
+    ):
+        raise ValueError(f"После {clause} нужно неотрицательное целое число.")
+    return value
+
+
+def _bind_value(value: Any, args: Sequence[Any]) -> Any:
+    return args[value.index] if isinstance(value, Param) else value
+
+
+def bind(statement: Statement, args: Sequence[Any], params: int) -> Statement:
+    """Подставляет аргументы в параметры ``?`` команды.
+
+    params — число параметров команды (см. ``parser.parse_statement``).
+    """
+    if len(args) != params:
+        raise ValueError(f"Ожидалось параметров: {params}, передано: {len(args)}.")
+    if not params:
+        return statement
+
+    def value(v: Any) -> Any:
+        return _bind_value(v, args)
+
+    changes: Dict[str, Any] = {}
+    if isinstance(statement, Insert):
+        changes["rows"] = tuple(tuple(map(value, row)) for row in statement.rows)
+    else:
+        changes["where"] = conditions.map_values(statement.where, value)
+    if isinstance(statement, Update):
+        changes["assignments"] = tuple(
+            (column, value(v)) for column, v in statement.assignments
+        )
+    if isinstance(statement, Select):
+        changes["limit"] = _bind_count(statement.limit, args, "limit")
+        changes["offset"] = _bind_count(statement.offset, args, "offset")
+    return statement._replace(**changes)
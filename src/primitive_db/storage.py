@@ -0,0 +1,572 @@
+"""
+Подключаемые движки хранения данных таблиц.
+
+- ``json`` — исходный формат: весь список записей в ``data/<table>.json``,
+  каждая запись перезаписывает файл целиком.
+- ``log`` — журнал изменений ``data/<table>.log`` (одна JSON-строка на
+  операцию insert/update/delete) поверх компактного снимка
+  ``data/<table>.snapshot.json``. Запись изменения стоит O(1).
+- ``columnar`` — тот же журнал поверх бинарного поколоночного снимка
+  ``data/<table>.col`` (см. модуль ``columnar``); выборки читают снимок
+  через mmap, не загружая таблицу целиком.
+
+Секционированная таблица (см. модуль ``partitions``) хранит каждую
+секцию отдельными файлами указанного формата: ``PartitionedStorage``
+направляет изменения в секции и читает при выборке только секции,
+не исключенные условием.
+
+Чтение файлов таблицы выполняется под разделяемой блокировкой, запись —
+под исключительной (см. модуль ``locks``). Снимки заменяются атомарно,
+а журнал сворачивается в снимок только процессом-писателем таблицы.
+"""
+
+import heapq
+import itertools
+import json
+import os
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Set, Type
+
+from . import compact, conditions, locks, partitions, planner
+from .constants import (
+    DATA_DIR,
+    DEFAULT_STORAGE,
+    LOG_CHECKPOINT_MIN,
+    SCAN_CHUNK_ROWS,
+)
+from .utils import (
+    _ensure_data_dir,
+    atomic_write,
+    load_table_data,
+    save_table_data,
+)
+
+if TYPE_CHECKING:
+    from . import columnar
+
+Row = Dict[str, Any]
+Record = Dict[str, Any]
+
+
+def insert_record(row: Row) -> Record:
+    """Запись журнала о добавлении строки."""
+    return {"op": "insert", "row": row}
+
+
+def update_record(row: Row) -> Record:
+    """Запись журнала о новом состоянии строки."""
+    return {"op": "update", "row": row}
+
+
+def delete_record(row_id: int) -> Record:
+    """Запись журнала об удалении строки."""
+    return {"op": "delete", "id": row_id}
+
+
+def apply_records(rows: List[Row], records: List[Record]) -> List[Row]:
+    """Применяет записи журнала к списку строк (порядок по ID сохраняется)."""
+    by_id = dict(zip(compact.column(rows, "ID"), rows))
+    max_id = max(by_id, default=0)
+    in_order = True
+    for rec in records:
+        op = rec["op"]
+        if op == "insert" or op == "update":
+            row_id = rec["row"]["ID"]
+            if row_id > max_id:
+                max_id = row_id
+            elif row_id not in by_id:
+                in_order = False
+            by_id[row_id] = rec["row"]
+        elif op == "delete":
+            by_id.pop(rec["id"], None)
+        else:
+            raise ValueError(f"Неизвестная операция журнала: {op}")
+    # Новые ID выдаются по возрастанию, поэтому сортировка обычно не нужна
+    if in_order:
+        return list(by_id.values())
+    return sorted(by_id.values(), key=lambda r: r["ID"])
+
+
+class StorageBackend:
+    """Базовый интерфейс движка хранения."""
+
+    name = ""
+    # Умеет ли движок выполнять выборку без загрузки всей таблицы
+    supports_scan = False
+
+    def __init__(self, columns: List[Dict[str, str]] | None = None) -> None:
+        self.columns = columns or []
+
+    def load(self, table_name: str) -> List[Row]:
+        """Загружает все записи таблицы."""
+        raise NotImplementedError
+
+    def append(
+        self, table_name: str, records: List[Record], sync: bool = False
+    ) -> None:
+        """Сохраняет только изменившиеся записи (sync — дождаться fsync)."""
+        raise NotImplementedError
+
+    def save(self, table_name: str, rows: List[Row]) -> None:
+        """Полностью перезаписывает таблицу."""
+        raise NotImplementedError
+
+    def scan(self, table_name: str, where_clause: Any) -> List[Row]:
+        """Выборка строк без загрузки таблицы (если supports_scan)."""
+        return list(self.iter_scan(table_name, where_clause))
+
+    def iter_scan(self, table_name: str, where_clause: Any) -> Iterator[Row]:
+        """Потоковая выборка строк в порядке ID (если supports_scan)."""
+        raise NotImplementedError
+
+    def dead_records(self, table_name: str) -> int:
+        """Число устаревших версий строк в файлах таблицы.
+
+        Их убирает ``vacuum``; движки, перезаписывающие файл целиком,
+        мусора не оставляют.
+        """
+        return 0
+
+    def drop(self, table_name: str) -> None:
+        """Удаляет все файлы таблицы."""
+        with locks.publishing(table_name):
+            for path in self.files(table_name):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def data_files(self, table_name: str) -> List[str]:
+        """Файлы, которые движок создает при сохранении таблицы."""
+        raise NotImplementedError
+
+    def files(self, table_name: str) -> List[str]:
+        """Пути ко всем файлам таблицы (включая устаревшие форматы)."""
+        return self.data_files(table_name)
+
+
+class JsonStorage(StorageBackend):
+    """Исходный формат: один JSON-файл со списком словарей."""
+
+    name = "json"
+
+    def load(self, table_name: str) -> List[Row]:
+        with locks.reading(table_name):
+            return load_table_data(table_name)
+
+    def append(
+        self, table_name: str, records: List[Record], sync: bool = False
+    ) -> None:
+        # Файл перезаписывается атомарно и с fsync в любом случае
+        with locks.publishing(table_name):
+            rows = apply_records(self.load(table_name), records)
+            self.save(table_name, rows)
+
+    def save(self, table_name: str, rows: List[Row]) -> None:
+        with locks.publishing(table_name):
+            save_table_data(table_name, rows)
+
+    def data_files(self, table_name: str) -> List[str]:
+        return [os.path.join(DATA_DIR, f"{table_name}.json")]
+
+
+class LogStorage(StorageBackend):
+    """Журнал изменений только на дозапись поверх компактного снимка."""
+
+    name = "log"
+
+    def _snapshot_path(self, table_name: str) -> str:
+        return os.path.join(DATA_DIR, f"{table_name}.snapshot.json")
+
+    def _log_path(self, table_name: str) -> str:
+        return os.path.join(DATA_DIR, f"{table_name}.log")
+
+    def _legacy_path(self, table_name: str) -> str:
+        return os.path.join(DATA_DIR, f"{table_name}.json")
+
+    def _migrate(self, table_name: str) -> None:
+        """Переводит таблицу из формата json в снимок при первом открытии."""
+        legacy = self._legacy_path(table_name)
+        if os.path.exists(self._snapshot_path(table_name)):
+            return
+        if not os.path.exists(legacy):
+            return
+        with locks.publishing(table_name):
+            if os.path.exists(legacy):
+                self._write_snapshot(table_name, load_table_data(table_name))
+                os.remove(legacy)
+
+    def _write_snapshot(self, table_name: str, rows: List[Row]) -> None:
+        _ensure_data_dir()
+        with atomic_write(self._snapshot_path(table_name)) as f:
+            json.dump(
+                rows,
+                f,
+                ensure_ascii=False,
+                separators=(",", ":"),
+                default=compact.to_json,
+            )
+
+    def _read_snapshot(self, table_name: str) -> List[Row]:
+        path = self._snapshot_path(table_name)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Снимок таблицы {path} поврежден: {e}")
+
+    def _read_log(self, table_name: str) -> List[Record]:
+        """Читает журнал одним вызовом json.loads вместо разбора по строкам."""
+        try:
+            with open(self._log_path(table_name), "r", encoding="utf-8") as f:
+                text = f.read().strip()
+        except FileNotFoundError:
+            return []
+        if not text:
+            return []
+        try:
+            return json.loads("[" + text.replace("\n", ",") + "]")
+        except json.JSONDecodeError:
+            pass
+        # Последняя строка могла быть записана не полностью — пропускаем ее
+        records = []
+        for line in text.splitlines():
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+        return records
+
+    def load(self, table_name: str) -> List[Row]:
+        _ensure_data_dir()
+        with locks.reading(table_name):
+            self._migrate(table_name)
+            rows = self._read_snapshot(table_name)
+            records = self._read_log(table_name)
+
+        if not records:
+            return rows
+        rows = apply_records(rows, records)
+        # Журнал стал длиннее самой таблицы — писатель сворачивает его в снимок
+        long_log = len(records) > max(LOG_CHECKPOINT_MIN, len(rows))
+        if long_log and locks.holds_writer(table_name):
+            self.save(table_name, rows)
+        return rows
+
+    def append(
+        self, table_name: str, records: List[Record], sync: bool = False
+    ) -> None:
+        if not records:
+            return
+        _ensure_data_dir()
+        self._migrate(table_name)
+        lines = "".join(
+            json.dumps(
+                rec,
+                ensure_ascii=False,
+                separators=(",", ":"),
+                default=compact.to_json,
+            )
+            + "\n"
+            for rec in records
+        )
+        with locks.publishing(table_name):
+            with open(self._log_path(table_name), "a", encoding="utf-8") as f:
+                f.write(lines)
+                if sync:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    def dead_records(self, table_name: str) -> int:
+        # Изменение и удаление вытесняют прежнюю версию строки,
+        # запись об удалении сама становится лишней после свертки
+        with locks.reading(table_name):
+            records = self._read_log(table_name)
+        return sum(
+            2 if rec["op"] == "delete" else rec["op"] == "update"
+            for rec in records
+        )
+
+    def save(self, table_name: str, rows: List[Row]) -> None:
+        with locks.publishing(table_name):
+            self._write_snapshot(table_name, rows)
+            log_path = self._log_path(table_name)
+            if os.path.exists(log_path):
+                os.remove(log_path)
+
+    def data_files(self, table_name: str) -> List[str]:
+        return [self._snapshot_path(table_name), self._log_path(table_name)]
+
+    def files(self, table_name: str) -> List[str]:
+        return self.data_files(table_name) + [self._legacy_path(table_name)]
+
+
+class ColumnarStorage(LogStorage):
+    """Журнал изменений поверх бинарного поколоночного снимка."""
+
+    name = "columnar"
+    supports_scan = True
+
+    def _snapshot_path(self, table_name: str) -> str:
+        return os.path.join(DATA_DIR, f"{table_name}.col")
+
+    def _write_snapshot(self, table_name: str, rows: List[Row]) -> None:
+        from . import columnar
+
+        _ensure_data_dir()
+        columnar.write_table(self._snapshot_path(table_name), self.columns, rows)
+
+    def _read_snapshot(self, table_name: str) -> List[Row]:
+        from . import columnar
+
+        path = self._snapshot_path(table_name)
+        if not os.path.exists(path):
+            return []
+        with columnar.ColumnarReader(path) as reader:
+            return reader.read_all(records=True)
+
+    def iter_scan(self, table_name: str, where_clause: Any) -> Iterator[Row]:
+        """Выборка по снимку через mmap с наложением журнала изменений.
+
+        Условия на один столбец, соединенные через AND, проверяются
+        по соответствующим столбцам снимка; целиком материализуются
+        лишь строки-кандидаты. Большие снимки сканируются параллельно
+        в пуле процессов (см. модуль ``parallel``), остальные выдаются
+        участками по SCAN_CHUNK_ROWS строк.
+
+        Журнал читается и снимок открывается под блокировкой чтения.
+        Снимок заменяется только атомарно, поэтому открытое отображение
+        остается согласованным и после снятия блокировки.
+        """
+        # mmap и пул процессов нужны только поколоночным таблицам
+        from . import columnar, parallel
+
+        condition = conditions.as_condition(where_clause)
+        _ensure_data_dir()
+        reader = None
+        base: List[Row] | None = None
+        with locks.reading(table_name):
+            self._migrate(table_name)
+            records = self._read_log(table_name)
+            path = self._snapshot_path(table_name)
+            if os.path.exists(path):
+                reader = columnar.ColumnarReader(path)
+                if parallel.should_parallelize(condition, reader.rows):
+                    rows = reader.rows
+                    reader.close()
+                    reader = None
+                    base = parallel.scan(path, condition, rows)
+
+        # Строки снимка, которые изменены или удалены журналом
+        touched = {
+            rec["id"] if rec["op"] == "delete" else rec["row"]["ID"]
+            for rec in records
+        }
+        if base is not None:
+            snapshot_rows = iter([r for r in base if r["ID"] not in touched])
+        elif reader is not None:
+            snapshot_rows = _iter_snapshot(reader, condition, touched)
+        else:
+            snapshot_rows = iter(())
+
+        changed = [
+            r for r in apply_records([], records)
+            if condition is None or condition.matches(r)
+        ]
+        if not changed:
+            return snapshot_rows
+        return heapq.merge(snapshot_rows, changed, key=lambda r: r["ID"])
+
+
+def _iter_snapshot(
+    reader: "columnar.ColumnarReader",
+    condition: Any,
+    skip: Set[int],
+) -> Iterator[Row]:
+    """Строки снимка по участкам; reader закрывается по окончании."""
+    with reader:
+        for start in range(0, reader.rows, SCAN_CHUNK_ROWS):
+            for row in reader.select(condition, start, start + SCAN_CHUNK_ROWS):
+                if row["ID"] not in skip:
+                    yield row
+
+
+class PartitionedStorage(StorageBackend):
+    """Секционированная таблица: каждая секция хранится движком таблицы.
+
+    Строки секций диапазона упорядочены по ID между секциями, поэтому
+    выборка читает их по одной; секции по хэшу сливаются по ID.
+    """
+
+    supports_scan = True
+
+    def __init__(
+        self,
+        backend: Type[StorageBackend],
+        columns: List[Dict[str, str]],
+        spec: Dict[str, Any],
+    ) -> None:
+        super().__init__(columns)
+        self.name = backend.name
+        self.backend = backend(columns)
+        self.spec = spec
+        # Секции загруженных строк: запись об удалении содержит только ID
+        self.located: Dict[int, int] = {}
+
+    def _names(self, table_name: str) -> List[str]:
+        count = len(self.spec["parts"])
+        return [partitions.part_name(table_name, n) for n in range(count)]
+
+    def _merge(self, chunks: List[Iterable[Row]]) -> Iterator[Row]:
+        if self.spec["by"] == "range":
+            return itertools.chain.from_iterable(chunks)
+        return heapq.merge(*chunks, key=lambda r: r["ID"])
+
+    def _locate(self, row_id: int) -> List[int]:
+        """Секции, в которых может лежать строка с данным ID."""
+        if self.spec["by"] == "range":
+            return [(row_id - 1) // self.spec["size"]]
+        number = self.located.pop(row_id, None)
+        if number is None:
+            # Строка не загружалась (восстановление из WAL): удаляется везде
+            return list(range(len(self.spec["parts"])))
+        return [number]
+
+    def load_parts(self, table_name: str, numbers: Iterable[int]) -> List[Row]:
+        """Загружает строки указанных секций в порядке ID."""
+        chunks = []
+        with locks.reading(table_name):
+            for number in sorted(numbers):
+                rows = self.backend.load(partitions.part_name(table_name, number))
+                ids = compact.column(rows, "ID")
+                self.located.update(dict.fromkeys(ids, number))
+                chunks.append(rows)
+        return list(self._merge(chunks))
+
+    def load(self, table_name: str) -> List[Row]:
+        return self.load_parts(table_name, range(len(self.spec["parts"])))
+
+    def append(
+        self, table_name: str, records: List[Record], sync: bool = False
+    ) -> None:
+        groups: Dict[int, List[Record]] = {}
+        for rec in records:
+            if rec["op"] == "delete":
+                numbers = self._locate(rec["id"])
+            else:
+                number = partitions.partition_of(self.spec, rec["row"])
+                self.located[rec["row"]["ID"]] = number
+                numbers = [number]
+            for number in numbers:
+                groups.setdefault(number, []).append(rec)
+        with locks.publishing(table_name):
+            for number, group in sorted(groups.items()):
+                name = partitions.part_name(table_name, number)
+                self.backend.append(name, group, sync)
+
+    def save(self, table_name: str, rows: List[Row]) -> None:
+        groups: List[List[Row]] = [[] for _ in self.spec["parts"]]
+        for row in rows:
+            number = partitions.partition_of(self.spec, row)
+            groups.extend([] for _ in range(number + 1 - len(groups)))
+            groups[number].append(row)
+        with locks.publishing(table_name):
+            for number, group in enumerate(groups):
+                self.backend.save(partitions.part_name(table_name, number), group)
+
+    def iter_scan(self, table_name: str, where_clause: Any) -> Iterator[Row]:
+        """Выборка только из секций, не исключенных условием.
+
+        Секции читаются лениво, по мере выдачи строк: при чтении по
+        диапазонам в памяти одновременно находится одна секция.
+        """
+        condition = conditions.as_condition(where_clause)
+        numbers = partitions.candidates(self.spec, condition)
+        return self._merge(
+            [self._scan_part(table_name, n, condition) for n in numbers]
+        )
+
+    def _scan_part(
+        self, table_name: str, number: int, condition: Any
+    ) -> Iterator[Row]:
+        name = partitions.part_name(table_name, number)
+        if self.backend.supports_scan:
+            yield from self.backend.iter_scan(name, condition)
+            return
+        rows = self.backend.load(name)
+        if condition is None:
+            yield from rows
+            return
+        types = {c["name"]: c["type"] for c in self.columns}
+        predicate = planner.compile_condition(condition, types)
+        yield from (row for row in rows if predicate(row))
+
+    def dead_records(self, table_name: str) -> int:
+        return sum(self.backend.dead_records(n) for n in self._names(table_name))
+
+    def part_sizes(self, table_name: str) -> List[int]:
+        """Размер файлов каждой секции в байтах."""
+        return [
+            sum(
+                os.path.getsize(path)
+                for path in self.backend.data_files(name)
+                if os.path.exists(path)
+            )
+            for name in self._names(table_name)
+        ]
+
+    def data_files(self, table_name: str) -> List[str]:
+        return [
+            path
+            for name in self._names(table_name)
+            for path in self.backend.data_files(name)
+        ]
+
+    def files(self, table_name: str) -> List[str]:
+        return [
+            path
+            for name in self._names(table_name)
+            for path in self.backend.files(name)
+        ]
+
+
+BACKENDS: Dict[str, Type[StorageBackend]] = {
+    JsonStorage.name: JsonStorage,
+    LogStorage.name: LogStorage,
+    ColumnarStorage.name: ColumnarStorage,
+}
+
+
+def make_storage(name: str, table_meta: Dict[str, Any]) -> StorageBackend:
+    """Движок хранения name для таблицы (с учетом секционирования)."""
+    if name not in BACKENDS:
+        raise ValueError(f"Неизвестный формат хранения: {name}")
+    spec = table_meta.get("partitions")
+    if spec is not None:
+        return PartitionedStorage(BACKENDS[name], table_meta["columns"], spec)
+    return BACKENDS[name](table_meta["columns"])
+
+
+def get_storage(metadata: Dict[str, Any], table_name: str) -> StorageBackend:
+    """Возвращает движок хранения, указанный для таблицы в метаданных."""
+    if table_name not in metadata:
+        raise KeyError(table_name)
+    table_meta = metadata[table_name]
+    return make_storage(table_meta.get("storage", DEFAULT_STORAGE), table_meta)
+
+
+def convert_table(
+    metadata: Dict[str, Any],
+    table_name: str,
+    storage_name: str
+) -> Dict[str, Any]:
+    """Переводит таблицу в другой формат хранения (в обе стороны)."""
+    old = get_storage(metadata, table_name)
+    new = make_storage(storage_name, metadata[table_name])
+    with locks.publishing(table_name):
+        rows = old.load(table_name)
+        new.save(table_name, rows)
+        for path in set(old.files(table_name)) - set(new.data_files(table_name)):
+            if os.path.exists(path):
+                os.remove(path)
+    metadata[table_name]["storage"] = storage_name
+    return metadata
@@ -1,32 +1,191 @@
 """
-Вспомогательные функции для работы с JSON.
+Вспомогательные функции для работы с JSON и общий буферный пул.
+
+Файлы сохраняются атомарно: данные пишутся во временный файл рядом
+с целевым и заменяют его через ``os.replace``, поэтому при сбое
+на диске остается либо старая, либо новая версия целиком.
+
+Буферный пул (``BUFFER_POOL``) хранит в памяти процесса разобранные
+метаданные и загруженные таблицы между командами. Запись пула
+действительна, пока не изменились время изменения и размер ее файлов
+(``file_stamp``), поэтому изменения других процессов замечаются
+одним ``stat`` на файл. При превышении бюджета памяти вытесняются
+давно не использованные записи (LRU).
 """
 
+import contextlib
 import json
 import os
-from typing import Any, Dict, List
+import threading
+from collections import OrderedDict
+from typing import IO, Any, Dict, Hashable, Iterator, List, Tuple
+
+from .compact import to_json
+from .constants import BUFFER_POOL_MB, DATA_DIR, META_FILE
+
+Stamp = Tuple[Any, ...]
+
+
+def file_stamp(paths: List[str]) -> Stamp:
+    """Время изменения и размер файлов (None для отсутствующих)."""
+    stamp = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            stamp.append(None)
+        else:
+            stamp.append((st.st_mtime_ns, st.st_size))
+    return tuple(stamp)
+
+
+class BufferPool:
+    """LRU-кэш разобранных файлов с проверкой по времени изменения и размеру.
+
+    Значения в пуле общие для всех потоков: изменять их на месте
+    нельзя. Размер записи оценивает вызывающий.
+    """
+
+    def __init__(self, budget: int) -> None:
+        self.budget = budget
+        self._entries: OrderedDict = OrderedDict()
+        self._resident = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "stale": 0}
+
+    def _lookup(self, key: Hashable, stamp: Stamp, remove: bool) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._counters["misses"] += 1
+            return None
+        if entry[0] != stamp:
+            # Файлы изменились: запись больше не понадобится
+            self._counters["misses"] += 1
+            self._counters["stale"] += 1
+            self._remove(key)
+            return None
+        self._counters["hits"] += 1
+        if remove:
+            self._remove(key)
+        else:
+            self._entries.move_to_end(key)
+        return entry[1]
+
+    def get(self, key: Hashable, stamp: Stamp) -> Any:
+        """Значение, если оно соответствует состоянию файлов stamp, иначе None."""
+        with self._lock:
+            return self._lookup(key, stamp, remove=False)
+
+    def take(self, key: Hashable, stamp: Stamp) -> Any:
+        """Как get, но забирает значение из пула для изменения."""
+        with self._lock:
+            return self._lookup(key, stamp, remove=True)
+
+    def put(self, key: Hashable, value: Any, stamp: Stamp, size: int) -> None:
+        """Кладет значение в пул, вытесняя давно не использованные записи."""
+        with self._lock:
+            self._remove(key)
+            if size > self.budget:
+                return
+            self._entries[key] = (stamp, value, size)
+            self._resident += size
+            self._evict()
 
-from .constants import DATA_DIR, META_FILE
+    def discard(self, key: Hashable) -> None:
+        """Убирает запись из пула."""
+        with self._lock:
+            self._remove(key)
+
+    def set_budget(self, budget: int) -> None:
+        """Задает бюджет памяти в байтах (0 — пул выключен)."""
+        with self._lock:
+            self.budget = budget
+            self._evict()
+
+    def clear(self) -> None:
+        """Очищает пул и счетчики."""
+        with self._lock:
+            self._entries.clear()
+            self._resident = 0
+            self._counters = dict.fromkeys(self._counters, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий и промахов, число записей и занятая память."""
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_rate": self._counters["hits"] / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "resident": self._resident,
+                "budget": self.budget,
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._resident -= entry[2]
+
+    def _evict(self) -> None:
+        while self._resident > self.budget:
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self._resident -= size
+            self._counters["evictions"] += 1
+
+
+BUFFER_POOL = BufferPool(BUFFER_POOL_MB * 1024 * 1024)
 
 
 def _ensure_data_dir() -> None:
     """Гарантирует существование директории для данных таблиц."""
     if not os.path.exists(DATA_DIR):
-        os.makedirs(DATA_DIR)
+        os.makedirs(DATA_DIR, exist_ok=True)
 
 
-def load_metadata(filepath: str = META_FILE) -> Dict[str, Any]:
-    """Загружает метаданные из JSON-файла."""
+@contextlib.contextmanager
+def atomic_write(path: str, mode: str = "w") -> Iterator[IO]:
+    """Открывает временный файл, который по выходе заменяет path."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    encoding = None if "b" in mode else "utf-8"
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
+        with open(tmp_path, mode, encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_metadata(filepath: str = META_FILE) -> Dict[str, Any]:
+    """Загружает метаданные из JSON-файла через буферный пул.
+
+    Возвращается новый словарь, но описания таблиц в нем общие
+    с пулом: перед изменением описание таблицы нужно скопировать.
+    """
+    stamp = file_stamp([filepath])
+    if stamp[0] is None:
         return {}
+    key = ("metadata", os.path.abspath(filepath))
+    cached = BUFFER_POOL.get(key, stamp)
+    if cached is None:
+        try:
+            with open(filepath, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Файл метаданных {filepath} поврежден: {e}")
+        # Разобранный JSON занимает в памяти в несколько раз больше файла
+        BUFFER_POOL.put(key, cached, stamp, stamp[0][1] * 4)
+    return dict(cached)
 
 
 def save_metadata(filepath: str, data: Dict[str, Any]) -> None:
     """Сохраняет метаданные в JSON-файл."""
-    with open(filepath, "w", encoding="utf-8") as f:
+    with atomic_write(filepath) as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
 
@@ -37,13 +196,15 @@ def load_table_data(table_name: str) -> List[Dict[str, Any]]:
     try:
         with open(path, "r", encoding="utf-8") as f:
             return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
+    except FileNotFoundError:
         return []
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Файл таблицы {path} поврежден: {e}")
 
 
 def save_table_data(table_name: str, data: List[Dict[str, Any]]) -> None:
     """Сохраняет записи конкретной таблицы в JSON."""
     _ensure_data_dir()
     path = os.path.join(DATA_DIR, f"{table_name}.json")
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    with atomic_write(path) as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, default=to_json)
@@ -0,0 +1,210 @@
+"""
+Очистка таблиц (``vacuum``) и фоновая автоочистка.
+
+Изменения и удаления оставляют в журнале таблицы и в журналах
+индексов устаревшие версии строк. ``vacuum`` перезаписывает таблицу
+компактным снимком без журнала, заново строит файлы индексов
+и пересчитывает статистику в метаданных (в том числе столбцы,
+помеченные ``stale``, и границы секций). Размер файлов до и после
+сохраняется в описании таблицы (поле ``vacuum``).
+
+Автоочистка включается параметром ``--auto-vacuum``: после команды,
+изменившей таблицу, фоновый поток оценивает долю мусора и очищает
+таблицу, если доля превысила порог. Поток берет ту же блокировку
+писателя, что и команды, поэтому цикл команд не ждет очистки, пока
+не обратится к очищаемой таблице.
+"""
+
+import copy
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List
+
+from . import core, locks, partitions
+from .constants import META_FILE, VACUUM_MIN_DEAD
+from .indexes import index_defs, make_index
+from .storage import get_storage
+from .utils import file_stamp, load_metadata, save_metadata
+
+if TYPE_CHECKING:
+    import queue
+
+Report = Dict[str, Any]
+
+
+def table_files(metadata: Dict[str, Any], table_name: str) -> List[str]:
+    """Файлы данных и индексов таблицы."""
+    files = get_storage(metadata, table_name).files(table_name)
+    for column, kind in index_defs(metadata[table_name]):
+        files.append(make_index(table_name, column, kind).path)
+    return files
+
+
+def files_size(paths: Iterable[str]) -> int:
+    """Суммарный размер существующих файлов в байтах."""
+    return sum(os.path.getsize(p) for p in paths if os.path.exists(p))
+
+
+def garbage_ratio(metadata: Dict[str, Any], table_name: str) -> float:
+    """Доля устаревших версий среди всех строк в файлах таблицы."""
+    dead = get_storage(metadata, table_name).dead_records(table_name)
+    if not dead:
+        return 0.0
+    live = metadata[table_name].get("stats", {}).get("rows", 0)
+    return dead / (live + dead)
+
+
+def vacuum_table(metadata: Dict[str, Any], table_name: str) -> Report:
+    """Перезаписывает таблицу и ее индексы в компактном виде.
+
+    Вызывающий держит блокировку писателя таблицы; описание таблицы
+    в metadata обновляется, сохранить его — забота вызывающего.
+    """
+    storage = get_storage(metadata, table_name)
+    table_meta = metadata[table_name]
+    files = table_files(metadata, table_name)
+    before = files_size(files)
+    dead = storage.dead_records(table_name)
+    with locks.publishing(table_name):
+        rows = storage.load(table_name)
+        storage.save(table_name, rows)
+        stamp = file_stamp(storage.data_files(table_name))
+        for column, kind in index_defs(table_meta):
+            make_index(table_name, column, kind).build(rows, stamp=stamp)
+    table_meta["stats"] = core.compute_stats(table_meta["columns"], rows)
+    if "partitions" in table_meta:
+        partitions.recompute(table_meta["partitions"], rows)
+    after = files_size(files)
+    table_meta["vacuum"] = {"size_before": before, "size_after": after}
+    return {
+        "table": table_name,
+        "rows": len(rows),
+        "dead": dead,
+        "size_before": before,
+        "size_after": after,
+    }
+
+
+def format_report(report: Report) -> str:
+    """Строка с итогом очистки таблицы."""
+    return (
+        f'Таблица "{report["table"]}" очищена: строк {report["rows"]}, '
+        f'устаревших версий {report["dead"]}, '
+        f'размер файлов {report["size_before"]} -> {report["size_after"]} байт.'
+    )
+
+
+class AutoVacuum:
+    """Фоновый поток, очищающий таблицы с долей мусора выше порога."""
+
+    def __init__(self, ratio: float) -> None:
+        # Автоочистка включается флагом, queue нужен только ей
+        import queue
+
+        self.ratio = ratio
+        self._queue: "queue.Queue[str | None]" = queue.Queue()
+        self._queued: set = set()
+        self._lock = threading.Lock()
+        self._done: List[Report] = []
+        self._thread: threading.Thread | None = None
+
+    def schedule(self, table_name: str) -> None:
+        """Ставит таблицу в очередь проверки (повторно не ставится)."""
+        with self._lock:
+            if table_name in self._queued:
+                return
+            self._queued.add(table_name)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._work, name="auto-vacuum", daemon=True
+                )
+                self._thread.start()
+        self._queue.put(table_name)
+
+    def finished(self) -> List[Report]:
+        """Забирает итоги очисток, завершившихся с прошлого вызова."""
+        with self._lock:
+            done, self._done = self._done, []
+        return done
+
+    def stop(self) -> None:
+        """Дожидается текущей очистки и останавливает поток."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _due(self, metadata: Dict[str, Any], table_name: str) -> bool:
+        if table_name not in metadata:
+            return False
+        storage = get_storage(metadata, table_name)
+        if storage.dead_records(table_name) < VACUUM_MIN_DEAD:
+            return False
+        return garbage_ratio(metadata, table_name) > self.ratio
+
+    def _work(self) -> None:
+        while True:
+            table_name = self._queue.get()
+            if table_name is None:
+                return
+            with self._lock:
+                self._queued.discard(table_name)
+            try:
+                report = self._check(table_name)
+            except (OSError, ValueError, KeyError) as e:
+                report = {"table": table_name, "error": str(e)}
+            if report is not None:
+                with self._lock:
+                    self._done.append(report)
+
+    def _check(self, table_name: str) -> Report | None:
+        # Оценка без блокировки писателя: очередная команда не ждет ее
+        if not self._due(load_metadata(META_FILE), table_name):
+            return None
+        locks.acquire_writer(table_name)
+        try:
+            metadata = load_metadata(META_FILE)
+            if not self._due(metadata, table_name):
+                return None
+            # Описание из буферного пула общее: изменяется копия
+            metadata[table_name] = copy.deepcopy(metadata[table_name])
+            report = vacuum_table(metadata, table_name)
+            with locks.exclusive(locks.META_LOCK):
+                disk = load_metadata(META_FILE)
+                if table_name in disk:
+                    disk[table_name] = metadata[table_name]
+                    save_metadata(META_FILE, disk)
+            return report
+        finally:
+            locks.release_writer(table_name)
+
+
+_AUTO: AutoVacuum | None = None
+
+
+def set_auto_vacuum(ratio: float | None) -> None:
+    """Включает автоочистку с порогом доли мусора (None — выключает)."""
+    global _AUTO
+    if _AUTO is not None:
+        _AUTO.stop()
+    if ratio is not None and not 0 < ratio < 1:
+        raise ValueError("Порог автоочистки должен быть между 0 и 1.")
+    _AUTO = AutoVacuum(ratio) if ratio is not None else None
+
+
+def schedule(tables: Iterable[str]) -> None:
+    """Передает измененные таблицы автоочистке, если она включена."""
+    if _AUTO is not None:
+        for table_name in tables:
+            _AUTO.schedule(table_name)
+
+
+def finished() -> List[Report]:
+    """Итоги завершившихся фоновых очисток."""
+    return _AUTO.finished() if _AUTO is not None else []
+
+
+def stop() -> None:
+    """Дожидается фоновой очистки перед выходом."""
+    if _AUTO is not None:
+        _AUTO.stop()
@@ -0,0 +1,133 @@
+"""
+Журнал упреждающей записи (WAL) для фиксации транзакций.
+
+При ``commit`` все изменения транзакции — описания таблиц из
+метаданных и записи журнала каждой таблицы — сначала одним файлом
+записываются в ``db_wal.<pid>.<случайный суффикс>.json`` (атомарно,
+с fsync), и только затем применяются к файлам таблиц. После применения
+файл удаляется. У каждой транзакции свой файл, поэтому фиксация в одном
+процессе не перезаписывает и не удаляет WAL другого.
+
+Если процесс упал между записью WAL и его удалением, следующая сессия
+доприменяет все такие транзакции целиком (``recover``): записи журнала
+идемпотентны (вставка и изменение задают строку по ID, удаление
+убирает ее), поэтому повторное применение уже записанной части
+ничего не портит. Индексы восстановленных таблиц удаляются и
+перестраиваются при следующей загрузке.
+"""
+
+import json
+import os
+from typing import Any, Dict, List
+
+from . import compact, locks
+from .constants import META_FILE, WAL_FILE, WAL_PATTERN
+from .indexes import index_defs, make_index
+from .storage import get_storage
+from .utils import atomic_write, load_metadata, save_metadata
+
+
+def write(
+    metadata: Dict[str, Any | None],
+    tables: Dict[str, List[Dict[str, Any]]],
+) -> str:
+    """Записывает изменения транзакции (None — таблица удалена).
+
+    Возвращает путь к файлу WAL этой транзакции.
+    """
+    path = WAL_PATTERN.replace("*", f"{os.getpid()}.{os.urandom(6).hex()}")
+    with atomic_write(path) as f:
+        json.dump(
+            {"metadata": metadata, "tables": tables},
+            f,
+            ensure_ascii=False,
+            separators=(",", ":"),
+            default=compact.to_json,
+        )
+    return path
+
+
+def remove(path: str) -> None:
+    """Удаляет WAL после применения транзакции."""
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def pending() -> List[str]:
+    """Файлы WAL неудаленных транзакций в порядке их записи."""
+    prefix, suffix = WAL_PATTERN.split("*")
+    with os.scandir(".") as entries:
+        paths = [
+            entry.name
+            for entry in entries
+            if entry.name.startswith(prefix)
+            and entry.name.endswith(suffix)
+            and len(entry.name) > len(prefix) + len(suffix)
+        ]
+    # Единый файл прежних версий тоже доприменяется
+    if os.path.exists(WAL_FILE):
+        paths.append(WAL_FILE)
+    stamped = []
+    for path in paths:
+        try:
+            stamped.append((os.stat(path).st_mtime_ns, path))
+        except FileNotFoundError:
+            continue  # транзакция успела завершиться
+    return [path for _, path in sorted(stamped)]
+
+
+def _read(path: str) -> Dict[str, Any] | None:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except json.JSONDecodeError:
+        # Файл пишется атомарно, так что неполным он быть не может
+        raise ValueError(f"Файл {path} поврежден.")
+
+
+def recover() -> List[str]:
+    """Доприменяет транзакции, прерванные сбоем.
+
+    Возвращает имена восстановленных таблиц (пустой список, если
+    незавершенных транзакций нет).
+    """
+    recovered: set[str] = set()
+    for path in pending():
+        recovered.update(_recover(path))
+    return sorted(recovered)
+
+
+def _recover(path: str) -> List[str]:
+    """Доприменяет транзакцию из одного файла WAL."""
+    data = _read(path)
+    if data is None:
+        return []
+    tables = sorted(set(data["metadata"]) | set(data["tables"]))
+    # Пока транзакция применяется, ее автор держит блокировки писателя
+    for table_name in tables:
+        locks.acquire_writer(table_name)
+    try:
+        if _read(path) != data:
+            return []
+        with locks.exclusive(locks.META_LOCK):
+            disk = load_metadata(META_FILE)
+            for table_name, table_meta in data["metadata"].items():
+                if table_meta is None:
+                    disk.pop(table_name, None)
+                else:
+                    disk[table_name] = table_meta
+            save_metadata(META_FILE, disk)
+        for table_name, records in data["tables"].items():
+            if table_name not in disk:
+                continue
+            with locks.publishing(table_name):
+                get_storage(disk, table_name).append(table_name, records, sync=True)
+                for column, kind in index_defs(disk[table_name]):
+                    make_index(table_name, column, kind).drop()
+        remove(path)
+    finally:
+        for table_name in tables:
+            locks.release_writer(table_name)
+    return tables
@@ -0,0 +1,73 @@
+"""Общие фикстуры: база во временном каталоге и выполнение команд."""
+
+import contextlib
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from src.primitive_db import engine, output
+from src.primitive_db.decorators import set_auto_confirm
+from src.primitive_db.utils import BUFFER_POOL
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(*commands: str) -> str:
+    """Выполняет команды как ``database -c`` и возвращает вывод."""
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        engine.run_script(commands)
+    return buffer.getvalue()
+
+
+def rows(text: str) -> list:
+    """Строки результата select из вывода в формате jsonl."""
+    return [json.loads(line) for line in text.splitlines() if line.startswith("{")]
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Пустая база в tmp_path; select выводит строки в формате jsonl."""
+    monkeypatch.chdir(tmp_path)
+    BUFFER_POOL.clear()
+    set_auto_confirm(True)
+    output.set_format("jsonl")
+    yield tmp_path
+    output.set_format("table")
+    set_auto_confirm(False)
+
+
+def _accepts(path: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except OSError:
+            return False
+    return True
+
+
+@pytest.fixture
+def server(db):
+    """Путь к Unix-сокету ``database serve``, запущенного над базой db."""
+    path = str(db / "db.sock")
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "src.primitive_db.main", "serve", "--unix", path],
+        cwd=db, env=env, stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 10
+    # Файл сокета появляется до listen, поэтому ждем успешного подключения
+    while not _accepts(path):
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            pytest.fail("Сервер не запустился.")
+        time.sleep(0.05)
+    yield path
+    process.terminate()
+    process.wait(timeout=10)
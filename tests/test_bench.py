@@ -0,0 +1,35 @@
+"""Проверки набора бенчмарков ``database bench``."""
+
+import json
+import os
+
+from src.benchmarks import suite
+
+OPERATIONS = {"insert", "point_select", "full_scan", "update", "delete"}
+
+
+def test_summarize_reports_percentiles_in_milliseconds():
+    result = suite.summarize([0.001] * 98 + [0.5, 1.0])
+    assert result["ops"] == 100
+    assert result["p50_ms"] == 1.0
+    assert result["p99_ms"] == 500.0
+    assert suite.summarize([])["throughput_ops_s"] == 0.0
+
+
+def test_run_measures_every_operation_on_both_layers(db):
+    report = suite.run(rows=50, ops=4, schema="name:str,age:int", storage="columnar")
+    assert report["params"]["storage"] == "columnar"
+    for layer in ("core", "engine"):
+        results = report["results"][layer]
+        assert set(results) == OPERATIONS
+        assert results["insert"]["ops"] == 4
+    # Таблицы engine создаются во временном каталоге
+    assert os.getcwd() == str(db) and not os.path.exists("db_meta.json")
+
+
+def test_bench_writes_json_report_to_file(db):
+    suite.main(["--rows", "20", "--ops", "2", "--layers", "core", "--output", "r.json"])
+    with open("r.json", encoding="utf-8") as f:
+        report = json.load(f)
+    assert list(report["results"]) == ["core"]
+    assert report["params"]["rows"] == 20
@@ -0,0 +1,59 @@
+"""Проверки поколоночного формата таблиц."""
+
+from conftest import rows, run
+
+from src.primitive_db import columnar
+from src.primitive_db.conditions import And, Comparison
+
+COLUMNS = [
+    {"name": "ID", "type": "int"},
+    {"name": "name", "type": "str"},
+    {"name": "active", "type": "bool"},
+]
+ROWS = [
+    {"ID": 1, "name": "аня", "active": True},
+    {"ID": 3, "name": "", "active": False},
+    {"ID": 7, "name": "bob", "active": True},
+]
+
+
+def test_columnar_file_round_trips_typed_columns(tmp_path):
+    path = str(tmp_path / "t.col")
+    columnar.write_table(path, COLUMNS, ROWS)
+    with open(path, "rb") as f:
+        assert f.read(len(columnar.MAGIC)) == columnar.MAGIC
+    with columnar.ColumnarReader(path) as reader:
+        assert reader.rows == 3
+        assert reader.read_all() == ROWS
+        assert reader.column_values("name", 1) == ["", "bob"]
+        assert reader.value("active", 1) is False
+
+
+def test_columnar_select_checks_columns_before_materializing(tmp_path):
+    path = str(tmp_path / "t.col")
+    columnar.write_table(path, COLUMNS, ROWS)
+    with columnar.ColumnarReader(path) as reader:
+        assert reader.positions_where("ID", Comparison("ID", "=", 7)) == [2]
+        assert reader.positions_where("ID", Comparison("ID", "=", 4)) == []
+        condition = And((
+            Comparison("active", "=", True), Comparison("ID", ">", 1),
+        ))
+        assert reader.select(condition) == [ROWS[2]]
+
+
+def test_converted_table_merges_log_changes_with_snapshot(db):
+    run(
+        "create_table t name:str age:int",
+        "insert into t values (a, 1), (b, 2), (c, 3)",
+        "convert_table t columnar",
+    )
+    assert (db / "data" / "t.col").exists()
+    run(
+        "update t set age = 9 where name = a",
+        "delete from t where name = b",
+        "insert into t values (d, 4)",
+    )
+    assert [(r["ID"], r["age"]) for r in rows(run("select from t"))] == [
+        (1, 9), (3, 3), (4, 4),
+    ]
+    assert [r["ID"] for r in rows(run("select from t where age > 3"))] == [1, 4]
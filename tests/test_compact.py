@@ -0,0 +1,52 @@
+"""Проверки компактных записей строк."""
+
+import json
+import sys
+
+from conftest import run
+
+from src.primitive_db import compact, core
+from src.primitive_db.engine import SESSION
+
+COLUMNS = [{"name": n, "type": "int"} for n in ("ID", "age", "score")]
+
+
+def test_record_behaves_like_row_dict():
+    [row] = compact.compact_rows(COLUMNS, [{"ID": 1, "age": 30, "score": 5}])
+    assert isinstance(row, compact.Record)
+    assert row["age"] == 30 and row.get("name") is None and "score" in row
+    row.update({"age": 31})
+    assert dict(row.items()) == {"ID": 1, "age": 31, "score": 5} == row
+    assert json.loads(json.dumps(row, default=compact.to_json))["age"] == 31
+    assert sys.getsizeof(row) < sys.getsizeof(row.as_dict())
+
+
+def test_rows_stay_dicts_when_columns_cannot_be_slots():
+    for names in (("ID", "items"), ("ID", "_x"), ("ID", "class"), ("ID", "ID")):
+        assert compact.record_class(names) is None
+    columns = [{"name": "ID", "type": "int"}, {"name": "keys", "type": "str"}]
+    assert compact.compact_rows(columns, [{"ID": 1, "keys": "k"}]) == [
+        {"ID": 1, "keys": "k"},
+    ]
+
+
+def test_old_rows_get_missing_columns_as_none():
+    [row] = compact.compact_rows(COLUMNS, [{"ID": 1, "age": 2}])
+    assert row.as_dict() == {"ID": 1, "age": 2, "score": None}
+
+
+def test_core_updates_records_in_place():
+    metadata = core.create_table({}, "t", [("age", "int"), ("score", "int")])
+    table_data = compact.compact_rows(COLUMNS, [
+        {"ID": 1, "age": 1, "score": 0}, {"ID": 2, "age": 2, "score": 0},
+    ])
+    core.update_rows(metadata, "t", table_data, {"score": 7}, {"age": 2})
+    assert compact.column(table_data, "score") == [0, 7]
+
+
+def test_loaded_table_rows_are_records(db):
+    run("create_table t name:str age:int", "insert into t values (a, 1), (b, 2)")
+    SESSION.reset()
+    rows = SESSION.table("t").rows
+    assert [type(r) for r in rows] == [compact.record_class(("ID", "name", "age"))] * 2
+    SESSION.reset()
@@ -0,0 +1,94 @@
+"""Проверки core, не затрагивающие файлы базы."""
+
+import pytest
+
+from src.primitive_db import core
+
+
+def _table():
+    metadata = core.create_table({}, "t", [("name", "str"), ("age", "int")])
+    return metadata, []
+
+
+def test_str_column_stores_unquoted_literals_as_strings():
+    metadata, table_data = _table()
+    core.insert_rows(metadata, "t", [["bob", 1], [5, 2], [True, 3]], table_data)
+    assert [row["name"] for row in table_data] == ["bob", "5", "true"]
+    stats = metadata["t"]["stats"]
+    assert (stats["min"]["name"], stats["max"]["name"]) == ("5", "true")
+
+
+def test_str_column_aggregates_after_int_insert():
+    metadata, table_data = _table()
+    core.insert_rows(metadata, "t", [[5, 2], ["ann", 1]], table_data)
+    [result] = core.aggregate_rows(table_data, [("min", "name"), ("max", "name")])
+    assert list(result.values()) == ["5", "ann"]
+
+
+def test_update_str_column_with_int():
+    metadata, table_data = _table()
+    core.insert_rows(metadata, "t", [["bob", 1]], table_data)
+    core.update_rows(metadata, "t", table_data, {"name": 7}, None)
+    assert table_data[0]["name"] == "7"
+    assert metadata["t"]["stats"]["max"].get("name") in (None, "7")
+
+
+def test_refresh_bounds_recomputes_stale_columns():
+    metadata, table_data = _table()
+    core.insert_rows(metadata, "t", [["ann", 1], ["bob", 9]], table_data)
+    table_data, _ = core.delete_rows(metadata, "t", table_data, {"age": 9})
+    stats = metadata["t"]["stats"]
+    assert "age" in stats["stale"] and "age" not in stats["max"]
+    assert core.refresh_bounds(stats, table_data)
+    assert stats["stale"] == []
+    assert (stats["min"]["age"], stats["max"]["age"]) == (1, 1)
+    assert not core.refresh_bounds(stats, table_data)
+
+
+def test_ids_come_from_counter_and_are_not_reused():
+    metadata, table_data = _table()
+    core.insert_rows(metadata, "t", [["a", 1], ["b", 2]], table_data)
+    table_data, _ = core.delete_rows(metadata, "t", table_data, {"ID": 2})
+    core.insert_rows(metadata, "t", [["c", 3]], table_data)
+    assert [row["ID"] for row in table_data] == [1, 3]
+    assert metadata["t"]["last_id"] == 3
+
+
+def test_counter_starts_after_existing_ids_for_old_tables():
+    metadata, _ = _table()
+    del metadata["t"]["last_id"]
+    assert core.allocate_ids(metadata, "t", [{"ID": 7}], 2) == 8
+    assert metadata["t"]["last_id"] == 9
+
+
+def test_insert_rows_adds_nothing_when_any_row_is_invalid():
+    metadata, table_data = _table()
+    with pytest.raises(ValueError):
+        core.insert_rows(metadata, "t", [["a", 1], ["b", "x"]], table_data)
+    assert table_data == []
+    assert metadata["t"].get("last_id", 0) == 0
+
+
+def test_aggregate_rows_groups_in_single_pass():
+    metadata, table_data = _table()
+    core.insert_rows(metadata, "t", [["a", 1], ["b", 2], ["a", 5]], table_data)
+    items = [("", "name"), ("count", "*"), ("sum", "age"), ("avg", "age")]
+    assert core.aggregate_rows(iter(table_data), items, "name") == [
+        {"name": "a", "count(*)": 2, "sum(age)": 6, "avg(age)": 3.0},
+        {"name": "b", "count(*)": 1, "sum(age)": 2, "avg(age)": 2.0},
+    ]
+    assert core.aggregate_rows([], [("count", "*"), ("avg", "age")]) == [
+        {"count(*)": 0, "avg(age)": None},
+    ]
+
+
+def test_aggregates_from_stats_only_when_bounds_are_fresh():
+    metadata, table_data = _table()
+    core.insert_rows(metadata, "t", [["a", 1], ["b", 9]], table_data)
+    items = [("count", "*"), ("max", "age")]
+    assert core.aggregate_from_stats(metadata["t"], items) == {
+        "count(*)": 2, "max(age)": 9,
+    }
+    assert core.aggregate_from_stats(metadata["t"], [("sum", "age")]) is None
+    core.delete_rows(metadata, "t", table_data, {"age": 9})
+    assert core.aggregate_from_stats(metadata["t"], items) is None
@@ -0,0 +1,48 @@
+"""Проверки кэша SELECT."""
+
+from conftest import rows, run
+
+from src.primitive_db import engine
+from src.primitive_db.decorators import create_cacher
+
+
+def test_cache_evicts_least_recently_used():
+    cache = create_cacher(2)
+    cache("a", lambda: 1, "t")
+    cache("b", lambda: 2, "t")
+    cache("a", lambda: 0, "t")
+    cache("c", lambda: 3, "t")
+    assert cache("a", lambda: 0, "t") == 1
+    assert cache("b", lambda: 0, "t") == 0
+    stats = cache.stats()
+    assert (stats["hits"], stats["evictions"], stats["size"]) == (2, 2, 2)
+
+
+def test_invalidate_drops_only_that_table():
+    cache = create_cacher()
+    cache("k", lambda: 1, "t")
+    cache("k", lambda: 2, "u")
+    cache.invalidate("t")
+    assert cache("k", lambda: 3, "t") == 3
+    assert cache("k", lambda: 0, "u") == 2
+
+
+def test_stream_caches_only_short_fully_read_results():
+    cache = create_cacher()
+    assert list(cache.stream("short", lambda: iter([1, 2]), "t", 2)) == [1, 2]
+    assert list(cache.stream("short", lambda: iter([]), "t", 2)) == [1, 2]
+    list(cache.stream("long", lambda: iter([1, 2, 3]), "t", 2))
+    assert list(cache.stream("long", lambda: iter([]), "t", 2)) == []
+    partial = cache.stream("part", lambda: iter([1, 2]), "t", 2)
+    next(partial)
+    partial.close()
+    assert list(cache.stream("part", lambda: iter([]), "t", 2)) == []
+
+
+def test_select_sees_rows_written_after_cached_result(db):
+    run("create_table t name:str", "insert into t values (a)")
+    hits = engine.SELECT_CACHE.stats()["hits"]
+    assert len(rows(run("select from t", "select from t"))) == 2
+    assert engine.SELECT_CACHE.stats()["hits"] == hits + 1
+    run("insert into t values (b)")
+    assert [r["name"] for r in rows(run("select from t"))] == ["a", "b"]
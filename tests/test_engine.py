@@ -0,0 +1,184 @@
+"""Проверки команд engine на базе во временном каталоге."""
+
+import os
+import subprocess
+import sys
+
+from conftest import ROOT, rows, run
+
+from src.primitive_db import engine, planner
+from src.primitive_db.storage import LogStorage
+
+
+def test_where_on_str_column_matches_unquoted_literal(db):
+    run(
+        "create_table t name:str age:int",
+        "insert into t values (5, 1), (bob, 2)",
+        "create_index t name hash",
+    )
+    assert rows(run("select from t where name = 5")) == [
+        {"ID": 1, "name": "5", "age": 1}
+    ]
+    assert [r["ID"] for r in rows(run("select from t where name in (5, 7)"))] == [1]
+    run("update t set age = 10 where name = 5")
+    assert rows(run("select from t where ID = 1"))[0]["age"] == 10
+    run("delete from t where name = 5")
+    assert [r["name"] for r in rows(run("select from t"))] == ["bob"]
+
+
+def test_where_on_str_column_prunes_hash_partitions_by_text(db):
+    run(
+        "create_table p name:str age:int partition by hash name 4",
+        "insert into p values (5, 1), (6, 2)",
+    )
+    assert [r["age"] for r in rows(run("select from p where name = 5"))] == [1]
+
+
+def test_stale_bounds_are_recomputed_by_next_write(db):
+    run(
+        "create_table t name:str age:int",
+        "insert into t values (a, 1), (b, 5), (c, 9)",
+        "delete from t where age = 9",
+    )
+    assert "Диапазоны" not in run("info t")
+    run("update t set name = x where age = 1")
+    assert "age 1..5" in run("info t")
+    assert rows(run("select max(age) from t")) == [{"max(age)": 5}]
+
+
+def test_info_reports_sizes_of_partitions_written_in_same_script(db):
+    text = run(
+        "create_table p name:str age:int partition by hash name 2",
+        "insert into p values (a, 1), (b, 2), (c, 3)",
+        "info p",
+    )
+    sizes = [line.rsplit(", ", 1)[1] for line in text.splitlines() if "  #" in line]
+    assert len(sizes) == 2 and "0 байт" not in sizes
+
+
+def test_id_counter_is_persisted_between_runs(db):
+    run("create_table t name:str", "insert into t values (a), (b)")
+    run("delete from t where ID = 2")
+    run("insert into t values (c)")
+    assert [r["ID"] for r in rows(run("select from t"))] == [1, 3]
+
+
+def test_script_skips_comments_and_loads_each_table_once(db, monkeypatch):
+    run("create_table t name:str age:int")
+    loads = []
+    original = LogStorage.load
+
+    def load(self, name):
+        loads.append(name)
+        return original(self, name)
+
+    monkeypatch.setattr(LogStorage, "load", load)
+    text = run(
+        "-- комментарий",
+        "# еще комментарий",
+        "",
+        "insert into t values (a, 1);",
+        "update t set age = 2 where name = a",
+        "insert into t values (b, 3)",
+        "select from t",
+    )
+    assert "комментарий" not in text
+    assert loads == ["t"]
+    assert [r["age"] for r in rows(text)] == [2, 3]
+
+
+def test_script_saves_changes_at_end_and_stops_at_exit(db):
+    run("create_table t name:str", "insert into t values (a)", "exit",
+        "insert into t values (b)")
+    assert os.path.exists("data/t.log")
+    assert [r["name"] for r in rows(run("select from t"))] == ["a"]
+
+
+def test_script_file_and_piped_commands(db):
+    (db / "s.sql").write_text(
+        "create_table t name:str\ninsert into t values (a)\n", encoding="utf-8"
+    )
+    database = [sys.executable, "-m", "src.primitive_db.main", "-y"]
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    subprocess.run([*database, "--script", "s.sql"], env=env, check=True,
+                   capture_output=True)
+    piped = subprocess.run(
+        [*database, "--format", "jsonl"], input="select from t\n", env=env,
+        check=True, capture_output=True, text=True,
+    )
+    assert rows(piped.stdout) == [{"ID": 1, "name": "a"}]
+
+
+def test_multi_row_insert_gives_consecutive_ids(db):
+    text = run(
+        "create_table t name:str age:int",
+        "insert into t values (a, 1), (b, 2), (c, 3)",
+    )
+    assert "ID=1, 2, 3" in text
+    assert [r["name"] for r in rows(run("select from t"))] == ["a", "b", "c"]
+
+
+def test_load_csv_maps_header_and_loads_in_chunks(db, monkeypatch):
+    monkeypatch.setattr(engine, "CSV_CHUNK_SIZE", 2)
+    (db / "t.csv").write_text(
+        "age,ID,name\n1,99,a\n2,99,b\n3,99,c\n", encoding="utf-8"
+    )
+    text = run("create_table t name:str age:int", "load_csv t t.csv")
+    assert "Загружено записей: 3" in text
+    assert rows(run("select from t")) == [
+        {"ID": 1, "name": "a", "age": 1},
+        {"ID": 2, "name": "b", "age": 2},
+        {"ID": 3, "name": "c", "age": 3},
+    ]
+
+
+def test_load_csv_without_header_reports_bad_line(db):
+    (db / "t.csv").write_text("a,1\nb,x\n", encoding="utf-8")
+    text = run("create_table t name:str age:int", "load_csv t t.csv")
+    assert "Строка 2" in text
+    assert rows(run("select from t")) == []
+
+
+def test_count_without_where_does_not_read_rows(db, monkeypatch):
+    run("create_table t g:str n:int", "insert into t values (a, 1), (b, 2), (a, 5)")
+    loads = []
+    monkeypatch.setattr(LogStorage, "load", lambda self, name: loads.append(name))
+    assert rows(run("select count(*), min(n), max(n) from t")) == [
+        {"count(*)": 3, "min(n)": 1, "max(n)": 5},
+    ]
+    assert loads == []
+
+
+def test_select_aggregates_with_where_and_group_by(db):
+    run("create_table t g:str n:int", "insert into t values (a, 1), (b, 2), (a, 5)")
+    assert rows(run("select g, sum(n) from t where n > 1 group by g")) == [
+        {"g": "a", "sum(n)": 5}, {"g": "b", "sum(n)": 2},
+    ]
+    assert "sum применим только к столбцам int" in run("select sum(g) from t")
+
+
+def test_execute_reuses_prepared_plan_template(db, monkeypatch):
+    monkeypatch.setattr(engine, "PREPARED", {})
+    templates = []
+    template = planner.PlanTemplate
+
+    def spy(*args):
+        templates.append(args[1:])
+        return template(*args)
+
+    monkeypatch.setattr(planner, "PlanTemplate", spy)
+    text = run(
+        "create_table t name:str age:int",
+        "prepare add as insert into t values (?, ?)",
+        "prepare older as select from t where age > ?",
+        "execute add (a, 10)",
+        "execute add (b, 20)",
+        "execute older (15)",
+        "execute older (5)",
+        "create_index t age sorted",
+        "execute older (5)",
+        "execute older",
+    )
+    assert [r["name"] for r in rows(text)] == ["b", "a", "b", "a", "b"]
+    assert templates == [("select", "t")] * 2
+    assert "Ожидалось параметров: 1, передано: 0." in text
@@ -0,0 +1,113 @@
+"""Проверки индексов."""
+
+import os
+
+from conftest import rows, run
+
+from src.primitive_db.indexes import PrimaryKeyIndex, make_index
+from src.primitive_db.storage import get_storage, insert_record
+from src.primitive_db.utils import file_stamp, load_metadata
+
+
+def test_primary_key_range_follows_inserts_and_deletes():
+    index = PrimaryKeyIndex([{"ID": i} for i in (1, 2, 3, 5)])
+    index.apply([
+        {"op": "insert", "row": {"ID": 8}},
+        {"op": "insert", "row": {"ID": 4}},
+        {"op": "update", "row": {"ID": 5}},
+        {"op": "delete", "id": 2},
+        {"op": "delete", "id": 42},
+    ])
+    assert index.ids == [1, 3, 4, 5, 8]
+    assert index.range(">", 3) == {4, 5, 8}
+    assert index.range("<=", 4) == {1, 3, 4}
+    assert index.range(">=", 9) == set()
+
+
+def test_index_is_rebuilt_when_table_was_written_without_it(db):
+    run(
+        "create_table t name:str age:int",
+        "insert into t values (ann, 1)",
+        "create_index t age hash",
+        "create_index t name sorted",
+    )
+    # Процесс упал после записи строки в файл таблицы, до журнала индекса
+    metadata = load_metadata("db_meta.json")
+    row = {"ID": 2, "name": "bob", "age": 2}
+    get_storage(metadata, "t").append("t", [insert_record(row)])
+    assert [r["ID"] for r in rows(run("select from t where age = 2"))] == [2]
+    assert [r["ID"] for r in rows(run("select from t where name > ann"))] == [2]
+
+
+def test_index_journal_matches_table_after_flush(db):
+    run(
+        "create_table t name:str age:int",
+        "create_index t age hash",
+        "insert into t values (ann, 1), (bob, 2)",
+        "update t set name = cid where age = 2",
+        "delete from t where age = 1",
+    )
+    storage = get_storage(load_metadata("db_meta.json"), "t")
+    index = make_index("t", "age")
+    assert index.load(file_stamp(storage.data_files("t")))
+    assert index.values_by_id == {2: 2}
+
+
+def test_create_index_persists_file_used_by_where(db):
+    run(
+        "create_table t name:str age:int",
+        "insert into t values (ann, 1), (bob, 2), (cid, 2)",
+        "create_index t age",
+    )
+    assert os.path.exists("data/t.age.idx")
+    assert "индекс hash по age" in run("explain select from t where age = 2")
+    assert [r["ID"] for r in rows(run("select from t where age = 2"))] == [2, 3]
+    run("drop_index t age")
+    assert not os.path.exists("data/t.age.idx")
+    assert "полный просмотр" in run("explain select from t where age = 2")
+
+
+def test_hash_index_journal_replays_changes(db):
+    index = make_index("t", "age")
+    index.build([{"ID": 1, "age": 5}, {"ID": 2, "age": 6}])
+    index.apply([
+        {"op": "update", "row": {"ID": 1, "age": 6}},
+        {"op": "delete", "id": 2},
+        {"op": "insert", "row": {"ID": 3, "age": 5}},
+    ])
+    index.flush(())
+    loaded = make_index("t", "age")
+    assert loaded.load(())
+    assert loaded.lookup(6) == {1}
+    assert loaded.lookup(5) == {3}
+
+
+def test_sorted_index_range_follows_changes(db):
+    index = make_index("t", "age", "sorted")
+    index.build([{"ID": i, "age": i * 10} for i in range(1, 6)], persist=False)
+    assert index.range(">", 30) == {4, 5}
+    index.apply([
+        {"op": "insert", "row": {"ID": 6, "age": 35}},
+        {"op": "update", "row": {"ID": 4, "age": 5}},
+        {"op": "delete", "id": 5},
+    ])
+    assert index.range(">", 30) == {6}
+    assert index.range("<=", 10) == {1, 4}
+    assert index.range(">=", 20) == {2, 3, 6}
+    assert index.range("<", 5) == set()
+
+
+def test_where_grammar_matches_with_and_without_sorted_index(db):
+    commands = (
+        "create_table t name:str age:int",
+        "insert into t values (a, 10), (b, 20), (c, 30), (d, 40)",
+    )
+    query = "select from t where (age > 15 and age <= 30) or name in (d, x)"
+    run(*commands)
+    expected = [r["ID"] for r in rows(run(query))]
+    run("create_index t age sorted")
+    explain = run("explain select from t where age > 15 and age <= 30")
+    assert "индекс sorted по age" in explain
+    assert [r["ID"] for r in rows(run(query))] == expected == [2, 3, 4]
+    ids = [r["ID"] for r in rows(run("select from t where age != 20"))]
+    assert ids == [1, 3, 4]
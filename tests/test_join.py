@@ -0,0 +1,68 @@
+"""Проверки соединения таблиц (hash join)."""
+
+import pytest
+from conftest import rows, run
+
+from src.primitive_db import core, planner
+from src.primitive_db.parser import parse_where
+
+SETUP = (
+    "create_table u name:str",
+    "create_table o uid:int amount:int",
+    "insert into u values (ann), (bob), (cid)",
+    "insert into o values (1, 10), (2, 3), (1, 7), (9, 1)",
+)
+QUERY = "select name, amount from u join o on u.ID = o.uid where amount > 2"
+
+
+def _metadata():
+    metadata = core.create_table({}, "u", [("name", "str"), ("code", "int")])
+    return core.create_table(metadata, "o", [("uid", "int"), ("amount", "int")])
+
+
+def test_hash_join_skips_missing_values():
+    build = core.build_hash([{"k": 1}, {"k": None}, {"k": 1}], "k")
+    assert list(build) == [1]
+    probe = [{"v": 1}, {"v": None}, {"v": 2}]
+    pairs = list(core.hash_join(probe, "v", lambda v: build.get(v, ())))
+    assert pairs == [({"v": 1}, {"k": 1})] * 2
+
+
+def test_join_plan_builds_on_smaller_side_and_pushes_filters():
+    metadata = _metadata()
+    condition = parse_where("amount > 2 and name = ann and (code = 1 or amount = 3)")
+    on = ("u", "o", "code", "uid")
+    plan = planner.JoinPlan(metadata, on, condition, {"u": 3, "o": 100})
+    assert (plan.build, plan.probe, plan.index_kind) == ("u", "o", None)
+    assert plan.table_plans["o"].condition == parse_where("amount > 2")
+    assert plan.table_plans["u"].condition == parse_where("name = ann")
+    assert plan.condition == parse_where("u.code = 1 or o.amount = 3")
+    plan = planner.JoinPlan(metadata, on, None, {"u": 300, "o": 100})
+    assert plan.build == "o"
+
+
+def test_join_plan_checks_columns():
+    metadata = _metadata()
+    with pytest.raises(ValueError, match="одного типа"):
+        planner.JoinPlan(metadata, ("u", "o", "name", "uid"), None, {})
+    with pytest.raises(KeyError):
+        planner.JoinPlan(metadata, ("u", "o", "code", "nope"), None, {})
+    plan = planner.JoinPlan(metadata, ("u", "o", "code", "uid"), None, {})
+    assert plan.resolve("amount") == "o.amount"
+    with pytest.raises(ValueError, match="в обеих таблицах"):
+        plan.resolve("ID")
+
+
+def test_select_join_uses_index_when_available(db):
+    run(*SETUP)
+    expected = [
+        {"u.name": "ann", "o.amount": 10},
+        {"u.name": "bob", "o.amount": 3},
+        {"u.name": "ann", "o.amount": 7},
+    ]
+    assert rows(run(QUERY)) == expected
+    assert "индекс pk по u.ID" in run("explain " + QUERY)
+    run("create_index o uid")
+    query = "select name, amount from o join u on o.uid = u.ID where amount > 2"
+    assert "индекс hash по o.uid" in run("explain " + query)
+    assert sorted(map(str, rows(run(query)))) == sorted(map(str, expected))
@@ -0,0 +1,87 @@
+"""Проверки межпроцессных блокировок и атомарной записи."""
+
+import fcntl
+import os
+import subprocess
+import sys
+
+import pytest
+from conftest import ROOT, rows, run
+
+from src.primitive_db import locks
+from src.primitive_db.utils import atomic_write, load_table_data
+
+WORKER = """
+import sys
+from src.primitive_db import engine
+for i in range(25):
+    engine.run_script([f"insert into t values ({sys.argv[1]}, {i})"])
+"""
+
+
+def _locked(path, mode):
+    """Занята ли блокировка файла для другого дескриптора."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT)
+    try:
+        fcntl.flock(fd, mode | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+    return False
+
+
+def test_writer_lock_blocks_writers_but_not_readers(db):
+    locks.acquire_writer("t")
+    try:
+        assert locks.holds_writer("t#2")
+        assert _locked("data/t.wlock", fcntl.LOCK_EX)
+        assert not _locked("data/t.lock", fcntl.LOCK_SH)
+    finally:
+        locks.release_writer("t")
+    assert not locks.holds_writer("t")
+    assert not _locked("data/t.wlock", fcntl.LOCK_EX)
+
+
+def test_nested_locks_keep_strongest_mode_until_outer_release(db):
+    with locks.reading("t"):
+        with locks.publishing("t"):
+            assert _locked("data/t.lock", fcntl.LOCK_SH)
+        assert not _locked("data/t.lock", fcntl.LOCK_SH)
+        assert _locked("data/t.lock", fcntl.LOCK_EX)
+    assert not _locked("data/t.lock", fcntl.LOCK_EX)
+
+
+def test_atomic_write_keeps_old_file_on_error(db):
+    with open("f.txt", "w", encoding="utf-8") as f:
+        f.write("old")
+    with pytest.raises(RuntimeError):
+        with atomic_write("f.txt") as f:
+            f.write("new")
+            raise RuntimeError
+    assert os.listdir(".") == ["f.txt"]
+    with open("f.txt", encoding="utf-8") as f:
+        assert f.read() == "old"
+
+
+def test_truncated_table_file_is_an_error(db):
+    os.makedirs("data")
+    with open("data/t.json", "w", encoding="utf-8") as f:
+        f.write('[{"ID": 1')
+    with pytest.raises(ValueError, match="поврежден"):
+        load_table_data("t")
+
+
+def test_concurrent_writers_do_not_lose_inserts(db):
+    run("create_table t who:str n:int")
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    workers = [
+        subprocess.Popen([sys.executable, "-c", WORKER, name], cwd=db, env=env,
+                         stdout=subprocess.DEVNULL)
+        for name in ("a", "b")
+    ]
+    for worker in workers:
+        assert worker.wait(timeout=60) == 0
+    result = rows(run("select from t"))
+    assert len(result) == 50
+    assert [r["ID"] for r in result] == list(range(1, 51))
@@ -0,0 +1,32 @@
+"""Проверки точки входа и таблицы разбора команд."""
+
+import pytest
+from conftest import rows, run
+
+from src.benchmarks import startup
+from src.primitive_db import engine
+from src.primitive_db.main import parse_args
+
+
+def test_repeated_commands_keep_order():
+    args = parse_args(["-y", "-c", "info t", "--command", "select from t"])
+    assert args.command == ["info t", "select from t"] and args.yes
+    with pytest.raises(SystemExit):
+        parse_args(["--script", "s.sql", "-c", "info t"])
+
+
+def test_one_shot_insert_skips_lazy_imports(db):
+    database = ["-m", startup.ENTRY, "-y", "-c"]
+    startup.import_times([*database, "create_table t name:str"], str(db))
+    times = startup.import_times([*database, "insert into t values (a)"], str(db))
+    assert "src.primitive_db.engine" in times
+    assert [name for name in startup.LAZY if name in times] == []
+    assert rows(run("select from t")) == [{"ID": 1, "name": "a"}]
+
+
+def test_dispatch_finds_handler_by_first_word(db):
+    commands = {"select", "insert", "update", "delete", "prepare", "create_table"}
+    assert commands <= set(engine.DISPATCH)
+    text = run("CREATE_TABLE t name:str", "Insert into t values (a)", "frobnicate t")
+    assert "Функции frobnicate нет." in text
+    assert rows(run("SELECT from t")) == [{"ID": 1, "name": "a"}]
@@ -0,0 +1,56 @@
+"""Проверки инструментирования команд."""
+
+import io
+import json
+import time
+
+from conftest import run
+
+from src.primitive_db import metrics
+
+
+def test_histogram_percentile_is_bucket_bound_capped_by_max():
+    histogram = metrics.Histogram()
+    for ms in (0.2, 0.2, 0.2, 7):
+        histogram.add(ms / 1000)
+    assert histogram.percentile(0.5) == 0.25
+    assert histogram.percentile(0.99) == 7
+    assert metrics.Histogram().percentile(0.5) == 0.0
+
+
+def test_phase_time_excludes_nested_phases():
+    metrics.reset()
+    with metrics.track("cmd"):
+        with metrics.phase("execute"):
+            with metrics.phase("table_load"):
+                time.sleep(0.02)
+    with metrics.phase("execute"):
+        pass  # вне команды фаза не учитывается
+    stats = metrics.snapshot()["cmd"]
+    assert stats["total"]["count"] == 1 and stats["execute"]["count"] == 1
+    assert stats["table_load"]["mean_ms"] >= 20
+    assert stats["execute"]["mean_ms"] < stats["table_load"]["mean_ms"]
+    metrics.reset()
+    assert metrics.format_stats() == "Статистика пока не собрана."
+
+
+def test_commands_are_written_to_metrics_file(db):
+    metrics.set_metrics_file("m.jsonl")
+    try:
+        run("create_table t name:str", "select from t", "select from missing")
+    finally:
+        metrics.set_metrics_file(None)
+    with open("m.jsonl", encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f]
+    # В конце скрипта изменения сохраняются командой flush
+    commands = [e["command"] for e in entries]
+    assert commands == ["create_table", "select", "select", "flush"]
+    assert [e["error"] for e in entries] == [False, False, True, False]
+    assert "table_load" in entries[1]["phases_ms"]
+    assert "select:" in run("stats")
+
+
+def test_profile_session_reports_hot_spots():
+    out = io.StringIO()
+    assert metrics.profile_session(lambda: sum(range(1000)), out=out) == 499500
+    assert "Профиль CPU" in out.getvalue() and "tracemalloc" in out.getvalue()
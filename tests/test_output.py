@@ -0,0 +1,64 @@
+"""Проверки сортировки, limit/offset и потокового вывода SELECT."""
+
+import itertools
+
+import pytest
+from conftest import rows, run
+
+from src.primitive_db import core, output
+from src.primitive_db.constants import OUTPUT_PAGE_SIZE
+
+DATA = [
+    {"ID": 1, "name": "b", "age": 30},
+    {"ID": 2, "name": "a", "age": 30},
+    {"ID": 3, "name": "c", "age": 20},
+]
+
+
+@pytest.fixture
+def fmt():
+    """Восстанавливает настройки вывода после проверки."""
+    yield output.set_format
+    output.set_format("table", OUTPUT_PAGE_SIZE)
+    output.set_pager(False)
+
+
+def test_order_rows_with_mixed_directions_and_top_k():
+    ordered = core.order_rows(iter(DATA), [("age", True), ("name", False)])
+    assert [r["ID"] for r in ordered] == [2, 1, 3]
+    ordered = core.order_rows(iter(DATA), [("age", False)], limit=1, offset=1)
+    assert [r["ID"] for r in ordered] == [1]
+
+
+def test_limit_without_order_by_stops_reading_stream():
+    stream = ({"ID": i} for i in itertools.count(1))
+    assert [r["ID"] for r in core.order_rows(stream, [], 2, 3)] == [4, 5]
+    assert next(stream) == {"ID": 6}
+
+
+def test_plain_and_csv_write_header_once(capsys, fmt):
+    fmt("plain")
+    assert output.write_rows(DATA[:2]) == 2
+    assert capsys.readouterr().out == "ID\tname\tage\n1\tb\t30\n2\ta\t30\n"
+    fmt("csv")
+    output.write_rows(iter(DATA[:1]))
+    assert capsys.readouterr().out == "ID,name,age\n1,b,30\n"
+
+
+def test_table_is_formatted_page_by_page(capsys, fmt, monkeypatch):
+    fmt("table", 2)
+    output.write_rows(DATA)
+    assert capsys.readouterr().out.count("| ID | name | age |") == 2
+    output.set_pager(True)
+    monkeypatch.setattr("builtins.input", lambda prompt: "q")
+    assert output.write_rows(DATA) == 2
+
+
+def test_select_with_order_by_limit_offset(db):
+    run(
+        "create_table t name:str age:int",
+        "insert into t values (b, 30), (a, 30), (c, 20), (d, 10)",
+    )
+    query = "select from t where age > 10 order by age desc, name limit 2 offset 1"
+    assert [r["name"] for r in rows(run(query))] == ["b", "c"]
+    assert [r["ID"] for r in rows(run("select from t limit 2"))] == [1, 2]
@@ -0,0 +1,67 @@
+"""Проверки параллельного сканирования поколоночных таблиц."""
+
+import pytest
+from conftest import rows, run
+
+from src.primitive_db import columnar, parallel
+from src.primitive_db.conditions import Comparison
+
+COLUMNS = [{"name": "ID", "type": "int"}, {"name": "n", "type": "int"}]
+
+
+@pytest.fixture
+def small_parts(monkeypatch):
+    """Пул из двух процессов и участки по 7 строк."""
+    partitions = parallel.partitions
+    monkeypatch.setattr(parallel, "PARALLEL_SCAN_WORKERS", 2)
+    monkeypatch.setattr(parallel, "PARALLEL_SCAN_MIN_ROWS", 10)
+    monkeypatch.setattr(parallel, "partitions", lambda n: partitions(n, 7))
+    yield
+    parallel.shutdown()
+
+
+def test_partitions_cover_all_rows():
+    assert parallel.partitions(10, 4) == [(0, 4), (4, 8), (8, 10)]
+    assert parallel.partitions(0, 4) == []
+
+
+def test_small_tables_and_id_lookups_are_scanned_serially(small_parts):
+    condition = Comparison("n", ">", 1)
+    assert parallel.should_parallelize(condition, 50)
+    assert not parallel.should_parallelize(condition, 9)
+    assert not parallel.should_parallelize(None, 50)
+    assert not parallel.should_parallelize(Comparison("ID", "=", 3), 50)
+
+
+def test_parallel_scan_matches_serial_scan_in_id_order(tmp_path, small_parts):
+    path = str(tmp_path / "t.col")
+    columnar.write_table(path, COLUMNS, [{"ID": i, "n": i % 5} for i in range(1, 51)])
+    condition = Comparison("n", "=", 2)
+    with columnar.ColumnarReader(path) as reader:
+        expected = reader.select(condition)
+    assert parallel.scan(path, condition, 50) == expected
+    # Пул не остановлен, то есть участки обработаны рабочими процессами
+    assert parallel._pool is not None
+    assert [r["ID"] for r in expected] == list(range(2, 51, 5))
+
+
+def test_select_merges_parallel_scan_with_log(db, small_parts, monkeypatch):
+    values = ", ".join(f"({i % 3})" for i in range(30))
+    run(
+        "create_table t n:int",
+        f"insert into t values {values}",
+        "convert_table t columnar",
+        "update t set n = 0 where ID = 2",
+        "delete from t where ID = 4",
+    )
+    scans = []
+    scan = parallel.scan
+
+    def spy(path, condition, count):
+        scans.append(count)
+        return scan(path, condition, count)
+
+    monkeypatch.setattr(parallel, "scan", spy)
+    ids = [r["ID"] for r in rows(run("select from t where n = 0"))]
+    assert scans == [30]
+    assert ids == [1, 2, 7, 10, 13, 16, 19, 22, 25, 28]
@@ -0,0 +1,57 @@
+"""Проверки разбора команд и условий WHERE."""
+
+import pytest
+
+from src.primitive_db.conditions import And, Comparison, InList, Or
+from src.primitive_db.lexer import tokenize
+from src.primitive_db.parser import parse_execute, parse_prepare, parse_where
+from src.primitive_db.statements import bind
+
+
+def test_and_binds_tighter_than_or():
+    assert parse_where('age > 1 and name = "a b" or ID in (1, 2)') == Or((
+        And((Comparison("age", ">", 1), Comparison("name", "=", "a b"))),
+        InList("ID", (1, 2)),
+    ))
+
+
+def test_parentheses_group_conditions():
+    assert parse_where("(age >= 1 or age != 2) and flag = true") == And((
+        Or((Comparison("age", ">=", 1), Comparison("age", "!=", 2))),
+        Comparison("flag", "=", True),
+    ))
+
+
+@pytest.mark.parametrize("text", ["", "age >", "age in (1", "= 3", "age = 1 or"])
+def test_malformed_condition_is_rejected(text):
+    with pytest.raises(ValueError):
+        parse_where(text)
+
+
+def test_tokenizer_classifies_tokens_in_one_pass():
+    tokens = tokenize('Select a.b from t where x <> "q \\" r" and y == ? (1,*)')
+    assert [(t.kind, t.text) for t in tokens] == [
+        ("word", "Select"), ("word", "a.b"), ("word", "from"), ("word", "t"),
+        ("word", "where"), ("word", "x"), ("op", "!="), ("value", 'q " r'),
+        ("word", "and"), ("word", "y"), ("op", "="), ("param", "?"),
+        ("punct", "("), ("word", "1"), ("punct", ","), ("punct", "*"),
+        ("punct", ")"),
+    ]
+    assert tokens[0].low == "select"
+    with pytest.raises(ValueError, match="Незакрытая кавычка"):
+        tokenize('select from t where name = "x')
+
+
+def test_prepared_statement_binds_arguments():
+    name, statement, params = parse_prepare(
+        "prepare q as select from t where age > ? and name in (?, b) limit ?"
+    )
+    assert (name, params) == ("q", 3)
+    bound = bind(statement, (30, "a", 2), params)
+    assert bound.where == And((
+        Comparison("age", ">", 30), InList("name", ("a", "b")),
+    ))
+    assert bound.limit == 2
+    assert parse_execute('execute q (30, "a", 2)') == ("q", (30, "a", 2))
+    with pytest.raises(ValueError, match="Ожидалось параметров: 3"):
+        bind(statement, (1,), params)
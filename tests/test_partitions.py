@@ -0,0 +1,82 @@
+"""Проверки секционирования таблиц."""
+
+import pytest
+from conftest import rows, run
+
+from src.primitive_db import partitions
+from src.primitive_db.parser import parse_where
+from src.primitive_db.storage import LogStorage
+
+COLUMNS = [{"name": "ID", "type": "int"}, {"name": "age", "type": "int"}]
+VALUES = ", ".join(f"({c}, {i})" for i, c in enumerate("abcdefghij", 1))
+
+
+def _spy(monkeypatch, method):
+    calls = []
+    original = getattr(LogStorage, method)
+
+    def spy(self, name, *args, **kwargs):
+        calls.append(name)
+        return original(self, name, *args, **kwargs)
+
+    monkeypatch.setattr(LogStorage, method, spy)
+    return calls
+
+
+def test_spec_is_validated():
+    with pytest.raises(ValueError, match="только по ID"):
+        partitions.make_spec(COLUMNS, "range", "age", 10)
+    with pytest.raises(ValueError, match="Число секций"):
+        partitions.make_spec(COLUMNS, "hash", "age", 0)
+    with pytest.raises(KeyError):
+        partitions.make_spec(COLUMNS, "hash", "nope", 2)
+
+
+def test_range_partitions_are_pruned_by_bounds():
+    spec = partitions.make_spec(COLUMNS, "range", "ID", 4)
+    partitions.add_rows(spec, [{"ID": i, "age": i * 10} for i in range(1, 11)])
+    assert [part["rows"] for part in spec["parts"]] == [4, 4, 2]
+    assert partitions.candidates(spec, parse_where("ID > 8")) == [2]
+    assert partitions.candidates(spec, parse_where("age = 50 or ID = 1")) == [0, 1]
+    # Удаление не сужает границы, их пересчитывает recompute
+    partitions.remove_rows(spec, [{"ID": 9, "age": 90}, {"ID": 10, "age": 100}])
+    assert partitions.candidates(spec, parse_where("age > 80")) == []
+    partitions.recompute(spec, [{"ID": 5, "age": 50}])
+    assert partitions.candidates(spec, None) == [1]
+
+
+def test_hash_partition_is_chosen_by_column_value():
+    spec = partitions.make_spec(COLUMNS, "hash", "age", 4)
+    row = {"ID": 1, "age": 7}
+    partitions.add_rows(spec, [row])
+    number = partitions.partition_of(spec, row)
+    assert partitions.candidates(spec, parse_where("age = 7")) == [number]
+    assert partitions.candidates(spec, parse_where("age = 8")) == []
+
+
+def test_insert_writes_tail_and_select_reads_matching_partitions(db, monkeypatch):
+    run("create_table t name:str age:int partition by range 4")
+    run(f"insert into t values {VALUES}")
+    appended = _spy(monkeypatch, "append")
+    run("insert into t values (k, 11)")
+    assert appended == ["t#2"]
+    loaded = _spy(monkeypatch, "load")
+    assert [r["ID"] for r in rows(run("select from t where ID > 8"))] == [9, 10, 11]
+    assert loaded == ["t#2"]
+    assert "читается 1 из 3" in run("explain select from t where age < 3")
+
+
+def test_partitioned_table_changes_and_info(db):
+    run(
+        "create_table t name:str age:int partition by hash name 2",
+        f"insert into t values {VALUES}",
+        "update t set age = 0 where age > 8",
+        "delete from t where name in (a, b)",
+    )
+    assert "нельзя изменить" in run("update t set name = z where ID = 3")
+    assert [r["ID"] for r in rows(run("select from t where age = 0"))] == [9, 10]
+    info = run("info t")
+    assert "Количество записей: 8" in info
+    counts = [int(line.split("записей ")[1].split(",")[0])
+              for line in info.splitlines() if line.startswith("  #")]
+    assert len(counts) == 2 and sum(counts) == 8
@@ -0,0 +1,70 @@
+"""Проверки планировщика запросов."""
+
+import pytest
+from conftest import rows, run
+
+from src.primitive_db import planner
+from src.primitive_db.conditions import And, Comparison, InList, Or
+from src.primitive_db.statements import Param
+
+TYPES = {"ID": "int", "name": "str", "age": "int", "flag": "bool"}
+KINDS = {"ID": "pk", "age": "sorted", "name": "hash"}
+
+
+def test_compiled_predicate_matches_like_condition():
+    condition = Or((
+        And((Comparison("age", ">", 1), Comparison("flag", "=", True))),
+        InList("name", ("a", "b")),
+    ))
+    predicate = planner.compile_condition(condition, TYPES)
+    cases = [
+        {"ID": 1, "name": "z", "age": 2, "flag": True},
+        {"ID": 2, "name": "z", "age": 2, "flag": False},
+        {"ID": 3, "name": "b", "age": 0, "flag": False},
+    ]
+    assert [predicate(r) for r in cases] == [condition.matches(r) for r in cases]
+    assert [predicate(r) for r in cases] == [True, False, True]
+
+
+def test_comparison_with_wrong_type_never_matches():
+    predicate = planner.compile_condition(Comparison("age", "=", "x"), TYPES)
+    assert predicate is planner._never
+    with pytest.raises(KeyError):
+        planner.compile_condition(Comparison("nope", "=", 1), TYPES)
+
+
+def test_access_path_prefers_most_selective_index():
+    access = planner.choose_access(
+        And((Comparison("age", ">", 5), Comparison("ID", "=", 3))), KINDS
+    )
+    assert isinstance(access, planner.IndexLookup) and access.column == "ID"
+    access = planner.choose_access(
+        Or((Comparison("name", "=", "a"), Comparison("age", "<", 3))), KINDS
+    )
+    assert isinstance(access, planner.IndexUnion)
+    # Диапазон по hash-индексу и OR с неиндексированной ветвью — полный просмотр
+    for condition in (
+        Comparison("name", ">", "a"),
+        Or((Comparison("age", "=", 1), Comparison("flag", "=", True))),
+    ):
+        assert planner.choose_access(condition, KINDS) is planner.FULL_SCAN
+
+
+def test_assignments_are_checked_once_against_schema():
+    assert planner.validate_assignments(TYPES, {"name": 5, "age": Param(0)}) == {
+        "name": "5", "age": Param(0),
+    }
+    for bad in ({"ID": 2}, {"age": "x"}, {"flag": 1}):
+        with pytest.raises(ValueError):
+            planner.validate_assignments(TYPES, bad)
+
+
+def test_explain_prints_plan_without_changing_data(db):
+    run(
+        "create_table t name:str age:int",
+        "insert into t values (a, 1)",
+    )
+    text = run("explain update t set name = b where ID = 1")
+    assert "Доступ: индекс pk по ID, значения: 1" in text
+    assert "Присваивания: name = 'b'" in text
+    assert rows(run("select from t"))[0]["name"] == "a"
@@ -0,0 +1,71 @@
+"""Проверки сетевого режима и пула соединений."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.primitive_db.client import Connection, ConnectionPool, ServerError
+from src.primitive_db.protocol import decode_body, encode_response
+
+
+def test_protocol_escapes_lines_that_look_like_terminator():
+    raw = encode_response(".\n..x\nok").decode("utf-8").split("\n")
+    assert raw == ["OK", "..", "...x", "ok", ".", ""]
+    assert decode_body(raw[1:4]) == ".\n..x\nok"
+    assert encode_response("", "a\nb").startswith(b"ERR a b\n.\n")
+
+
+def test_concurrent_clients_see_each_other_writes(server):
+    with ConnectionPool(unix_path=server, size=4) as pool:
+        pool.execute("create_table t n:int")
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(
+                lambda i: pool.execute(f"insert into t values ({i})"), range(40)
+            ))
+        with Connection(unix_path=server) as conn:
+            text = conn.execute("select count(*), sum(n) from t")
+    values = text.splitlines()[3].strip("|").split("|")
+    assert [int(v) for v in values] == [40, sum(range(40))]
+
+
+def test_pool_prepares_statement_again_on_other_connection(server):
+    with ConnectionPool(unix_path=server, size=2) as pool:
+        pool.execute("create_table t name:str age:int")
+        pool.execute("insert into t values (ann, 30)")
+        with pool.connection() as pinned:
+            # Занятое соединение не достанется prepare
+            pool.execute("prepare q as select from t where age > ?")
+        # Следующая команда получит соединение, на котором q не готовилась
+        with pool.connection() as conn:
+            assert "q" not in conn.prepared
+            assert conn is pinned
+        assert "ann" in pool.execute("execute q (20)")
+
+
+def test_prepared_statements_are_per_connection(server):
+    with Connection(unix_path=server) as first, Connection(unix_path=server) as other:
+        first.execute("create_table t name:str age:int")
+        first.execute("prepare q as select from t where age > ?")
+        first.execute("execute q (1)")
+        with pytest.raises(ServerError):
+            other.execute("execute q (1)")
+
+
+@pytest.mark.parametrize(
+    "command", ["begin", "commit", "rollback", "output csv", "stats reset"]
+)
+def test_commands_with_shared_state_are_rejected(server, command):
+    with Connection(unix_path=server) as conn:
+        with pytest.raises(ServerError):
+            conn.execute(command)
+        assert "Формат вывода: table" in conn.execute("output")
+        conn.execute("stats")
+
+
+def test_failed_command_returns_error(server):
+    with Connection(unix_path=server) as conn:
+        with pytest.raises(ServerError, match="bogus"):
+            conn.execute("bogus")
+        with pytest.raises(ServerError):
+            conn.execute("select from missing")
+        assert conn.execute("list_tables") is not None
@@ -0,0 +1,74 @@
+"""Проверки движков хранения на файлах во временном каталоге."""
+
+import os
+
+from conftest import rows, run
+
+from src.primitive_db import locks, storage
+from src.primitive_db.storage import (
+    LogStorage,
+    delete_record,
+    insert_record,
+    update_record,
+)
+from src.primitive_db.utils import save_table_data
+
+
+def _row(row_id, name):
+    return {"ID": row_id, "name": name}
+
+
+def test_log_storage_replays_appended_records(db):
+    backend = LogStorage()
+    backend.append("t", [insert_record(_row(1, "a")), insert_record(_row(2, "b"))])
+    backend.append("t", [update_record(_row(1, "c")), delete_record(2)])
+    assert backend.load("t") == [_row(1, "c")]
+    assert not os.path.exists("data/t.snapshot.json")
+    assert backend.dead_records("t") == 3
+
+
+def test_log_storage_skips_torn_last_line(db):
+    backend = LogStorage()
+    backend.append("t", [insert_record(_row(1, "a"))])
+    with open("data/t.log", "a", encoding="utf-8") as f:
+        f.write('{"op": "insert", "row": {"ID": 2')
+    assert backend.load("t") == [_row(1, "a")]
+
+
+def test_log_storage_migrates_json_table_to_snapshot(db):
+    save_table_data("t", [_row(1, "a")])
+    backend = LogStorage()
+    backend.append("t", [insert_record(_row(2, "b"))])
+    assert not os.path.exists("data/t.json")
+    assert backend.load("t") == [_row(1, "a"), _row(2, "b")]
+
+
+def test_writer_folds_long_log_into_snapshot(db, monkeypatch):
+    monkeypatch.setattr(storage, "LOG_CHECKPOINT_MIN", 2)
+    backend = LogStorage()
+    backend.append("t", [insert_record(_row(i, "x")) for i in (1, 2, 3)])
+    backend.append("t", [delete_record(1), delete_record(2)])
+    # Читатель журнал не сворачивает
+    assert backend.load("t") == [_row(3, "x")]
+    assert os.path.getsize("data/t.log") > 0
+    locks.acquire_writer("t")
+    try:
+        assert backend.load("t") == [_row(3, "x")]
+    finally:
+        locks.release_writer("t")
+    assert not os.path.exists("data/t.log") or os.path.getsize("data/t.log") == 0
+    assert backend.load("t") == [_row(3, "x")]
+
+
+def test_update_appends_to_log_without_rewriting_snapshot(db):
+    run(
+        "create_table t name:str age:int",
+        "insert into t values (a, 1), (b, 2)",
+        "vacuum t",
+    )
+    snapshot = os.stat("data/t.snapshot.json").st_mtime_ns
+    run("update t set age = 5 where name = a")
+    assert os.stat("data/t.snapshot.json").st_mtime_ns == snapshot
+    with open("data/t.log", encoding="utf-8") as f:
+        assert '"op":"update"' in f.read()
+    assert [r["age"] for r in rows(run("select from t"))] == [5, 2]
@@ -0,0 +1,78 @@
+"""Проверки транзакций и восстановления по WAL."""
+
+import glob
+
+from conftest import rows, run
+
+from src.primitive_db import session, wal
+from src.primitive_db.constants import WAL_PATTERN
+
+
+def _ids(table_name="t"):
+    return [r["ID"] for r in rows(run(f"select from {table_name}"))]
+
+
+def test_rollback_discards_rows_and_id_counter(db):
+    run("create_table t name:str")
+    text = run("begin", "insert into t values (a)", "select from t", "rollback")
+    assert [r["ID"] for r in rows(text)] == [1]
+    assert _ids() == []
+    run("insert into t values (b)")
+    assert _ids() == [1]
+
+
+def test_commit_applies_all_tables_and_removes_wal(db):
+    run("create_table t name:str", "create_table u name:str")
+    run(
+        "begin",
+        "insert into t values (a), (b)",
+        "insert into u values (c)",
+        "delete from t where ID = 1",
+        "commit",
+    )
+    assert (_ids("t"), _ids("u")) == ([2], [1])
+    assert glob.glob(WAL_PATTERN) == []
+
+
+def test_unfinished_transaction_is_rolled_back(db):
+    run("create_table t name:str")
+    text = run("begin", "insert into t values (a)")
+    assert "Транзакция не была зафиксирована." in text
+    assert "Транзакция уже начата." in run("begin", "begin")
+    assert _ids() == []
+
+
+def test_commit_interrupted_after_wal_is_recovered(db, monkeypatch):
+    run("create_table t name:str age:int", "create_index t age")
+    flush = session.Session.flush
+
+    def crash(self, sync=False):
+        if sync:
+            raise OSError("сбой")
+        flush(self, sync)
+
+    monkeypatch.setattr(session.Session, "flush", crash)
+    run("begin", "insert into t values (a, 1), (b, 2)", "commit")
+    monkeypatch.setattr(session.Session, "flush", flush)
+    assert len(glob.glob(WAL_PATTERN)) == 1
+
+    assert _ids() == [1, 2]
+    assert glob.glob(WAL_PATTERN) == []
+    assert [r["ID"] for r in rows(run("select from t where age = 2"))] == [2]
+    run("insert into t values (c, 3)")
+    assert _ids() == [1, 2, 3]
+
+
+def test_recovery_of_applied_wal_is_idempotent(db, monkeypatch):
+    run("create_table t name:str")
+    remove = wal.remove
+    monkeypatch.setattr(wal, "remove", lambda path: None)
+    run(
+        "begin",
+        "insert into t values (a)",
+        "update t set name = b where ID = 1",
+        "commit",
+    )
+    monkeypatch.setattr(wal, "remove", remove)
+    assert wal.recover() == ["t"]
+    assert rows(run("select from t")) == [{"ID": 1, "name": "b"}]
@@ -0,0 +1,59 @@
+"""Проверки буферного пула и чтения метаданных."""
+
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ROOT, rows, run
+
+from src.primitive_db.utils import BUFFER_POOL, BufferPool, file_stamp, load_metadata
+
+
+def test_buffer_pool_evicts_least_recently_used():
+    pool = BufferPool(10)
+    pool.put("a", 1, (), 4)
+    pool.put("b", 2, (), 4)
+    assert pool.get("a", ()) == 1
+    pool.put("c", 3, (), 4)
+    assert pool.get("b", ()) is None
+    pool.put("huge", 4, (), 11)
+    assert pool.get("huge", ()) is None
+    pool.set_budget(4)
+    assert (pool.get("a", ()), pool.get("c", ())) == (None, 3)
+    stats = pool.stats()
+    assert (stats["evictions"], stats["entries"], stats["resident"]) == (2, 1, 4)
+    assert stats["hit_rate"] == 2 / 5
+
+
+def test_buffer_pool_drops_entries_with_changed_stamp():
+    pool = BufferPool(100)
+    pool.put("t", [1], ((1, 10),), 1)
+    assert pool.get("t", ((2, 10),)) is None
+    assert pool.stats()["stale"] == 1 and pool.stats()["entries"] == 0
+    pool.put("t", [1], ((1, 10),), 1)
+    assert pool.take("t", ((1, 10),)) == [1]
+    assert pool.get("t", ((1, 10),)) is None
+
+
+def test_metadata_is_reread_after_file_changes(db):
+    with open("meta.json", "w", encoding="utf-8") as f:
+        json.dump({"t": {}}, f)
+    assert load_metadata("meta.json") == {"t": {}}
+    assert load_metadata("meta.json") == {"t": {}}
+    assert BUFFER_POOL.stats()["hits"] == 1
+    stamp = file_stamp(["meta.json"])
+    with open("meta.json", "w", encoding="utf-8") as f:
+        json.dump({"t": {}, "u": {}}, f)
+    assert file_stamp(["meta.json"]) != stamp
+    assert set(load_metadata("meta.json")) == {"t", "u"}
+
+
+def test_session_sees_rows_written_by_other_process(db):
+    run("create_table t name:str", "insert into t values (a)", "select from t")
+    subprocess.run(
+        [sys.executable, "-m", "src.primitive_db.main", "-c",
+         "insert into t values (b)"],
+        env=dict(os.environ, PYTHONPATH=ROOT), check=True, capture_output=True,
+    )
+    assert [r["name"] for r in rows(run("select from t"))] == ["a", "b"]
@@ -0,0 +1,57 @@
+"""Проверки очистки таблиц и автоочистки."""
+
+import pytest
+from conftest import rows, run
+
+from src.primitive_db import vacuum
+from src.primitive_db.utils import load_metadata
+
+SETUP = (
+    "create_table t name:str age:int",
+    "create_index t age",
+    "insert into t values (a, 1), (b, 2), (c, 3), (d, 4)",
+    "update t set age = 5 where ID = 1",
+    "update t set age = 6 where ID = 1",
+    "delete from t where ID = 2",
+)
+
+
+def test_garbage_ratio_counts_dead_versions(db):
+    run(*SETUP)
+    # 3 живые строки; устаревшие версии: две замены, удаленная строка
+    # и сама запись об удалении
+    assert vacuum.garbage_ratio(load_metadata("db_meta.json"), "t") == 4 / 7
+
+
+def test_vacuum_rewrites_table_and_records_sizes(db):
+    run(*SETUP)
+    before = rows(run("select from t"))
+    text = run("vacuum t")
+    assert "устаревших версий 4" in text
+    metadata = load_metadata("db_meta.json")
+    report = metadata["t"]["vacuum"]
+    assert report["size_after"] < report["size_before"]
+    assert vacuum.garbage_ratio(metadata, "t") == 0.0
+    assert rows(run("select from t")) == before
+    assert [r["ID"] for r in rows(run("select from t where age = 6"))] == [1]
+
+
+def test_auto_vacuum_cleans_table_in_background(db, monkeypatch):
+    monkeypatch.setattr(vacuum, "VACUUM_MIN_DEAD", 1)
+    run(*SETUP)
+    worker = vacuum.AutoVacuum(0.4)
+    worker.schedule("t")
+    worker.stop()
+    [report] = worker.finished()
+    assert report["dead"] == 4 and report["rows"] == 3
+    assert "vacuum" in load_metadata("db_meta.json")["t"]
+
+    worker = vacuum.AutoVacuum(0.4)
+    worker.schedule("t")
+    worker.stop()
+    assert worker.finished() == []
+
+
+def test_auto_vacuum_threshold_is_a_fraction():
+    with pytest.raises(ValueError):
+        vacuum.set_auto_vacuum(1.5)